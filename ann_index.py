@@ -0,0 +1,305 @@
+"""
+근사 최근접 이웃(ANN) 벡터 인덱스
+
+전체 리뷰(수십만~수백만 청크)를 검색하기 위한 CPU용 IVF 인덱스입니다.
+
+- 코어스 양자화: k-means 중심(nlist개)으로 벡터를 나누고,
+  검색 시 질의와 가까운 nprobe개 리스트만 탐색
+- 벡터 압축: 벡터마다 스케일 하나 + int8 코드 (float32 대비 메모리 1/4)
+
+임베딩은 L2 정규화되어 있다고 가정하고 내적(코사인 유사도)으로 점수를 매깁니다.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from query_router import MetadataColumns
+
+ANN_INDEX_DIR = os.path.join(".cache", "ann")
+DEFAULT_NPROBE = 8
+# 이보다 작으면 리스트 하나(= 전수 탐색)로 충분
+FLAT_THRESHOLD = 20_000
+# k-means 학습 샘플: 리스트당 32개 (상한 50,000)
+KMEANS_SAMPLE_PER_LIST = 32
+KMEANS_SAMPLE = 50_000
+KMEANS_ITERATIONS = 8
+# 중심 배정 시 한 번에 처리할 행 수 (행 × nlist 점수 행렬 메모리 제한)
+ASSIGN_BATCH = 8192
+
+
+# ============================================
+# int8 양자화
+# ============================================
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """float 벡터 → (int8 코드, 벡터별 스케일)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
+
+
+# ============================================
+# IVF 인덱스
+# ============================================
+
+class QuantizedIVFIndex:
+    """
+    int8 양자화 IVF 인덱스
+
+    train() → add() (여러 번 가능) → search() 순서로 사용합니다.
+    add()는 리스트별 버퍼에 쌓아 두고, 검색 직전에 리스트별 연속 배열로 합칩니다.
+    """
+
+    def __init__(self, dim: int, nlist: int = 1, nprobe: int = DEFAULT_NPROBE):
+        self.dim = dim
+        self.nlist = max(1, nlist)
+        self.nprobe = nprobe
+        self.centroids = np.zeros((self.nlist, dim), dtype=np.float32)
+        self.ntotal = 0
+        self._pending: List[List[tuple]] = [[] for _ in range(self.nlist)]
+        self._codes: List[np.ndarray] = [np.zeros((0, dim), dtype=np.int8) for _ in range(self.nlist)]
+        self._scales: List[np.ndarray] = [np.zeros(0, dtype=np.float32) for _ in range(self.nlist)]
+        self._ids: List[np.ndarray] = [np.zeros(0, dtype=np.int64) for _ in range(self.nlist)]
+
+    @staticmethod
+    def suggested_nlist(n: int) -> int:
+        """리스트 수 권장값: 약 2·√N (작은 코퍼스는 전수 탐색)"""
+        if n < FLAT_THRESHOLD:
+            return 1
+        return int(2 * np.sqrt(n))
+
+    def train(self, sample: np.ndarray, seed: int = 0):
+        """샘플 벡터로 k-means 중심 학습 (구면 k-means, 고정 반복)"""
+        if self.nlist == 1:
+            return
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(sample, dtype=np.float32)
+        sample_size = min(KMEANS_SAMPLE, self.nlist * KMEANS_SAMPLE_PER_LIST)
+        if len(sample) > sample_size:
+            sample = sample[rng.choice(len(sample), sample_size, replace=False)]
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=len(sample) < self.nlist)]
+
+        for _ in range(KMEANS_ITERATIONS):
+            assign = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=self.nlist)
+            empty = counts == 0
+            sums[empty] = centroids[empty]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+        self.centroids = centroids.astype(np.float32)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """가장 가까운 중심 번호 (배치 단위 계산)"""
+        assign = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), ASSIGN_BATCH):
+            block = vectors[start:start + ASSIGN_BATCH]
+            assign[start:start + ASSIGN_BATCH] = np.argmax(block @ centroids.T, axis=1)
+        return assign
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray = None):
+        """벡터 추가 (ids 생략 시 추가 순번)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if ids is None:
+            ids = np.arange(self.ntotal, self.ntotal + len(vectors), dtype=np.int64)
+        self.add_codes(*quantize(vectors), ids, vectors)
+
+    def add_codes(self, codes: np.ndarray, scales: np.ndarray, ids: np.ndarray,
+                  vectors: np.ndarray = None):
+        """이미 양자화된 벡터 추가 (디스크에 저장된 코드 재사용)"""
+        if self.nlist == 1:
+            assign = np.zeros(len(codes), dtype=np.int64)
+        elif vectors is not None:
+            assign = self._nearest(vectors, self.centroids)
+        else:
+            assign = np.empty(len(codes), dtype=np.int64)
+            for start in range(0, len(codes), ASSIGN_BATCH):
+                block = dequantize(codes[start:start + ASSIGN_BATCH], scales[start:start + ASSIGN_BATCH])
+                assign[start:start + ASSIGN_BATCH] = self._nearest(block, self.centroids)
+
+        order = np.argsort(assign, kind='stable')
+        bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+        for list_no in range(self.nlist):
+            rows = order[bounds[list_no]:bounds[list_no + 1]]
+            if len(rows):
+                self._pending[list_no].append((codes[rows], scales[rows], ids[rows]))
+        self.ntotal += len(codes)
+
+    def compact(self):
+        """추가 대기 중인 벡터를 리스트별 연속 배열로 합침"""
+        for list_no, pending in enumerate(self._pending):
+            if not pending:
+                continue
+            self._codes[list_no] = np.concatenate([self._codes[list_no]] + [p[0] for p in pending])
+            self._scales[list_no] = np.concatenate([self._scales[list_no]] + [p[1] for p in pending])
+            self._ids[list_no] = np.concatenate([self._ids[list_no]] + [p[2] for p in pending])
+            self._pending[list_no] = []
+
+    def search(self, query: np.ndarray, k: int = 5, nprobe: int = None,
+               mask: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        질의 벡터 하나 → (점수, id) 상위 k개 (점수 내림차순)
+
+        mask(id별 bool)가 주어지면 허용된 벡터만 점수를 매기고(사전 필터),
+        후보가 k개 모일 때까지 가까운 순서로 리스트를 더 탐색합니다.
+        """
+        self.compact()
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+
+        if self.nlist == 1:
+            lists = [0]
+        elif mask is None:
+            lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        else:
+            lists = np.argsort(-(self.centroids @ query))
+
+        scores, ids = [], []
+        found = 0
+        for probed, list_no in enumerate(lists):
+            if mask is not None and probed >= nprobe and found >= k:
+                break
+            codes, scales, list_ids = self._codes[list_no], self._scales[list_no], self._ids[list_no]
+            if mask is not None and len(list_ids):
+                allowed = mask[list_ids]
+                codes, scales, list_ids = codes[allowed], scales[allowed], list_ids[allowed]
+            if len(codes):
+                scores.append((codes @ query) * scales)
+                ids.append(list_ids)
+                found += len(list_ids)
+        if not scores:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        scores = np.concatenate(scores)
+        ids = np.concatenate(ids)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return scores[top], ids[top]
+
+    def memory_bytes(self) -> int:
+        self.compact()
+        return int(self.centroids.nbytes
+                   + sum(c.nbytes for c in self._codes)
+                   + sum(s.nbytes for s in self._scales)
+                   + sum(i.nbytes for i in self._ids))
+
+
+# ============================================
+# 임베딩 재사용 저장소 (청크 ID → int8 코드)
+# ============================================
+
+def load_quantized_vectors(path: str) -> Dict[str, Any]:
+    """저장된 {'ids': 청크 ID 목록, 'codes': int8 코드, 'scales': 스케일, 'centroids': IVF 중심}"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            stored = {name: data[name] for name in data.files}
+        stored['ids'] = stored['ids'].tolist()
+        return stored
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_quantized_vectors(path: str, ids: List[str], codes: np.ndarray, scales: np.ndarray,
+                           centroids: np.ndarray = None):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    arrays = {'ids': np.array(ids), 'codes': codes, 'scales': scales}
+    if centroids is not None:
+        arrays['centroids'] = centroids
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+# ============================================
+# LangChain VectorStore 래퍼
+# ============================================
+
+class ANNVectorStore(VectorStore):
+    """
+    QuantizedIVFIndex 기반 VectorStore (as_retriever() 사용 가능)
+
+    similarity_search(..., filter=where)는 Chroma where 절(등호 조건, $and)을 받아
+    메타데이터 사전 필터로 적용합니다.
+    """
+
+    def __init__(self, embedding: Embeddings, index: QuantizedIVFIndex, documents: List[Document]):
+        self._embedding = embedding
+        self.index = index
+        self.documents = documents
+        self.metadata = MetadataColumns(documents)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @classmethod
+    def from_quantized(cls, documents: List[Document], embedding: Embeddings,
+                       codes: np.ndarray, scales: np.ndarray,
+                       nprobe: int = DEFAULT_NPROBE,
+                       centroids: np.ndarray = None) -> "ANNVectorStore":
+        """
+        양자화된 벡터로 인덱스 구성
+
+        centroids가 주어지면(이전 빌드에서 저장) 재사용하고,
+        없으면 샘플을 복원해 k-means로 학습합니다.
+        """
+        dim = codes.shape[1] if len(codes) else 1
+        if centroids is not None and centroids.shape[1] == dim:
+            index = QuantizedIVFIndex(dim, len(centroids), nprobe)
+            index.centroids = centroids.astype(np.float32)
+        else:
+            index = QuantizedIVFIndex(dim, QuantizedIVFIndex.suggested_nlist(len(codes)), nprobe)
+        if len(codes):
+            if index.nlist > 1 and centroids is None:
+                rng = np.random.default_rng(0)
+                rows = rng.choice(len(codes), min(len(codes), KMEANS_SAMPLE), replace=False)
+                index.train(dequantize(codes[rows], scales[rows]))
+            index.add_codes(codes, scales, np.arange(len(codes), dtype=np.int64))
+            index.compact()
+        return cls(embedding, index, documents)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None, **kwargs: Any) -> "ANNVectorStore":
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        vectors = np.asarray(embedding.embed_documents(list(texts)), dtype=np.float32)
+        codes, scales = quantize(vectors) if len(vectors) else (np.zeros((0, 1), np.int8), np.zeros(0, np.float32))
+        return cls.from_quantized(documents, embedding, codes, scales, kwargs.get('nprobe', DEFAULT_NPROBE))
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        start = len(self.documents)
+        self.documents.extend(Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas))
+        self.index.add(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32),
+                       np.arange(start, start + len(texts), dtype=np.int64))
+        return [str(i) for i in range(start, start + len(texts))]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        mask = self.metadata.mask(kwargs.get('filter'))
+        if mask is not None and not mask.any():
+            return []
+        scores, ids = self.index.search(np.asarray(self._embedding.embed_query(query)), k, mask=mask)
+        return [(self.documents[i], float(s)) for s, i in zip(scores, ids)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
@@ -0,0 +1,172 @@
+"""
+의미 기반 답변 캐시
+
+"재방문율 높은 춘천 맛집 추천해줘"처럼 거의 같은 질문이 반복되면
+검색 + LLM 생성을 다시 하지 않고 이전 답변을 재생합니다.
+
+- 범위(scope): 모델 × 온도 구간 × 데이터 스냅샷 식별자(fingerprint) × 임베딩 모델 × 검색 설정
+  (범위가 다르면 절대 재사용하지 않음, 스냅샷이 바뀌면 자연히 무효화)
+- 같은 범위 안에서 정규화된 질의가 같거나 질의 임베딩 코사인 유사도 ≥ threshold면 적중
+  (정규화 질의를 먼저 비교하고, 임베딩은 같은 범위에 벡터가 있는 항목이 있을 때만 계산)
+- 벡터 없이 저장한 항목(장소명 질의 등)은 정규화 질의가 같을 때만 적중
+- TTL 만료 + 최대 개수 초과 시 LRU(가장 오래 안 쓴 항목)부터 제거
+- 적중률, 절약한 지연 시간, 절약한 토큰 수 집계
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_ENTRIES = 512
+TEMPERATURE_BUCKET = 0.25
+# 재생 속도: 조각(어절) 하나당 지연 (초)
+REPLAY_DELAY = 0.01
+
+
+def normalize_query(query: str) -> str:
+    """띄어쓰기·문장부호 차이를 무시한 비교용 질의 ("추천해 줘" == "추천해줘")"""
+    return re.sub(r'[\s?!.~,]+', '', query).lower()
+
+
+def temperature_bucket(temperature: float) -> int:
+    """온도를 TEMPERATURE_BUCKET 폭 구간 번호로 (0.7과 0.8은 같은 구간)"""
+    return int(round(temperature / TEMPERATURE_BUCKET))
+
+
+def cache_scope(model: str, temperature: float, snapshot_fingerprint: str, *extra: Any) -> tuple:
+    """캐시 범위 키 (extra: 임베딩 모델, 검색 범위, k 등 답변에 영향을 주는 설정)"""
+    return (model, temperature_bucket(temperature), snapshot_fingerprint) + tuple(extra)
+
+
+@dataclass
+class CachedAnswer:
+    scope: tuple
+    query: str
+    vector: Optional[np.ndarray]
+    answer: str
+    created_at: float
+    latency: float
+    tokens: int
+    hits: int = 0
+
+
+class SemanticAnswerCache:
+    """세션 간 공유되는 스레드 안전 답변 캐시"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'hits': 0, 'latency_saved': 0.0, 'tokens_saved': 0}
+
+    @staticmethod
+    def _unit(vector: Iterable[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry.created_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, scope: tuple, query: str,
+               embed: Callable[[], Iterable[float]] = None) -> Optional[Tuple[CachedAnswer, float]]:
+        """
+        같은 범위에서 가장 비슷한 답변 찾기
+
+        Args:
+            embed: 질의 임베딩을 돌려주는 함수. 정규화 질의가 같은 항목이 없고 같은 범위에
+                벡터가 있는 항목이 있을 때만 (잠금 밖에서) 호출, None이면 정규화 질의만 비교
+
+        Returns:
+            (캐시 항목, 유사도) 또는 None
+        """
+        normalized = normalize_query(query)
+        with self._lock:
+            self._stats['lookups'] += 1
+            self._purge_expired(time.time())
+            for key, entry in self._entries.items():
+                if entry.scope == scope and entry.query == normalized:
+                    return self._hit(key, 1.0)
+            semantic = embed is not None and any(entry.scope == scope and entry.vector is not None
+                                                 for entry in self._entries.values())
+        if not semantic:
+            return None
+
+        vector = self._unit(embed())
+        with self._lock:
+            candidates = [(key, entry) for key, entry in self._entries.items()
+                          if entry.scope == scope and entry.vector is not None
+                          and len(entry.vector) == len(vector)]
+            if not candidates:
+                return None
+            similarities = np.stack([entry.vector for _, entry in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return self._hit(candidates[best][0], float(similarities[best]))
+
+    def _hit(self, key: int, similarity: float) -> Tuple[CachedAnswer, float]:
+        entry = self._entries[key]
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        self._stats['hits'] += 1
+        return entry, similarity
+
+    def store(self, scope: tuple, query: str, vector: Optional[Iterable[float]], answer: str,
+              latency: float, tokens: int = 0):
+        """
+        생성한 답변 저장
+
+        Args:
+            vector: 질의 임베딩 (None이면 정규화 질의가 같을 때만 적중)
+            latency: 검색+생성 소요 시간
+            tokens: 사용 토큰 수
+        """
+        if not answer:
+            return
+        entry = CachedAnswer(scope, normalize_query(query), None if vector is None else self._unit(vector),
+                             answer, time.time(), latency, tokens)
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_saving(self, entry: CachedAnswer, served_in: float):
+        """적중 답변을 served_in초에 제공했을 때 절약량 집계"""
+        with self._lock:
+            self._stats['latency_saved'] += max(0.0, entry.latency - served_in)
+            self._stats['tokens_saved'] += entry.tokens
+
+    def metrics(self) -> Dict:
+        """{'lookups', 'hits', 'hit_rate', 'latency_saved', 'tokens_saved', 'entries'}"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['hit_rate'] = stats['hits'] / stats['lookups'] * 100 if stats['lookups'] else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def replay_answer(answer: str, delay: float = REPLAY_DELAY) -> Iterator[str]:
+    """캐시된 답변을 어절 단위로 흘려보냄 (st.write_stream용)"""
+    for piece in re.findall(r'\S+\s*|\s+', answer):
+        yield piece
+        if delay:
+            time.sleep(delay)
+
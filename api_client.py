@@ -0,0 +1,119 @@
+"""
+관광 컨시어지 API 클라이언트
+
+api_server의 HTTP 엔드포인트를 ConciergeService와 같은 메서드로 감쌉니다.
+Streamlit 앱은 CONCIERGE_API_URL이 설정되면 이 클라이언트를 쓰고(얇은 클라이언트),
+없으면 같은 프로세스의 ConciergeService를 직접 씁니다.
+"""
+import json
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Tuple
+
+import httpx
+
+from concierge import ChatSettings, ChatTurn, SORT_KEYS
+from itinerary_planner import ItinerarySpec
+from review_timeline import DECAY_HALF_LIFE_DAYS
+
+SORT_NAMES = {key: name for name, key in SORT_KEYS.items()}
+REQUEST_TIMEOUT = 60.0
+
+
+class ConciergeClient:
+    """원격 ConciergeService (api_server)"""
+
+    def __init__(self, base_url: str, timeout: float = REQUEST_TIMEOUT):
+        self._http = httpx.Client(base_url=base_url.rstrip('/'), timeout=timeout)
+
+    def _get(self, path: str, **params):
+        response = self._http.get(path, params={k: v for k, v in params.items() if v is not None})
+        response.raise_for_status()
+        return response.json()
+
+    def _post(self, path: str, body: Dict):
+        response = self._http.post(path, json=body)
+        response.raise_for_status()
+        return response.json()
+
+    def snapshot_info(self) -> Dict:
+        return self._get("/snapshot")
+
+    def place_names(self) -> List[str]:
+        return self._get("/places")
+
+    def top_places(self, category: str = None, sort_by: str = 'revisit_rate', limit: int = 10,
+                   offset: int = 0, days: int = None) -> List[Tuple]:
+        ranked = self._get("/places/top", category=category, sort_by=SORT_NAMES[sort_by],
+                           limit=limit, offset=offset, days=days)
+        return [(item['place'], item['stats']) for item in ranked]
+
+    def count_places(self, category: str = None, sort_by: str = 'revisit_rate', days: int = None) -> int:
+        return self._get("/places/count", category=category, sort_by=SORT_NAMES[sort_by], days=days)['count']
+
+    def trending_places(self, category: str = None, limit: int = 10,
+                        half_life_days: float = DECAY_HALF_LIFE_DAYS) -> List[Tuple]:
+        ranked = self._get("/places/trending", category=category, limit=limit, half_life_days=half_life_days)
+        return [(item['place'], item['stats']) for item in ranked]
+
+    def itinerary(self, duration: str = "1박 2일", categories: List[str] = None,
+                  priorities: str = "재방문율", seed: int = None) -> Dict:
+        return self._post("/itinerary", {'duration': duration, 'categories': categories,
+                                         'priorities': priorities, 'seed': seed})
+
+    def itinerary_batch(self, specs: List[ItinerarySpec], workers: int = None) -> List[Dict]:
+        body = {'specs': [asdict(spec) for spec in specs], 'workers': workers}
+        return self._post("/itinerary/batch", body)['plans']
+
+    def compare(self, place1: str, place2: str) -> Dict:
+        return self._get("/places/compare", place1=place1, place2=place2)
+
+    def statistics(self, category: str = None) -> Dict:
+        return self._get("/stats", category=category)
+
+    def cache_metrics(self) -> Dict:
+        return self._get("/cache")
+
+    def chat(self, messages: List[Dict], settings: ChatSettings,
+             conversation_state: Dict = None) -> ChatTurn:
+        turn = ChatTurn()
+        if conversation_state is not None:
+            turn.conversation_state = conversation_state
+        body = {**asdict(settings), 'messages': messages, 'conversation_state': turn.conversation_state}
+        turn.chunks = self._chat_chunks(turn, body)
+        return turn
+
+    def _chat_chunks(self, turn: ChatTurn, body: Dict) -> Iterator[str]:
+        with self._http.stream("POST", "/chat", json=body) as response:
+            response.raise_for_status()
+            for event, data in read_sse(response.iter_lines()):
+                if event == 'token':
+                    yield data['text']
+                elif event == 'error':
+                    raise RuntimeError(data['message'])
+                elif event == 'done':
+                    turn.cached = data['cached']
+                    turn.similarity = data['similarity']
+                    turn.prompt_stats = data['prompt_stats']
+                    turn.usage.update(data['usage'])
+                    # 호출자가 넘긴 dict를 제자리에서 갱신 (세션 상태와 같은 객체)
+                    turn.conversation_state.update(data['conversation_state'])
+
+    def warm_up(self):
+        """채팅 스택은 API 서버가 준비하므로 할 일 없음 (ConciergeService와 같은 인터페이스)"""
+
+    def close(self):
+        self._http.close()
+
+
+def read_sse(lines: Iterator[str]) -> Iterator[Tuple[str, Dict]]:
+    """SSE 줄 스트림 → (이벤트 이름, JSON 데이터)"""
+    event, data = 'message', []
+    for line in lines:
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = 'message', []
+        elif line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data.append(line[5:].strip())
@@ -0,0 +1,220 @@
+"""
+관광 컨시어지 ASGI API (FastAPI)
+
+Streamlit 없이 같은 기능을 JSON 엔드포인트로 제공하고, 채팅은 SSE로 스트리밍합니다.
+
+실행:
+    uvicorn api_server:app --host 0.0.0.0 --port 8000 --workers 4
+
+워커 프로세스는 각자 ConciergeService를 만들지만 리뷰 테이블은 같은 Arrow 캐시 파일을
+메모리 맵으로 읽으므로 페이지를 공유하고, 스냅샷 식별자(fingerprint)도 파일 해시 기반이라
+어느 워커가 응답해도 같습니다. 대화 상태(누적 요약)는 클라이언트가 보관해 매 요청에 보내므로
+워커 간 세션 고정(sticky session)이 필요 없습니다.
+
+환경 변수: OPENAI_API_KEY, OPENAI_BASE_URL, REVIEWS_BASE_PATH
+"""
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from concierge import ChatSettings, ConciergeService, INDEX_MODES, SORT_KEYS, service_from_env
+from embedding_backends import OPENAI_BACKEND
+from itinerary_planner import ItinerarySpec
+from review_timeline import DECAY_HALF_LIFE_DAYS
+
+# 일괄 일정 요청당 최대 명세 수
+MAX_BATCH_SPECS = 1000
+
+
+class ItineraryRequest(BaseModel):
+    duration: str = "1박 2일"
+    categories: Optional[List[str]] = None
+    priorities: str = "재방문율"
+    seed: Optional[int] = None
+
+
+class ItineraryBatchRequest(BaseModel):
+    specs: List[ItineraryRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SPECS)
+    workers: Optional[int] = Field(None, ge=1, le=32)
+
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = Field(5, ge=1, le=20)
+    embedding_backend: str = OPENAI_BACKEND
+    index_mode: str = INDEX_MODES[0]
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class ChatBody(BaseModel):
+    messages: List[ChatMessage]
+    model: str = "gpt-4o-mini"
+    temperature: float = Field(0.7, ge=0.0, le=2.0)
+    k: int = Field(5, ge=1, le=20)
+    embedding_backend: str = OPENAI_BACKEND
+    index_mode: str = INDEX_MODES[0]
+    conversation_state: Dict = Field(default_factory=lambda: {'summary': '', 'summarized': 0})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if getattr(app.state, 'service', None) is None:
+        app.state.service = service_from_env()
+    # 채팅 스택은 첫 /chat·/search 전에 백그라운드에서 불러 둠 (워커 시작은 기다리지 않음)
+    app.state.service.warm_up()
+    yield
+    app.state.service.close()
+
+
+def create_app(service: ConciergeService = None) -> FastAPI:
+    """서비스를 주입해 앱 생성 (없으면 시작 시 환경 변수로 생성)"""
+    app = FastAPI(title="강원도 관광 AI 컨시어지 API", lifespan=lifespan)
+    app.state.service = service
+
+    def get_service(request: Request) -> ConciergeService:
+        return request.app.state.service
+
+    def sort_key(sort_by: str) -> str:
+        if sort_by not in SORT_KEYS:
+            raise HTTPException(422, f"정렬 기준은 {list(SORT_KEYS)} 중 하나")
+        return SORT_KEYS[sort_by]
+
+    def place_or_404(service: ConciergeService, place_name: str):
+        if place_name not in service.snapshot().place_analysis:
+            raise HTTPException(404, f"장소 없음: {place_name}")
+
+    @app.get("/health")
+    def health(request: Request):
+        return {'status': 'ok', 'snapshot': get_service(request).snapshot().fingerprint}
+
+    @app.get("/snapshot")
+    def snapshot(request: Request):
+        return get_service(request).snapshot_info()
+
+    @app.get("/places")
+    def places(request: Request):
+        return get_service(request).place_names()
+
+    @app.get("/places/top")
+    def top_places(request: Request, category: Optional[str] = None, sort_by: str = "재방문율",
+                   limit: int = Query(10, ge=1, le=100), offset: int = Query(0, ge=0),
+                   days: Optional[int] = Query(None, ge=1, le=3650)):
+        ranked = get_service(request).top_places(category, sort_key(sort_by), limit, offset, days)
+        return [{'place': name, 'stats': stats} for name, stats in ranked]
+
+    @app.get("/places/count")
+    def count_places(request: Request, category: Optional[str] = None, sort_by: str = "재방문율",
+                     days: Optional[int] = Query(None, ge=1, le=3650)):
+        return {'count': get_service(request).count_places(category, sort_key(sort_by), days)}
+
+    @app.get("/places/trending")
+    def trending_places(request: Request, category: Optional[str] = None,
+                        limit: int = Query(10, ge=1, le=100),
+                        half_life_days: float = Query(DECAY_HALF_LIFE_DAYS, gt=0, le=3650)):
+        ranked = get_service(request).trending_places(category, limit, half_life_days)
+        return [{'place': name, 'stats': stats} for name, stats in ranked]
+
+    @app.get("/places/compare")
+    def compare(request: Request, place1: str, place2: str):
+        service = get_service(request)
+        place_or_404(service, place1)
+        place_or_404(service, place2)
+        return service.compare(place1, place2)
+
+    @app.get("/stats")
+    def statistics(request: Request, category: Optional[str] = None):
+        return get_service(request).statistics(category)
+
+    @app.get("/cache")
+    def cache_metrics(request: Request):
+        return get_service(request).cache_metrics()
+
+    @app.post("/itinerary")
+    def itinerary(request: Request, body: ItineraryRequest):
+        try:
+            return get_service(request).itinerary(body.duration, body.categories, body.priorities, body.seed)
+        except ValueError as e:
+            raise HTTPException(422, str(e))
+
+    @app.post("/itinerary/batch")
+    def itinerary_batch(request: Request, body: ItineraryBatchRequest):
+        """
+        일괄 일정 생성 (입력 순서대로, 같은 명세는 한 번만 계산)
+
+        seed를 생략한 명세는 목록 위치를 seed로 사용하므로 같은 요청이면 같은 결과입니다.
+        """
+        specs = [ItinerarySpec(spec.duration, tuple(spec.categories or ()), spec.priorities,
+                               spec.seed if spec.seed is not None else position)
+                 for position, spec in enumerate(body.specs)]
+        try:
+            unique_specs = len({spec.normalized() for spec in specs})
+        except ValueError as e:
+            raise HTTPException(422, str(e))
+        service = get_service(request)
+        started = time.perf_counter()
+        plans = service.itinerary_batch(specs, body.workers)
+        return {
+            'snapshot': service.snapshot().fingerprint,
+            'unique_specs': unique_specs,
+            'seconds': time.perf_counter() - started,
+            'plans': plans,
+        }
+
+    @app.post("/search")
+    def search(request: Request, body: SearchRequest):
+        settings = ChatSettings(k=body.k, embedding_backend=body.embedding_backend, index_mode=body.index_mode)
+        docs = get_service(request).retrieve(body.query, settings)
+        return [{'content': doc.page_content, 'metadata': doc.metadata} for doc in docs]
+
+    @app.post("/chat")
+    async def chat(request: Request, body: ChatBody):
+        """
+        SSE 채팅 스트림
+
+        event: token → {"text"} (답변 조각)
+        event: done  → {"cached", "similarity", "prompt_stats", "usage", "conversation_state"}
+        event: error → {"message"}
+        """
+        if not body.messages or body.messages[-1].role != 'user':
+            raise HTTPException(422, "마지막 메시지는 사용자 질문이어야 합니다")
+        settings = ChatSettings(model=body.model, temperature=body.temperature, k=body.k,
+                                embedding_backend=body.embedding_backend, index_mode=body.index_mode)
+        turn = get_service(request).chat([m.model_dump() for m in body.messages], settings,
+                                         body.conversation_state)
+
+        async def events():
+            try:
+                # 검색·임베딩만 스레드에서, 답변 스트림은 게이트웨이 루프에서 (요청당 스레드를 붙잡지 않음)
+                async for chunk in turn:
+                    yield sse_event('token', {'text': chunk})
+            except Exception as e:
+                yield sse_event('error', {'message': str(e)})
+                return
+            yield sse_event('done', {
+                'cached': turn.cached,
+                'similarity': turn.similarity,
+                'prompt_stats': turn.prompt_stats,
+                'usage': turn.usage,
+                'conversation_state': turn.conversation_state,
+            })
+
+        return StreamingResponse(events(), media_type="text/event-stream",
+                                 headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    return app
+
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+app = create_app()
@@ -0,0 +1,798 @@
+"""
+성능 벤치마크
+
+사용법:
+    python benchmark.py cold-start
+    python benchmark.py startup --budget-ms 1500
+    python benchmark.py ingest
+    python benchmark.py memory
+    python benchmark.py sessions --sessions 10,100,500 --workers 2
+    python benchmark.py analytics --scales 1,10,100
+    python benchmark.py timeline --scales 1,10,50
+    python benchmark.py cube --scales 1,10
+    python benchmark.py ann --chunks 1000000 --dim 512
+    python benchmark.py gateway --users 50
+    python benchmark.py embed --chunks 5000
+    python benchmark.py rerun --runs 5
+    python benchmark.py ranking --places 100000
+    python benchmark.py itinerary --places 5000
+    python benchmark.py itinerary-batch --places 5000 --specs 1000
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import threading
+import tracemalloc
+import multiprocessing
+
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+from ann_index import QuantizedIVFIndex, KMEANS_SAMPLE
+from concierge import get_top_places, generate_itinerary
+from data_snapshot import SnapshotStore
+from embedding_pipeline import EmbeddingPipeline
+from llm_gateway import LLMGateway, ChatRequest
+from llm_stub import start_stub_server
+from place_analytics import analyze_places, file_key_of
+from place_ranking import PlaceRankingIndex
+from review_features import month_key
+from review_timeline import ReviewTimeline
+from stats_cube import StatsCubeIndex
+from itinerary_planner import DEFAULT_CATEGORIES, ItineraryPlanner, ItinerarySpec, plan_batch
+from review_store import (
+    REVIEWS_BASE_PATH, CATEGORIES, REVIEW_COLUMNS, list_review_files,
+    load_review_table, read_review_cache, ingest_review_files, normalize_review_table,
+)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# ============================================
+# 콜드 스타트: 엑셀 직접 파싱 vs 컬럼형 캐시
+# ============================================
+
+def legacy_load(base_path: str) -> int:
+    """기존 방식: 모든 엑셀을 iterrows로 dict 변환"""
+    total = 0
+    for category, file_path in list_review_files(base_path):
+        df = pd.read_excel(file_path)
+        for _, row in df.iterrows():
+            content = str(row.get('content', ''))
+            if content and content != 'nan':
+                total += 1
+    return total
+
+
+def bench_cold_start(base_path: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, 'reviews.arrow')
+
+        legacy_total, legacy_sec = timed(legacy_load, base_path)
+        print(f"기존 (엑셀 파싱)       : {legacy_sec:8.2f}s  ({legacy_total:,}개)")
+
+        (reviews, _), build_sec = timed(load_review_table, base_path, cache_path)
+        print(f"캐시 빌드 (최초 1회)   : {build_sec:8.2f}s  ({len(reviews):,}개)")
+
+        (reviews, _), warm_sec = timed(load_review_table, base_path, cache_path)
+        print(f"캐시 로딩 (변경 확인)  : {warm_sec:8.2f}s  ({len(reviews):,}개)")
+
+        (reviews, _), mmap_sec = timed(read_review_cache, cache_path)
+        print(f"캐시 메모리 맵만       : {mmap_sec:8.2f}s  ({len(reviews):,}개)")
+
+        print(f"→ 콜드 스타트 {legacy_sec / warm_sec:.1f}배 단축")
+
+
+# ============================================
+# 시작 시간: 모듈 가져오기 시간 (-X importtime), 채팅 스택 지연 로딩 확인
+# ============================================
+
+# 앱·API 워커가 시작할 때 가져오는 모듈
+STARTUP_MODULES = ['concierge']
+# 첫 채팅 전까지 가져오면 안 되는 무거운 LLM·벡터 스택
+DEFERRED_MODULES = ['chat_engine', 'openai', 'langchain_openai', 'langchain_community',
+                    'langchain_text_splitters', 'chromadb', 'tiktoken']
+STARTUP_BUDGET_MS = 1500
+
+
+def import_profile(modules: List[str], preload: List[str] = ()) -> tuple:
+    """
+    새 프로세스에서 modules를 가져온 -X importtime 결과
+
+    Returns:
+        (modules 누적 시간 ms, 최상위 패키지별 자체 시간 ms, 가져온 DEFERRED_MODULES)
+    """
+    code = "".join(f"import {name}\n" for name in list(preload) + modules)
+    code += f"import sys, json\nprint(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True,
+                            text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    cumulative, packages = 0.0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if name.strip() in modules and name[1:] == name.strip():
+            cumulative += int(cumulative_us) / 1000
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    return cumulative, packages, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(budget_ms: float = STARTUP_BUDGET_MS, runs: int = 3, top: int = 8):
+    profiles = [import_profile(STARTUP_MODULES) for _ in range(runs)]
+    startup_ms = sorted(p[0] for p in profiles)[runs // 2]
+    _, packages, loaded = profiles[0]
+    print(f"시작 모듈 {STARTUP_MODULES} 가져오기 {startup_ms:7.1f}ms (중앙값 {runs}회, 예산 {budget_ms:.0f}ms)")
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:28s} {ms:7.1f}ms")
+
+    deferred = sorted(import_profile(['chat_engine'], STARTUP_MODULES)[0] for _ in range(runs))[runs // 2]
+    eager = sorted(import_profile(STARTUP_MODULES + ['chat_engine'])[0] for _ in range(runs))[runs // 2]
+    print(f"채팅 스택 (첫 채팅 또는 백그라운드 준비 때): {deferred:7.1f}ms / 모두 시작 시 가져오면 {eager:7.1f}ms")
+
+    problems = []
+    if loaded:
+        problems.append(f"시작 시 가져오면 안 되는 모듈: {loaded}")
+    if startup_ms > budget_ms:
+        problems.append(f"시작 시간 {startup_ms:.0f}ms > 예산 {budget_ms:.0f}ms")
+    for problem in problems:
+        print(f"실패: {problem}")
+    if problems:
+        sys.exit(1)
+
+
+# ============================================
+# 병렬 수집: 워커 수별 처리 시간
+# ============================================
+
+def bench_ingest(base_path: str):
+    tasks = list_review_files(base_path)
+    baseline = None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        (frames, report), sec = timed(ingest_review_files, tasks, base_path, workers)
+        baseline = baseline or sec
+        print(f"워커 {workers:2d}개 : {sec:7.2f}s  ({report['rows_kept']:,}행, "
+              f"실패 {len(report['failures'])}개, {baseline / sec:.1f}배)")
+
+
+# ============================================
+# 메모리: 리뷰 dict 목록 vs 리뷰 테이블
+# ============================================
+
+def deep_size(records) -> int:
+    seen = set()
+    total = sys.getsizeof(records)
+    for record in records:
+        total += sys.getsizeof(record)
+        for value in record.values():
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+
+def bench_memory(base_path: str):
+    reviews, _ = load_review_table(base_path)
+    table_mb = reviews.memory_usage(deep=True).sum() / 1024 ** 2
+    records_mb = deep_size(reviews.astype(str).to_dict('records')) / 1024 ** 2
+    print(f"리뷰 dict 목록 : {records_mb:8.1f} MB")
+    print(f"리뷰 테이블    : {table_mb:8.1f} MB  ({records_mb / table_mb:.1f}배 절감)")
+
+
+# ============================================
+# 세션 메모리: 세션별 데이터 사본 vs 공유 스냅샷 참조
+# ============================================
+
+def traced_bytes(build: Callable[[], object]) -> tuple:
+    """build()가 만든 객체와 그 객체가 붙잡고 있는 Python 할당량(바이트)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return value, size
+
+
+def legacy_session_state(snapshot) -> dict:
+    """기존 방식: 세션마다 카테고리별 리뷰 dict 목록과 장소 분석 결과를 복사해 보관"""
+    reviews = snapshot.reviews[REVIEW_COLUMNS]
+    reviews_data = {str(category): group.astype(str).to_dict('records')
+                    for category, group in reviews.groupby('category', observed=True)}
+    return {'reviews_data': reviews_data, 'place_analysis': copy.deepcopy(snapshot.place_analysis),
+            'messages': []}
+
+
+def shared_session_state(snapshot) -> dict:
+    """공유 스냅샷: 세션에는 스냅샷 식별자와 대화 상태만"""
+    return {'snapshot_version': snapshot.fingerprint, 'messages': [],
+            'conversation_state': {'summary': '', 'summarized': 0}}
+
+
+def mapping_memory(path: str) -> dict:
+    """현재 프로세스 메모리(MB): 전체 Rss/Pss와 path 메모리 맵의 Rss/Pss (Linux /proc 기준)"""
+    usage = {'rss': 0, 'pss': 0, 'map_rss': 0, 'map_pss': 0}
+    target = os.path.realpath(path)
+    in_target = False
+    with open('/proc/self/smaps') as smaps:
+        for line in smaps:
+            parts = line.split()
+            if not parts[0].endswith(':'):
+                in_target = parts[-1] == target
+            elif parts[0] in ('Rss:', 'Pss:'):
+                kb = int(parts[1])
+                usage[parts[0][:-1].lower()] += kb
+                if in_target:
+                    usage['map_' + parts[0][:-1].lower()] += kb
+    return {key: value / 1024 for key, value in usage.items()}
+
+
+def worker_memory(base_path: str, barrier, results):
+    """워커 프로세스 하나: 스냅샷을 만들고, 모든 워커가 올라온 뒤 메모리 측정"""
+    store = SnapshotStore(base_path)
+    store.refresh()
+    len(store.current().reviews['content'].str.len())  # 본문 페이지를 실제로 읽음
+    barrier.wait()
+    results.put(mapping_memory(store.cache_path))
+    barrier.wait()
+
+
+def bench_workers(base_path: str, workers: int):
+    """워커 프로세스 여러 개: 캐시 파일 페이지는 물리 사본 하나를 나눠 씀 (Pss = Rss / 워커 수)"""
+    context = multiprocessing.get_context('spawn')
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [context.Process(target=worker_memory, args=(base_path, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    usages = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    print(f"워커 프로세스 {workers}개:")
+    for n, usage in enumerate(usages):
+        print(f"  워커 {n}: Rss {usage['rss']:6.0f} MB / Pss {usage['pss']:6.0f} MB, "
+              f"리뷰 캐시 맵 Rss {usage['map_rss']:5.0f} MB / Pss {usage['map_pss']:5.0f} MB")
+    print(f"  리뷰 캐시 물리 사용량 {sum(u['map_pss'] for u in usages):.0f} MB "
+          f"(워커마다 사본이면 {sum(u['map_rss'] for u in usages):.0f} MB)")
+
+
+def bench_sessions(base_path: str, session_counts: List[int], workers: int = 2):
+    # 워커 측정을 먼저 (이 프로세스가 캐시를 매핑하기 전)
+    if workers > 0 and os.path.exists('/proc/self/smaps'):
+        bench_workers(base_path, workers)
+
+    store = SnapshotStore(base_path)
+    store.refresh()
+    snapshot = store.current()
+    print(f"리뷰 {snapshot.total_reviews:,}개, 장소 {len(snapshot.place_analysis):,}곳")
+
+    # 세션별 사본은 너무 커서 1세션만 측정하고 선형으로 곱함 (세션끼리 공유하는 것이 없으므로)
+    legacy, legacy_bytes = traced_bytes(lambda: legacy_session_state(snapshot))
+    del legacy
+    print(f"{'세션 수':>6} | {'세션별 사본':>12} | {'공유 스냅샷':>12}")
+    for count in session_counts:
+        sessions, shared_bytes = traced_bytes(lambda: [shared_session_state(snapshot) for _ in range(count)])
+        print(f"{count:>6} | {legacy_bytes * count / 1024 ** 2:>9,.0f} MB | {shared_bytes / 1024 ** 2:>9.2f} MB")
+        del sessions
+    print(f"(공유 스냅샷은 세션 수와 무관하게 프로세스당 1개: 리뷰 테이블 "
+          f"{snapshot.reviews.memory_usage(deep=True).sum() / 1024 ** 2:.0f} MB, 본문은 캐시 파일 메모리 맵)")
+
+
+# ============================================
+# 장소 분석: 코퍼스 배수별 처리 시간 (선형 확장 확인)
+# ============================================
+
+def scaled_reviews(reviews: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """리뷰 테이블을 scale배로 복제 (장소 수도 scale배)"""
+    if scale == 1:
+        return reviews
+    copies = []
+    for i in range(scale):
+        copy = reviews.copy()
+        copy['place_name'] = copy['place_name'].cat.rename_categories(lambda name: f"{name}#{i}")
+        copies.append(copy)
+    return normalize_review_table(pd.concat(copies, ignore_index=True))
+
+
+def bench_analytics(base_path: str, scales: List[int]):
+    reviews, _ = load_review_table(base_path)
+    base_sec = None
+    for scale in scales:
+        table = scaled_reviews(reviews, scale)
+        _, sec = timed(analyze_places, table)
+        base_sec = base_sec or sec / scale
+        # 특징 컬럼 없이 본문을 정규식으로 다시 훑는 경우 (수집 시 특징 계산 전 방식)
+        _, scan_sec = timed(analyze_places, table[REVIEW_COLUMNS])
+        print(f"{scale:4d}배 ({len(table):>11,}행): {sec:8.2f}s  "
+              f"({len(table) / sec:,.0f}행/s, 선형 대비 {sec / (base_sec * scale):.2f}) "
+              f"/ 본문 스캔 포함 {scan_sec:8.2f}s")
+
+
+# ============================================
+# 기간 통계: 리뷰 이력 길이별 최근 90일 조회 (월 파티션 vs 전체 필터)
+# ============================================
+
+def history_reviews(reviews: pd.DataFrame, years: int) -> pd.DataFrame:
+    """같은 리뷰를 1년씩 과거로 옮긴 복사본을 붙여 이력을 years배로 확장 (장소 수는 그대로)"""
+    copies = []
+    for i in range(years):
+        copy = reviews.copy()
+        copy['review_date'] = copy['review_date'] - pd.DateOffset(years=i)
+        copy['review_month'] = month_key(copy['review_date'])
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def bench_timeline(base_path: str, scales: List[int], days: int = 90):
+    reviews, _ = load_review_table(base_path)
+    place_analysis = analyze_places(reviews)
+    for years in scales:
+        table = history_reviews(reviews, years)
+        timeline, build_sec = timed(ReviewTimeline, table, place_analysis)
+        end = timeline.latest
+
+        def full_scan():
+            rows = table[(table['review_date'] > end - pd.Timedelta(days=days)) & (table['review_date'] <= end)]
+            return rows.groupby('place_name', observed=True).agg(n=('is_revisit', 'size'), r=('is_revisit', 'sum'))
+
+        _, scan_sec = timed(full_scan)
+        # 캐시를 거치지 않은 파티션 조회 시간
+        _, window_sec = timed(lambda: timeline._aggregate(
+            timeline.rows_between(end - pd.Timedelta(days=days - 1), end)))
+        _, decay_sec = timed(timeline.decayed_stats)
+        print(f"이력 {years:3d}배 ({len(table):>11,}행): 색인 {build_sec * 1000:7.1f}ms / 최근 {days}일 "
+              f"파티션 {window_sec * 1000:7.1f}ms vs 전체 필터 {scan_sec * 1000:8.1f}ms / "
+              f"감쇠 {decay_sec * 1000:7.1f}ms")
+
+
+# ============================================
+# 통계 큐브: 전체 빌드 / 파일 하나 증분 갱신 / 드릴다운 조회 vs 매번 집계
+# ============================================
+
+def bench_cube(base_path: str, scales: List[int]):
+    reviews, report = load_review_table(base_path)
+    file_versions = report['file_versions']
+    for years in scales:
+        table = history_reviews(reviews, years)
+        index = StatsCubeIndex()
+        cube, build_sec = timed(index.sync, table, file_versions)
+
+        # 파일 하나가 바뀜: 그 파일 리뷰의 절반을 지운 테이블
+        key = next(iter(file_versions))
+        rows = np.flatnonzero((file_key_of(table) == key).to_numpy())
+        updated = table.drop(index=table.index[rows[::2]])
+        changed = {**file_versions, key: 'changed'}
+        cube, update_sec = timed(index.sync, updated, changed)
+        rebuilt = StatsCubeIndex().sync(updated, changed)
+        assert all(np.isclose(cube.cell(c, m)[name], rebuilt.cell(c, m)[name])
+                   for c in [None] + rebuilt.categories for m in [None] + rebuilt.months
+                   for name in ('reviews', 'places', 'avg_place_revisit_rate')), "증분 결과가 전체 빌드와 다름"
+
+        slices = [None] + cube.categories
+
+        def lookups():
+            for category in slices:
+                cube.cell(category)
+                cube.series(category)
+
+        def scans():
+            for category in slices:
+                rows = updated if category is None else updated[(updated['category'] == category).to_numpy()]
+                rows.groupby('place_name', observed=True)['is_revisit'].agg(['size', 'sum'])
+                rows.groupby('review_month')['is_revisit'].agg(['size', 'sum'])
+
+        _, lookup_sec = timed(lookups)
+        _, scan_sec = timed(scans)
+        print(f"이력 {years:3d}배 ({len(table):>11,}행): 빌드 {build_sec:6.2f}s / 파일 1개 증분 갱신 "
+              f"{update_sec * 1000:7.1f}ms / 드릴다운 {len(slices)}건 조회 {lookup_sec * 1000:6.2f}ms "
+              f"vs 매번 집계 {scan_sec * 1000:8.1f}ms")
+
+
+# ============================================
+# ANN 검색: 청크 수별 지연 시간 / 재현율 / 메모리
+# ============================================
+
+def synthetic_vectors(rng, centers: np.ndarray, n: int, noise: float = 0.6) -> np.ndarray:
+    """군집 구조가 있는 정규화 벡터 (실제 임베딩과 비슷한 분포)"""
+    vectors = centers[rng.integers(0, len(centers), n)] + rng.normal(0, noise / np.sqrt(centers.shape[1]), (n, centers.shape[1]))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def bench_ann(chunks: int, dim: int, queries: int = 300, batch: int = 100_000):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(100, chunks // 200), dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    index = QuantizedIVFIndex(dim, QuantizedIVFIndex.suggested_nlist(chunks))
+    _, train_sec = timed(index.train, synthetic_vectors(rng, centers, min(chunks, KMEANS_SAMPLE)))
+    start = time.perf_counter()
+    for offset in range(0, chunks, batch):
+        n = min(batch, chunks - offset)
+        index.add(synthetic_vectors(rng, centers, n), np.arange(offset, offset + n))
+    index.compact()
+    add_sec = time.perf_counter() - start
+    print(f"{chunks:,}개 × {dim}차원, nlist={index.nlist}, nprobe={index.nprobe}")
+    print(f"학습 {train_sec:.1f}s / 추가 {add_sec:.1f}s / 인덱스 메모리 {index.memory_bytes() / 1024 ** 2:,.0f} MB "
+          f"(float32였다면 {chunks * dim * 4 / 1024 ** 2:,.0f} MB)")
+
+    query_vectors = synthetic_vectors(rng, centers, queries)
+    latencies = []
+    for q in query_vectors:
+        _, sec = timed(index.search, q, 10)
+        latencies.append(sec * 1000)
+    print(f"검색 지연 p50 {np.percentile(latencies, 50):.2f} ms / p95 {np.percentile(latencies, 95):.2f} ms")
+
+    # 재현율@10: 같은 양자화 벡터 전수 탐색 결과와 비교
+    hits = 0
+    sample = query_vectors[:min(50, queries)]
+    codes = np.concatenate(index._codes)
+    scales = np.concatenate(index._scales)
+    ids = np.concatenate(index._ids)
+    for q in sample:
+        exact = ids[np.argsort(-((codes @ q) * scales))[:10]]
+        _, found = index.search(q, 10)
+        hits += len(set(exact) & set(found))
+    print(f"재현율@10 {hits / (len(sample) * 10):.2f}")
+
+
+# ============================================
+# LLM 게이트웨이: 세션마다 새 클라이언트 vs 공유 게이트웨이
+# ============================================
+
+def run_users(users: int, requests_per_user: int, ask: Callable[[str], str], popular_share: float = 0.3):
+    """동시 사용자 스레드 실행 → (요청별 지연 목록, 오류 수)"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    popular = [f"인기 질문 {i}: 재방문율 높은 춘천 맛집 추천해줘" for i in range(5)]
+
+    def user(user_no: int):
+        rng = np.random.default_rng(user_no)
+        for request_no in range(requests_per_user):
+            if rng.random() < popular_share:
+                question = popular[rng.integers(len(popular))]
+            else:
+                question = f"사용자 {user_no}의 {request_no}번째 질문"
+            start = time.perf_counter()
+            try:
+                ask(question)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def bench_gateway(users: int, requests_per_user: int = 4, max_inflight: int = 20):
+    import openai
+
+    server, state, base_url = start_stub_server(delay=0.02, max_inflight=max_inflight)
+    print(f"동시 사용자 {users}명 × {requests_per_user}회, 스텁 서버 동시 처리 한도 {max_inflight}")
+
+    def report(name: str, latencies: List[float], errors: List[str], upstream: int):
+        if latencies:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(f"{name:<24}: p50 {p50:5.2f}s / p95 {p95:5.2f}s / p99 {p99:5.2f}s, "
+                  f"실패 {len(errors)}건, 업스트림 호출 {upstream}회")
+        else:
+            print(f"{name:<24}: 전부 실패 ({len(errors)}건)")
+
+    # 기존 방식: 요청마다 새 클라이언트, 클라이언트 기본 재시도만 사용
+    def naive(question: str) -> str:
+        client = openai.OpenAI(api_key="unused", base_url=base_url)
+        stream = client.chat.completions.create(
+            model="gpt-4o-mini", messages=[{'role': 'user', 'content': question}], stream=True)
+        return "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+
+    before = state.requests
+    latencies, errors = run_users(users, requests_per_user, naive)
+    report("요청마다 새 클라이언트", latencies, errors, state.requests - before)
+
+    # 업스트림 한도보다 약간 낮은 동시 실행 수로 429 자체를 피함
+    gateway = LLMGateway(max_concurrency=max(1, max_inflight - 2), requests_per_minute=60_000)
+
+    def via_gateway(question: str) -> str:
+        return gateway.complete(ChatRequest.from_messages(
+            "gpt-4o-mini", [{'role': 'user', 'content': question}], base_url=base_url))
+
+    before = state.requests
+    latencies, errors = run_users(users, requests_per_user, via_gateway)
+    report("공유 게이트웨이", latencies, errors, state.requests - before)
+    print(f"게이트웨이 통계: {gateway.stats}")
+    gateway.close()
+    server.shutdown()
+
+
+# ============================================
+# 임베딩: 고정 30개 순차 배치 vs 동시 파이프라인
+# ============================================
+
+def bench_embed(chunks: int, delay: float = 0.1, fail_rate: float = 0.05, max_inflight: int = 8):
+    from langchain_openai import OpenAIEmbeddings
+
+    server, state, base_url = start_stub_server(delay=delay, fail_rate=fail_rate, max_inflight=max_inflight,
+                                                retry_after=0.2)
+    rng = np.random.default_rng(0)
+    places = [f"장소{i}" for i in range(200)]
+    texts = [f"맛집 | {places[rng.integers(len(places))]} | 24.5.{i % 28 + 1}.월\n"
+             + "닭갈비가 맛있고 직원이 친절해요. " * int(rng.integers(1, 15)) for i in range(chunks)]
+    print(f"청크 {chunks:,}개, 스텁 서버 요청당 지연 {delay}s, 429 비율 {fail_rate:.0%}, 동시 처리 한도 {max_inflight}")
+
+    def client(**kwargs):
+        # 오프라인이라 tiktoken 인코딩을 받을 수 없으므로 문자열 그대로 전송
+        return OpenAIEmbeddings(api_key="unused", base_url=base_url, check_embedding_ctx_length=False, **kwargs)
+
+    # 기존 방식: 30개씩 순차 호출, 클라이언트 기본 재시도만 사용 (재시도가 바닥나면 빌드 전체 실패)
+    embeddings = client()
+    before = state.requests
+    start = time.perf_counter()
+    try:
+        for offset in range(0, chunks, 30):
+            embeddings.embed_documents(texts[offset:offset + 30])
+        seconds = time.perf_counter() - start
+        print(f"{'순차 30개 배치':<16}: {seconds:6.2f}s ({chunks / seconds:7.0f} 청크/s), "
+              f"업스트림 요청 {state.requests - before}회")
+    except Exception as e:
+        print(f"{'순차 30개 배치':<16}: 실패 {type(e).__name__} ({time.perf_counter() - start:.2f}s)")
+
+    def progress(stats):
+        print(f"  진행 {stats['embedded']:,}/{stats['chunks']:,} ({stats['chunks_per_second']:.0f} 청크/s, "
+              f"동시 {stats['concurrency']})", end="\r")
+
+    pipeline = EmbeddingPipeline(client(max_retries=0), max_concurrency=max_inflight * 2, progress=progress,
+                                 requests_per_minute=60_000, tokens_per_minute=None)
+    before = state.requests
+    vectors, failed, stats = pipeline.embed(texts)
+    print()
+    print(f"{'동시 파이프라인':<16}: {stats['seconds']:6.2f}s ({stats['chunks_per_second']:7.0f} 청크/s, "
+          f"{stats['tokens_per_second']:,.0f} 토큰/s), 업스트림 요청 {state.requests - before}회, "
+          f"배치 {stats['batches']}개, 재시도 {stats['retries']}회 (429 {stats['rate_limited']}회), 실패 {len(failed)}개")
+
+    # 같은 입력이면 같은 벡터 (순서 보존 확인)
+    sample = np.asarray(embeddings.embed_documents(texts[:5]), dtype=np.float32)
+    assert np.allclose(vectors[:5], sample, atol=1e-6)
+    server.shutdown()
+
+
+# ============================================
+# 화면 실행 시간: 전체 실행 vs 탭 fragment 단독 실행
+# ============================================
+
+def bench_rerun(runs: int = 5):
+    """
+    앱을 AppTest로 runs번 실행하고 render_log(범위별 서버 실행 시간)를 집계
+
+    AppTest는 fragment도 전체 실행으로 처리하므로, 탭 조작 시 실제 서버 시간은
+    그 탭 범위의 시간입니다 (이전 구조에서는 조작마다 '전체' 시간).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'),
+                            default_timeout=600)
+    app.run()  # 첫 실행은 스냅샷 로딩 포함이라 제외
+    app.session_state.render_log = []
+    for _ in range(runs):
+        app.run()
+    if app.exception:
+        print(f"앱 오류: {app.exception[0].value}")
+        return
+
+    log = pd.DataFrame(app.session_state.render_log)
+    summary = log.groupby('범위', sort=False)['ms'].mean()
+    full = summary.get('전체')
+    print(f"실행 {runs}회 평균 서버 시간:")
+    for scope, ms in summary.items():
+        note = "" if scope == '전체' else f"  (이 탭만 조작하면 전체 실행의 {ms / full:.0%})"
+        print(f"  {scope:<8}: {ms:7.1f} ms{note}")
+
+
+# ============================================
+# 상위 장소: 매번 정렬 vs 순위 색인
+# ============================================
+
+def synthetic_places(rng, n: int, categories: List[str] = CATEGORIES[:3]) -> dict:
+    """n개 장소의 통계 (place_analysis와 같은 구조)"""
+    totals = rng.integers(1, 500, n)
+    revisits = rng.binomial(totals, rng.uniform(0, 0.6, n))
+    positives = rng.binomial(totals, rng.uniform(0.3, 0.95, n))
+    categories = rng.choice(categories, n)
+    return {
+        f"장소{i}": {
+            'category': str(categories[i]),
+            'total_reviews': int(totals[i]),
+            'revisit_count': int(revisits[i]),
+            'positive_count': int(positives[i]),
+            'avg_visit_count': float(rng.uniform(1, 5)),
+            'revisit_rate': revisits[i] / totals[i] * 100,
+            'positive_rate': positives[i] / totals[i] * 100,
+            'recent_reviews': [],
+        }
+        for i in range(n)
+    }
+
+
+def bench_ranking(places: int, changes: int = 100, repeat: int = 20):
+    rng = np.random.default_rng(0)
+    place_analysis = synthetic_places(rng, places)
+    queries = [(category, key) for category in [None] + CATEGORIES[:3]
+               for key in ('revisit_rate', 'positive_rate', 'total_reviews')]
+
+    def per_call(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    ranking = PlaceRankingIndex(place_analysis)
+    _, build_sec = timed(lambda: [ranking.top(category, key) for category, key in queries])
+
+    print(f"장소 {places:,}곳, 조회 조건 {len(queries)}개")
+    print(f"  색인 구성 (조건 {len(queries)}개 전체): {build_sec * 1000:8.1f}ms (스냅샷당 1회)")
+    for label, limit, offset in [("상위 20", 20, 0), ("5페이지 (20개)", 20, 80)]:
+        legacy = per_call(lambda: get_top_places(place_analysis, '맛집 리뷰', 'revisit_rate', limit, offset))
+        indexed = per_call(lambda: get_top_places(place_analysis, '맛집 리뷰', 'revisit_rate', limit, offset,
+                                                  ranking))
+        print(f"  {label:14s}: 정렬 {legacy:8.2f}ms → 색인 {indexed:8.4f}ms ({legacy / indexed:,.0f}배)")
+
+    legacy = per_call(lambda: generate_itinerary(place_analysis, "2박 3일"))
+    indexed = per_call(lambda: generate_itinerary(place_analysis, "2박 3일", ranking=ranking))
+    print(f"  {'일정 생성':14s}: 정렬 {legacy:8.2f}ms → 색인 {indexed:8.4f}ms ({legacy / indexed:,.0f}배)")
+
+    # 일부 장소 통계 변경 → 새 스냅샷
+    updated = dict(place_analysis)
+    changed = [f"장소{i}" for i in rng.choice(places, changes, replace=False)]
+    for name, stats in zip(changed, synthetic_places(rng, changes).values()):
+        updated[name] = stats
+    incremental, incremental_sec = timed(ranking.updated, updated, changed)
+    rebuilt = PlaceRankingIndex(updated)
+    _, rebuild_sec = timed(lambda: [rebuilt.top(category, key) for category, key in queries])
+    assert all(incremental.top(c, k, 100) == rebuilt.top(c, k, 100) for c, k in queries)
+    print(f"  {changes}곳 변경 반영: 전체 재구성 {rebuild_sec * 1000:8.1f}ms → 증분 {incremental_sec * 1000:8.1f}ms")
+
+
+# ============================================
+# 일정 생성: 무작위 선택 vs 거리 기반 최적화
+# ============================================
+
+def bench_itinerary(places: int, plans: int = 200):
+    rng = np.random.default_rng(0)
+    place_analysis = synthetic_places(rng, places, DEFAULT_CATEGORIES)
+    # 강원도 전역에 시·군 단위 군집으로 흩어진 좌표
+    towns = np.column_stack([rng.uniform(37.1, 38.5, 18), rng.uniform(127.2, 129.3, 18)])
+    town_of = rng.integers(0, len(towns), places)
+    coords = towns[town_of] + rng.normal(0, 0.03, (places, 2))
+    gazetteer = {name: tuple(coords[i]) for i, name in enumerate(place_analysis)}
+
+    ranking = PlaceRankingIndex(place_analysis)
+    planner, build_sec = timed(ItineraryPlanner, place_analysis, ranking, gazetteer)
+    pool_size = max(len(pool) for pool in planner.pools.values())
+    print(f"장소 {places:,}곳, 후보 {len(planner.names):,}곳 (카테고리×우선순위별 최대 {pool_size:,}), "
+          f"이동 시간 행렬 구성 {build_sec * 1000:.0f}ms")
+
+    latencies, travel = [], []
+    for seed in range(plans):
+        itinerary, sec = timed(planner.plan, "2박 3일", None, "재방문율", seed)
+        latencies.append(sec * 1000)
+        travel.append(sum(day['travel_minutes'] for day in itinerary['days']))
+
+    # 기존 방식: 같은 후보 풀의 상위 1/3에서 무작위 선택
+    index = {name: i for i, name in enumerate(planner.names)}
+    random_travel = []
+    for seed in range(plans):
+        picker = random.Random(seed)
+        used, total = set(), 0.0
+        for day in planner.plan("2박 3일", None, "재방문율", seed)['days']:
+            prev = None
+            for activity in day['activities']:
+                pool = [planner.names[i] for i in planner.pools[(f"{activity['type']} 리뷰", 'revisit_rate')]
+                        if planner.names[i] not in used]
+                choice = picker.choice(pool[:max(1, len(pool) // 3)])
+                used.add(choice)
+                if prev is not None:
+                    total += planner.minutes[index[prev], index[choice]]
+                prev = choice
+        random_travel.append(total)
+
+    print(f"  계획 {plans}개: p50 {np.percentile(latencies, 50):.1f}ms, p95 {np.percentile(latencies, 95):.1f}ms")
+    print(f"  2박 3일 총 이동: 무작위 선택 {np.mean(random_travel):,.0f}분 → 최적화 {np.mean(travel):,.0f}분")
+
+
+def bench_itinerary_batch(places: int, specs: int, duplicate_share: float = 0.2):
+    rng = np.random.default_rng(0)
+    place_analysis = synthetic_places(rng, places, DEFAULT_CATEGORIES)
+    coords = np.column_stack([rng.uniform(37.1, 38.5, places), rng.uniform(127.2, 129.3, places)])
+    gazetteer = {name: tuple(coords[i]) for i, name in enumerate(place_analysis)}
+    planner = ItineraryPlanner(place_analysis, PlaceRankingIndex(place_analysis), gazetteer)
+
+    # 기간 × 카테고리 조합 × 우선순위 × 시드, 일부는 같은 명세 반복
+    mixes = [tuple(DEFAULT_CATEGORIES), ('맛집 리뷰', '명소 리뷰'), ('명소 리뷰', '카페 리뷰')]
+    batch = [ItinerarySpec(["1박 2일", "2박 3일", "3박 4일"][i % 3], mixes[i % len(mixes)],
+                           ["재방문율", "긍정 평가"][i % 2], i) for i in range(specs)]
+    for i in rng.choice(specs, int(specs * duplicate_share), replace=False):
+        batch[i] = batch[int(rng.integers(0, specs))]
+    unique = len({spec.normalized() for spec in batch})
+    print(f"장소 {places:,}곳, 명세 {specs}개 (고유 {unique}개)")
+
+    baseline = None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        plans, sec = timed(plan_batch, planner, batch, workers)
+        baseline = baseline or plans
+        assert plans == baseline, "워커 수에 따라 결과가 달라짐"
+        print(f"  워커 {workers:2d}: {sec:6.2f}s  {specs / sec:8,.0f} 계획/s")
+
+    sequential, sec = timed(lambda: [planner.plan_spec(spec) for spec in batch])
+    assert sequential == baseline
+    print(f"  (중복 제거 없이 하나씩: {sec:6.2f}s  {specs / sec:8,.0f} 계획/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="성능 벤치마크")
+    parser.add_argument('name', choices=['cold-start', 'startup', 'ingest', 'memory', 'sessions', 'analytics', 'timeline', 'cube', 'ann', 'gateway',
+                                             'embed', 'rerun', 'ranking', 'itinerary', 'itinerary-batch'])
+    parser.add_argument('--base-path', default=REVIEWS_BASE_PATH)
+    parser.add_argument('--scales', default='1,10,100', help="코퍼스 배수 (쉼표 구분)")
+    parser.add_argument('--chunks', type=int, default=None, help="청크 수 (ANN 기본 1000000, 임베딩 기본 5000)")
+    parser.add_argument('--dim', type=int, default=512, help="ANN 벤치마크 벡터 차원")
+    parser.add_argument('--sessions', default='10,100,500', help="세션 메모리 벤치마크 세션 수 (쉼표 구분)")
+    parser.add_argument('--workers', type=int, default=2, help="세션 메모리 벤치마크 워커 프로세스 수")
+    parser.add_argument('--runs', type=int, default=5, help="화면 실행 시간 벤치마크 실행 횟수")
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help="시작 모듈 가져오기 시간 예산 (넘거나 채팅 스택을 가져오면 종료 코드 1)")
+    parser.add_argument('--users', type=int, default=50, help="게이트웨이 벤치마크 동시 사용자 수")
+    parser.add_argument('--specs', type=int, default=1000, help="일괄 일정 벤치마크 명세 수")
+    parser.add_argument('--places', type=int, default=None,
+                        help="장소 수 (순위 색인 기본 100000, 일정 기본 5000)")
+    args = parser.parse_args()
+
+    if args.name == 'cold-start':
+        bench_cold_start(args.base_path)
+    elif args.name == 'startup':
+        bench_startup(args.budget_ms)
+    elif args.name == 'ingest':
+        bench_ingest(args.base_path)
+    elif args.name == 'memory':
+        bench_memory(args.base_path)
+    elif args.name == 'sessions':
+        bench_sessions(args.base_path, [int(x) for x in args.sessions.split(',')], args.workers)
+    elif args.name == 'analytics':
+        bench_analytics(args.base_path, [int(x) for x in args.scales.split(',')])
+    elif args.name == 'timeline':
+        bench_timeline(args.base_path, [int(x) for x in args.scales.split(',')])
+    elif args.name == 'cube':
+        bench_cube(args.base_path, [int(x) for x in args.scales.split(',')])
+    elif args.name == 'ann':
+        bench_ann(args.chunks or 1_000_000, args.dim)
+    elif args.name == 'gateway':
+        bench_gateway(args.users)
+    elif args.name == 'embed':
+        bench_embed(args.chunks or 5000)
+    elif args.name == 'rerun':
+        bench_rerun(args.runs)
+    elif args.name == 'ranking':
+        bench_ranking(args.places or 100_000)
+    elif args.name == 'itinerary':
+        bench_itinerary(args.places or 5000)
+    elif args.name == 'itinerary-batch':
+        bench_itinerary_batch(args.places or 5000, args.specs)
+
+
+if __name__ == '__main__':
+    main()
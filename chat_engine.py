@@ -0,0 +1,317 @@
+"""
+채팅/RAG 하위 시스템 (LangChain, Chroma, OpenAI)
+
+무거운 LLM·벡터 스택(langchain_*, chromadb, openai, tiktoken)은 이 모듈에서만 import 합니다.
+ConciergeService는 첫 채팅·검색 요청 때 이 모듈을 불러 ChatEngine을 만들거나
+(chat_engine), 첫 화면을 그린 뒤 백그라운드 스레드에서 미리 불러 둡니다(warm_up).
+TOP 추천·일정·비교·통계만 쓰는 세션과 워커는 이 비용을 내지 않습니다.
+
+가져오기 시간은 `python benchmark.py startup`으로 확인합니다.
+"""
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from review_store import CATEGORIES
+from data_snapshot import DataSnapshot
+from place_ranking import PlaceRankingIndex
+from review_timeline import DECAY_HALF_LIFE_DAYS
+from concierge import ChatSettings, ChatTurn, get_top_places, price_text
+from vector_index import (
+    sync_vector_store, prepare_full_review_documents, build_full_review_store, embedding_model_name,
+)
+from embedding_backends import get_embeddings
+from embedding_pipeline import get_embedding_pipeline
+from hybrid_search import BM25Index, HybridRetriever
+from query_router import match_category, match_place_name, route_query
+from answer_cache import REPLAY_DELAY, cache_scope, replay_answer
+from context_budget import ContextBudget, llm_summarizer
+from llm_gateway import LLMGateway, ChatRequest
+
+# 스냅샷마다 보관할 검색 인덱스 수 (임베딩 × 범위)
+MAX_VECTOR_STORES = 2
+SUMMARY_MODEL = "gpt-4o-mini"
+
+SYSTEM_PROMPT = """강원도 관광 AI 컨시어지입니다.
+
+**역할**: 실제 방문객 리뷰 기반 신뢰할 수 있는 정보 제공
+
+**답변 원칙**:
+1. 재방문율과 긍정 평가 높은 장소 우선 추천
+2. 리뷰 통계 명시 (총 리뷰 수, 재방문율, 긍정률)
+3. 실제 방문객 의견 요약
+4. 간결하고 명확하게
+
+**컨텍스트**:
+{context}
+
+**형식**: 장소명, 통계, 특징을 포함하여 간결하게 작성"""
+
+
+# ============================================
+# 토큰 최적화된 RAG 문서 준비
+# ============================================
+
+def prepare_review_documents_optimized(
+    place_analysis: Dict,
+    user_query: str = "",
+    ranking: PlaceRankingIndex = None
+) -> List[str]:
+    """
+    토큰 최적화: 사용자 쿼리와 관련성 높은 장소만 선택
+    """
+    documents = []
+
+    # 카테고리 필터링
+    category = match_category(user_query)
+    target_categories = [category] if category else CATEGORIES
+
+    # 상위 장소만 선택 (토큰 절약)
+    for category in target_categories:
+        top_places = get_top_places(place_analysis, category, 'revisit_rate', limit=15, ranking=ranking)
+
+        for place_name, stats in top_places:
+            # 간결한 문서 생성
+            doc = f"""{category.replace(' 리뷰', '')} | {place_name}
+리뷰:{stats['total_reviews']}개 재방문율:{stats['revisit_rate']:.0f}% 긍정:{stats['positive_rate']:.0f}%
+"""
+            # 수집 시 계산한 가격·키워드 (요청 중 본문 스캔 없음)
+            price = price_text(stats)
+            if price:
+                doc += f"가격:{price}\n"
+            if stats.get('keywords'):
+                doc += f"키워드:{','.join(stats['keywords'])}\n"
+            doc += "\n주요리뷰:\n"
+            for idx, review in enumerate(stats['recent_reviews'][:2], 1):  # 2개만
+                content = review.get('content', '')[:150]  # 150자로 제한
+                doc += f"{idx}.{content}\n"
+
+            documents.append(doc)
+
+    return documents
+
+
+def trending_document(trending: List[Tuple], half_life_days: float, as_of: str) -> str:
+    """요즘 뜨는 곳 문서 (최근 리뷰 가중 순위, 최근 질의일 때 검색 문서 앞에 추가)"""
+    doc = f"요즘 뜨는 곳 (최근 리뷰 가중, 반감기 {half_life_days:g}일, {as_of} 기준)\n"
+    for idx, (place_name, stats) in enumerate(trending, 1):
+        doc += (f"{idx}.{place_name}({stats['category'].replace(' 리뷰', '')}) "
+                f"최근가중리뷰:{stats['weighted_reviews']:.0f} 재방문율:{stats['revisit_rate']:.0f}% "
+                f"긍정:{stats['positive_rate']:.0f}%\n")
+    return doc
+
+
+def build_vector_store(snapshot: DataSnapshot, embedding_backend: str, index_mode: str, api_key: str,
+                       base_url: str = None):
+    """
+    토큰 최적화된 벡터 스토어 생성
+
+    - 상위 장소 요약: 카테고리별 상위 15곳 요약 문서 → Chroma
+    - 전체 리뷰: 모든 리뷰 청크(장소/카테고리/날짜 메타데이터) → int8 양자화 ANN 인덱스
+    - 새 청크는 임베딩 파이프라인(토큰 기준 배치, 동시 요청, 배치 단위 재시도)으로 임베딩
+
+    Returns:
+        (벡터 스토어, 같은 문서에 대한 BM25 어휘 색인)
+    """
+    embeddings = get_embeddings(embedding_backend, api_key, base_url)
+    pipeline = get_embedding_pipeline(embedding_backend, api_key, base_url)
+    if index_mode == "전체 리뷰":
+        documents = prepare_full_review_documents(snapshot.reviews)
+        vectorstore, _ = build_full_review_store(documents, embeddings, pipeline=pipeline)
+        return vectorstore, BM25Index(documents)
+
+    # 문서 준비 (쿼리 없이 전체 데이터의 대표 샘플만)
+    documents = prepare_review_documents_optimized(snapshot.place_analysis, ranking=snapshot.ranking)
+
+    # 작은 청크로 분할
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500,  # 더 작게
+        chunk_overlap=50
+    )
+    # 문서 첫 줄 "카테고리 | 장소명"을 메타데이터로 (어휘 색인의 장소명 매칭용)
+    metadatas = []
+    for doc in documents:
+        category, place_name = doc.split('\n', 1)[0].split(' | ', 1)
+        metadatas.append({'category': f"{category} 리뷰", 'place_name': place_name})
+    splits = text_splitter.create_documents(documents, metadatas=metadatas)
+
+    # 임베딩 (디스크 인덱스에 있는 청크는 재사용, 새 청크만 파이프라인으로 임베딩)
+    vectorstore, _ = sync_vector_store(splits, embeddings, pipeline=pipeline)
+
+    return vectorstore, BM25Index(splits)
+
+
+# ============================================
+# 채팅 엔진 (서비스당 하나)
+# ============================================
+
+class ChatEngine:
+    """검색 인덱스와 LLM 게이트웨이를 묶은 채팅 자원 (ConciergeService가 처음 필요할 때 생성)"""
+
+    def __init__(self, service):
+        self.service = service
+        self.api_key = service.api_key
+        self.base_url = service.base_url
+        self.answer_cache = service.answer_cache
+        self.gateway = LLMGateway()
+        # 임베딩 백엔드별 질의 임베딩 클라이언트 (연결 재사용, 처음 필요할 때 생성)
+        self._query_embeddings: Dict[str, Embeddings] = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.gateway.close()
+
+    # 검색 ----------------------------------------------------------------
+
+    def query_embeddings(self, embedding_backend: str) -> Embeddings:
+        with self._lock:
+            if embedding_backend not in self._query_embeddings:
+                self._query_embeddings[embedding_backend] = get_embeddings(embedding_backend, self.api_key,
+                                                                           self.base_url)
+            return self._query_embeddings[embedding_backend]
+
+    def vector_store(self, snapshot: DataSnapshot, embedding_backend: str, index_mode: str) -> tuple:
+        """
+        (임베딩 백엔드 × 인덱스 범위)별로 한 번만 구성하는 스냅샷 자원, 최근 MAX_VECTOR_STORES개 보관
+
+        스냅샷이 교체되면 이전 스냅샷의 인덱스는 그 스냅샷을 쓰는 실행이 끝날 때 함께 해제됩니다.
+        """
+        return snapshot.resource(
+            ('vector_store', embedding_backend, index_mode),
+            lambda: build_vector_store(snapshot, embedding_backend, index_mode, self.api_key, self.base_url),
+            keep=MAX_VECTOR_STORES)
+
+    def retrieve(self, query: str, settings: ChatSettings, snapshot: DataSnapshot = None) -> list:
+        snapshot = snapshot or self.service.snapshot()
+        vectorstore, lexical_index = self.vector_store(snapshot, settings.embedding_backend, settings.index_mode)
+        # 어휘(BM25) + 벡터 하이브리드 검색
+        # (질의 의도 → 메타데이터 사전 필터, 장소명 질의는 임베딩 호출 없이 처리)
+        retriever = HybridRetriever(vectorstore=vectorstore, lexical_index=lexical_index, k=settings.k)
+        return retriever.invoke(query)
+
+    # 채팅 ----------------------------------------------------------------
+
+    def _summarize(self, text: str) -> str:
+        return self.gateway.complete(ChatRequest.from_messages(
+            SUMMARY_MODEL, [{'role': 'user', 'content': text}], 0,
+            api_key=self.api_key, base_url=self.base_url))
+
+    def chat(self, messages: List[Dict], settings: ChatSettings,
+             conversation_state: Dict = None) -> ChatTurn:
+        """
+        채팅 한 턴 (messages: 지금까지의 대화, 마지막이 현재 질문)
+
+        conversation_state(누적 요약)는 호출자가 보관하며 제자리에서 갱신됩니다.
+        반환된 ChatTurn은 동기(for)·비동기(async for) 어느 쪽으로도 읽을 수 있습니다.
+        """
+        turn = ChatTurn()
+        if conversation_state is not None:
+            turn.conversation_state = conversation_state
+        turn.chunks = self._chat_chunks(turn, messages, settings)
+        turn.async_chunks = lambda: self._achat_chunks(turn, messages, settings)
+        return turn
+
+    def _prepare(self, turn: ChatTurn, messages: List[Dict], settings: ChatSettings) -> Dict:
+        """
+        LLM 호출 전 단계 (동기, 임베딩·검색 포함)
+
+        Returns:
+            {'started', 'entry'(캐시 적중 시), 'cache_key', 'query_vector'(임베딩했으면), 'embed', 'request'}
+        """
+        plan = {'started': time.time(), 'entry': None, 'cache_key': None, 'query_vector': None, 'embed': None}
+        snapshot = self.service.snapshot()
+        prompt = messages[-1]['content']
+
+        # 첫 질문만 캐시 (이전 대화에 따라 답이 달라지는 후속 질문은 제외)
+        if len(messages) == 1:
+            query_embeddings = self.query_embeddings(settings.embedding_backend)
+            plan['cache_key'] = cache_scope(
+                settings.model, settings.temperature, snapshot.fingerprint,
+                embedding_model_name(query_embeddings), settings.index_mode, settings.k,
+                match_category(prompt)
+            )
+
+            def embed():
+                plan['query_vector'] = query_embeddings.embed_query(prompt)
+                return plan['query_vector']
+
+            # 정규화 질의가 같으면 임베딩 없이 적중. 장소명 질의는 답이 그 장소에 묶이므로
+            # 같은 질의만 재사용하고 임베딩하지 않음 (검색도 임베딩 없이 처리되는 경로)
+            plan['embed'] = embed if match_place_name(prompt, snapshot.place_analysis) is None else None
+            cached = self.answer_cache.lookup(plan['cache_key'], prompt, plan['embed'])
+            if cached:
+                plan['entry'], turn.similarity = cached
+                turn.cached = True
+                return plan
+
+        docs = self.retrieve(prompt, settings, snapshot)
+        if route_query(prompt)['recent']:
+            # "요즘 뜨는 곳" 질의: 월 파티션에서 최근 리뷰만 읽어 만든 순위를 맨 앞 문서로
+            trending = self.service.trending_places(match_category(prompt), snapshot=snapshot)
+            if trending:
+                as_of = str(snapshot.timeline.latest.date())
+                docs = [Document(page_content=trending_document(trending, DECAY_HALF_LIFE_DAYS, as_of),
+                                 metadata={'source': 'trending'})] + list(docs)
+
+        # 토큰 예산 안에서 최근 대화 + 이전 대화 요약 + 관련도 순 문서 구성
+        context_budget = ContextBudget(model=settings.model, summarizer=llm_summarizer(self._summarize))
+        prompt_input = context_budget.build(SYSTEM_PROMPT, messages, docs, turn.conversation_state)
+        turn.prompt_stats = prompt_input['stats']
+
+        prompt_template = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
+            MessagesPlaceholder(variable_name="messages")
+        ])
+        plan['request'] = ChatRequest.from_messages(
+            settings.model,
+            prompt_template.format_messages(context=prompt_input['context'], messages=prompt_input['messages']),
+            settings.temperature,
+            api_key=self.api_key,
+            base_url=self.base_url,
+        )
+        return plan
+
+    def _finish(self, turn: ChatTurn, plan: Dict, prompt: str):
+        if plan['entry'] is not None:
+            self.answer_cache.record_saving(plan['entry'], time.time() - plan['started'])
+        elif plan['cache_key'] is not None:
+            latency = time.time() - plan['started']
+            vector = plan['query_vector']
+            if vector is None and plan['embed'] is not None and turn.text:
+                # 조회 때 임베딩하지 않은 질의는 답변을 보낸 뒤 임베딩 (다음 비슷한 질문용)
+                try:
+                    vector = plan['embed']()
+                except Exception:
+                    # 임베딩 실패는 답변에 영향 없이 같은 질의만 재사용하도록 저장
+                    vector = None
+            self.answer_cache.store(plan['cache_key'], prompt, vector, turn.text, latency,
+                                    turn.usage.get('total_tokens', 0))
+
+    def _chat_chunks(self, turn: ChatTurn, messages: List[Dict], settings: ChatSettings) -> Iterator[str]:
+        plan = self._prepare(turn, messages, settings)
+        if plan['entry'] is not None:
+            yield from replay_answer(plan['entry'].answer)
+        else:
+            # 모든 세션이 공유하는 게이트웨이로 호출 (연결 재사용, 동시 실행/속도 제한, 재시도, 요청 합치기)
+            yield from self.gateway.stream(plan['request'], turn.usage)
+        self._finish(turn, plan, messages[-1]['content'])
+
+    async def _achat_chunks(self, turn: ChatTurn, messages: List[Dict],
+                            settings: ChatSettings) -> AsyncIterator[str]:
+        """비동기 버전 (ASGI): 준비 단계만 스레드 풀에서, 스트리밍은 게이트웨이 루프에서"""
+        plan = await asyncio.to_thread(self._prepare, turn, messages, settings)
+        if plan['entry'] is not None:
+            for piece in replay_answer(plan['entry'].answer, delay=0):
+                yield piece
+                await asyncio.sleep(REPLAY_DELAY)
+        else:
+            async for chunk in self.gateway.astream(plan['request'], turn.usage):
+                yield chunk
+        # 저장 때 임베딩 호출이 있을 수 있으므로 이벤트 루프 밖에서
+        await asyncio.to_thread(self._finish, turn, plan, messages[-1]['content'])
@@ -0,0 +1,373 @@
+"""
+관광 컨시어지 핵심 로직 (Streamlit 비의존)
+
+Streamlit 앱(app.py)과 ASGI API(api_server.py)가 같은 함수를 씁니다.
+
+- 상위 장소, 일정 생성, 장소 비교: place_analysis dict에 대한 순수 함수
+- 리뷰 통계: 스냅샷의 통계 큐브(stats_cube) 조회
+- ConciergeService: 스냅샷 저장소, 답변 캐시, 채팅 엔진을 묶어
+  프로세스당 하나만 만들어 모든 세션/요청이 공유
+- 채팅·검색(LangChain/Chroma/OpenAI)은 chat_engine에 있으며 처음 쓸 때 불러옴 (지연 로딩)
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from review_store import REVIEWS_BASE_PATH, CATEGORIES
+from review_features import parse_prices
+from data_snapshot import DataSnapshot, SnapshotStore, ReviewWatcher
+from place_ranking import MIN_REVIEWS, PlaceRankingIndex
+from review_timeline import DECAY_HALF_LIFE_DAYS, rank_stats
+from itinerary_planner import GAZETTEER_FILE, ItineraryPlanner, ItinerarySpec, load_gazetteer, plan_batch
+from embedding_backends import OPENAI_BACKEND
+from answer_cache import SemanticAnswerCache
+
+INDEX_MODES = ["상위 장소 요약", "전체 리뷰"]
+SORT_KEYS = {"재방문율": "revisit_rate", "긍정 평가": "positive_rate", "리뷰 수": "total_reviews",
+             "평균 방문": "avg_visit_count"}
+# 기간 필터 (None = 전체 기간, 숫자 = 최근 N일)
+PERIODS = {"전체 기간": None, "최근 30일": 30, "최근 90일": 90, "최근 1년": 365}
+TRENDING_LIMIT = 10
+# 시드를 지정한 일정 캐시 크기 (스냅샷이 바뀌면 키가 달라져 자연히 밀려남)
+PLAN_CACHE_SIZE = 1024
+
+# ============================================
+# 리뷰 분석 함수들
+# ============================================
+
+# 장소별 리뷰 분석은 place_analytics (analyze_places / PlaceStatsIndex)에서 수행
+# 리뷰 단위 가격·키워드는 수집 시 review_features로 계산해 리뷰 테이블에 저장
+
+def extract_price_mentions(content: str) -> List[str]:
+    """리뷰에서 가격 언급 추출 (원 단위로 정규화, 예: '1.5만원' → '15,000원')"""
+    return [f"{price:,}원" for price in parse_prices(content)]
+
+
+def price_text(stats: Dict) -> Optional[str]:
+    """장소 가격 요약 (리뷰 가격 언급의 중앙값과 사분위 범위), 언급이 없으면 None"""
+    if not stats.get('price_mentions'):
+        return None
+    text = f"{stats['median_price']:,}원"
+    if stats['price_p25'] != stats['price_p75']:
+        text += f" ({stats['price_p25']:,}~{stats['price_p75']:,}원)"
+    return f"{text} · 언급 {stats['price_mentions']}건"
+
+
+def get_top_places(place_analysis: Dict, category: str = None,
+                   sort_by: str = 'revisit_rate', limit: int = 10, offset: int = 0,
+                   ranking: PlaceRankingIndex = None) -> List[Tuple]:
+    """
+    상위 장소 추출
+
+    ranking(스냅샷의 순위 색인)이 있으면 미리 정렬된 목록에서 잘라 반환합니다.
+    """
+    if ranking is not None:
+        return ranking.top(category, sort_by, limit, offset, MIN_REVIEWS)
+
+    filtered = place_analysis
+
+    if category:
+        filtered = {k: v for k, v in place_analysis.items()
+                   if v['category'] == category}
+
+    # 최소 리뷰 수 필터링 (신뢰도)
+    filtered = {k: v for k, v in filtered.items()
+               if v['total_reviews'] >= MIN_REVIEWS}
+
+    sorted_places = sorted(
+        filtered.items(),
+        key=lambda x: x[1].get(sort_by, 0),
+        reverse=True
+    )
+
+    return sorted_places[offset:offset + limit]
+
+
+def compare_places(place_analysis: Dict, place1: str, place2: str) -> Dict:
+    """
+    두 장소 비교 (재방문율, 긍정 평가, 평균 방문, 리뷰 수 4개 지표)
+
+    Returns:
+        {'places': {장소: 통계}, 'scores': {장소: 이긴 지표 수}, 'winner': 장소}
+    """
+    stats1 = place_analysis[place1]
+    stats2 = place_analysis[place2]
+
+    scores = {place1: 0, place2: 0}
+    for metric in ('revisit_rate', 'positive_rate', 'avg_visit_count', 'total_reviews'):
+        default = 1 if metric == 'avg_visit_count' else 0
+        if stats1.get(metric, default) > stats2.get(metric, default):
+            scores[place1] += 1
+        else:
+            scores[place2] += 1
+
+    winner = place1 if scores[place1] > scores[place2] else place2
+    return {'places': {place1: stats1, place2: stats2}, 'scores': scores, 'winner': winner}
+
+
+def review_statistics(snapshot: DataSnapshot, category: str = None) -> Dict:
+    """
+    전체/카테고리별 리뷰 통계와 월별 추이 (리뷰 통계 탭, 통계 큐브 조회만)
+
+    category를 주면 그 카테고리로 좁혀 드릴다운합니다 (None = 전체).
+    """
+    cube = snapshot.cube
+    total = cube.cell(category)
+    categories = [{
+        'category': name,
+        'reviews': cell['reviews'],
+        'places': cell['places'],
+        'avg_revisit_rate': cell['avg_place_revisit_rate'],
+        'avg_positive_rate': cell['avg_place_positive_rate'],
+    } for name, cell in cube.breakdown('category') if category in (None, name)]
+    monthly = [{'month': f"{month // 100}-{month % 100:02d}", 'reviews': cell['reviews'],
+                'revisit_rate': cell['revisit_rate'], 'positive_rate': cell['positive_rate']}
+               for month, cell in cube.series(category)]
+
+    return {
+        'category': category,
+        'total_reviews': total['reviews'],
+        'total_places': total['places'],
+        'total_revisits': total['revisits'],
+        'categories': categories,
+        'monthly': monthly,
+    }
+
+
+# ============================================
+# 일정 생성 함수
+# ============================================
+
+def generate_itinerary(
+    place_analysis: Dict,
+    duration: str = "1박 2일",
+    categories: List[str] = None,
+    priorities: str = "재방문율",
+    ranking: PlaceRankingIndex = None,
+    seed: int = None,
+    planner: ItineraryPlanner = None
+) -> Dict:
+    """
+    리뷰 기반 똑똑한 일정 생성
+
+    상위 장소 후보 중에서 점수와 이동 거리를 함께 고려해 하루 동선을 구성합니다
+    (itinerary_planner). planner를 넘기면 후보 풀과 이동 시간 행렬을 재사용합니다.
+    """
+    planner = planner or ItineraryPlanner(place_analysis, ranking)
+    return planner.plan(duration, categories, priorities, seed)
+
+
+# ============================================
+# 서비스 (프로세스당 하나)
+# ============================================
+
+@dataclass
+class ChatSettings:
+    model: str = "gpt-4o-mini"
+    temperature: float = 0.7
+    k: int = 5
+    embedding_backend: str = OPENAI_BACKEND
+    index_mode: str = INDEX_MODES[0]
+
+
+@dataclass
+class ChatTurn:
+    """
+    채팅 한 턴의 응답 스트림
+
+    for/async for로 반복하면 답변 조각이 나오고(둘 중 하나만), 끝까지 읽은 뒤에는
+    text, cached, similarity, prompt_stats, usage, conversation_state가 채워집니다.
+    """
+    conversation_state: Dict = field(default_factory=lambda: {'summary': '', 'summarized': 0})
+    text: str = ''
+    cached: bool = False
+    similarity: Optional[float] = None
+    prompt_stats: Optional[Dict] = None
+    usage: Dict = field(default_factory=dict)
+    chunks: Optional[Iterator[str]] = None
+    async_chunks: Optional[Callable[[], AsyncIterator[str]]] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self.chunks:
+            self.text += chunk
+            yield chunk
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for chunk in self.async_chunks():
+            self.text += chunk
+            yield chunk
+
+
+class ConciergeService:
+    """리뷰 스냅샷과 검색/채팅 자원을 공유하는 서비스 객체"""
+
+    def __init__(self, base_path: str = REVIEWS_BASE_PATH, api_key: str = None, base_url: str = None,
+                 watch: bool = True):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.store = SnapshotStore(base_path)
+        self.gazetteer_path = os.path.join(base_path, GAZETTEER_FILE)
+        self.store.refresh()
+        if watch:
+            ReviewWatcher(self.store).start()
+        self.answer_cache = SemanticAnswerCache()
+        self._plan_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 채팅 엔진 (chat_engine 모듈과 함께 처음 필요할 때 생성)
+        self._chat_engine = None
+        self._chat_engine_lock = threading.Lock()
+        self._warm_up_thread: Optional[threading.Thread] = None
+
+    def snapshot(self) -> DataSnapshot:
+        return self.store.current()
+
+    def snapshot_info(self) -> Dict:
+        snapshot = self.snapshot()
+        return {
+            'version': snapshot.version,
+            'fingerprint': snapshot.fingerprint,
+            'total_reviews': snapshot.total_reviews,
+            'total_places': len(snapshot.place_analysis),
+            'failures': snapshot.ingest_report.get('failures', []),
+            'loaded_at': snapshot.loaded_at,
+            'latest_review': str(snapshot.timeline.latest.date()) if snapshot.timeline.latest else None,
+        }
+
+    # 장소 조회 ------------------------------------------------------------
+
+    def place_names(self) -> List[str]:
+        """장소 이름 목록 (스냅샷마다 한 번 만드는 뷰 모델)"""
+        snapshot = self.snapshot()
+        return snapshot.resource(('view', 'place_names'), lambda: list(snapshot.place_analysis.keys()))
+
+    def top_places(self, category: str = None, sort_by: str = 'revisit_rate', limit: int = 10,
+                   offset: int = 0, days: int = None) -> List[Tuple]:
+        """상위 장소 (days가 있으면 최근 days일 리뷰만으로 집계한 지표 기준)"""
+        snapshot = self.snapshot()
+        if days:
+            ranked, _ = rank_stats(snapshot.timeline.window_stats(days), category, sort_by, limit, offset)
+            return self._with_place_details(snapshot, ranked)
+        return get_top_places(snapshot.place_analysis, category, sort_by, limit, offset, snapshot.ranking)
+
+    def count_places(self, category: str = None, sort_by: str = 'revisit_rate', days: int = None) -> int:
+        snapshot = self.snapshot()
+        if days:
+            return rank_stats(snapshot.timeline.window_stats(days), category, sort_by, 0)[1]
+        return snapshot.ranking.count(category, sort_by, MIN_REVIEWS)
+
+    def trending_places(self, category: str = None, limit: int = TRENDING_LIMIT,
+                        half_life_days: float = DECAY_HALF_LIFE_DAYS, snapshot: DataSnapshot = None) -> List[Tuple]:
+        """요즘 뜨는 곳: 최근 리뷰일수록 크게 가중한 리뷰 수(weighted_reviews) 순"""
+        snapshot = snapshot or self.snapshot()
+        ranked, _ = rank_stats(snapshot.timeline.decayed_stats(half_life_days), category,
+                               'weighted_reviews', limit)
+        return self._with_place_details(snapshot, ranked)
+
+    @staticmethod
+    def _with_place_details(snapshot: DataSnapshot, ranked: List[Tuple]) -> List[Tuple]:
+        """기간 지표에 전체 기간의 최근 리뷰·키워드·가격을 덧붙임"""
+        return [(name, {**snapshot.place_analysis[name], **stats}) for name, stats in ranked]
+
+    def _planner_key(self, snapshot: DataSnapshot) -> tuple:
+        gazetteer_mtime = os.path.getmtime(self.gazetteer_path) if os.path.exists(self.gazetteer_path) else None
+        return (snapshot.fingerprint, gazetteer_mtime)
+
+    def planner(self, snapshot: DataSnapshot = None) -> ItineraryPlanner:
+        """스냅샷(과 지명 사전 파일)마다 한 번 만드는 일정 최적화기 (스냅샷 자원)"""
+        snapshot = snapshot or self.snapshot()
+        _, gazetteer_mtime = self._planner_key(snapshot)
+        return snapshot.resource(('planner', gazetteer_mtime), lambda: ItineraryPlanner(
+            snapshot.place_analysis, snapshot.ranking, load_gazetteer(self.gazetteer_path)), keep=1)
+
+    def itinerary(self, duration: str = "1박 2일", categories: List[str] = None,
+                  priorities: str = "재방문율", seed: int = None) -> Dict:
+        """일정 하나 (seed가 없으면 매번 다른 조합, 있으면 같은 스냅샷에서 항상 같은 일정)"""
+        if seed is not None:
+            return self.itinerary_batch([ItinerarySpec(duration, tuple(categories or ()), priorities, seed)])[0]
+        snapshot = self.snapshot()
+        return generate_itinerary(snapshot.place_analysis, duration, categories, priorities,
+                                  snapshot.ranking, None, self.planner(snapshot))
+
+    def itinerary_batch(self, specs: List[ItinerarySpec], workers: int = None) -> List[Dict]:
+        """
+        여러 명세 일괄 계획 (입력 순서대로)
+
+        같은 스냅샷에서 이미 만든 명세는 캐시에서, 나머지는 plan_batch로 계산합니다.
+        """
+        snapshot = self.snapshot()
+        planner_key = self._planner_key(snapshot)
+        keys = [(planner_key, spec.normalized()) for spec in specs]
+
+        plans = {}
+        with self._lock:
+            for key in keys:
+                if key in self._plan_cache:
+                    self._plan_cache.move_to_end(key)
+                    plans[key] = self._plan_cache[key]
+        missing = list(dict.fromkeys(key for key in keys if key not in plans))
+        if missing:
+            results = plan_batch(self.planner(snapshot), [spec for _, spec in missing], workers)
+            plans.update(zip(missing, results))
+            with self._lock:
+                for key, plan in zip(missing, results):
+                    self._plan_cache[key] = plan
+                while len(self._plan_cache) > PLAN_CACHE_SIZE:
+                    self._plan_cache.popitem(last=False)
+        return [plans[key] for key in keys]
+
+    def compare(self, place1: str, place2: str) -> Dict:
+        return compare_places(self.snapshot().place_analysis, place1, place2)
+
+    def statistics(self, category: str = None) -> Dict:
+        """리뷰 통계 탭 뷰 모델 (통계 큐브 조회라 드릴다운마다 다시 계산해도 됨)"""
+        return review_statistics(self.snapshot(), category)
+
+    def cache_metrics(self) -> Dict:
+        return self.answer_cache.metrics()
+
+    # 채팅·검색 (지연 로딩) --------------------------------------------------
+
+    def chat_engine(self):
+        """채팅 엔진 (처음 호출할 때 LangChain/Chroma/OpenAI 스택을 불러 생성, 동시 호출은 대기)"""
+        if self._chat_engine is None:
+            with self._chat_engine_lock:
+                if self._chat_engine is None:
+                    from chat_engine import ChatEngine
+                    self._chat_engine = ChatEngine(self)
+        return self._chat_engine
+
+    @property
+    def chat_ready(self) -> bool:
+        return self._chat_engine is not None
+
+    def warm_up(self) -> threading.Thread:
+        """채팅 엔진을 백그라운드 스레드에서 미리 생성 (여러 번 불러도 한 번만 시작)"""
+        with self._lock:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(target=self.chat_engine, name="chat-warm-up",
+                                                        daemon=True)
+                self._warm_up_thread.start()
+            return self._warm_up_thread
+
+    def retrieve(self, query: str, settings: ChatSettings, snapshot: DataSnapshot = None) -> list:
+        return self.chat_engine().retrieve(query, settings, snapshot)
+
+    def chat(self, messages: List[Dict], settings: ChatSettings,
+             conversation_state: Dict = None) -> ChatTurn:
+        """채팅 한 턴 (ChatEngine.chat, 동기·비동기 어느 쪽으로도 읽을 수 있는 ChatTurn)"""
+        return self.chat_engine().chat(messages, settings, conversation_state)
+
+    def close(self):
+        if self._chat_engine is not None:
+            self._chat_engine.close()
+
+
+def service_from_env() -> ConciergeService:
+    """환경 변수(OPENAI_API_KEY, OPENAI_BASE_URL, REVIEWS_BASE_PATH)로 서비스 생성"""
+    return ConciergeService(
+        base_path=os.environ.get('REVIEWS_BASE_PATH', REVIEWS_BASE_PATH),
+        api_key=os.environ.get('OPENAI_API_KEY'),
+        base_url=os.environ.get('OPENAI_BASE_URL'),
+    )
@@ -0,0 +1,224 @@
+"""
+대화 컨텍스트 예산 관리
+
+대화가 길어져도 요청당 프롬프트 토큰이 상한(budget)을 넘지 않도록
+시스템 프롬프트, 이전 대화, 검색 문서를 예산 안에서 나눠 담습니다.
+
+- 최근 N턴은 원문 그대로, 그 이전 대화는 누적 요약 하나로 접음
+  (요약은 새로 창 밖으로 밀려난 메시지만 반영해 갱신)
+- 검색 문서는 관련도 순서대로 남은 예산만큼만 포함 (마지막 문서는 잘라서 채움)
+- 요청마다 구성 요소별 토큰 수를 로그로 남김
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = 4000
+RECENT_TURNS = 3
+# 이전 대화(요약 + 최근 턴)가 쓸 수 있는 예산 비율 (나머지는 검색 문서 몫)
+HISTORY_SHARE = 0.35
+SUMMARY_TOKEN_LIMIT = 300
+# 메시지마다 붙는 역할/구분 토큰
+MESSAGE_OVERHEAD = 4
+# 잘라 넣을 문서가 이보다 짧아지면 넣지 않음
+MIN_DOC_TOKENS = 50
+DEFAULT_MODEL = "gpt-4o-mini"
+
+HANGUL_PATTERN = re.compile(r'[가-힣ㄱ-ㅎㅏ-ㅣ]')
+
+# 요약 함수: (이전 요약, 새로 접을 메시지) → 새 요약
+Summarizer = Callable[[str, List[Dict]], str]
+
+
+# ============================================
+# 토큰 계산
+# ============================================
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken 인코더 (설치되지 않았거나 사전 파일을 못 받으면 None)"""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """tiktoken 없이 보수적으로 추정: 한글 1글자 ≈ 1토큰, 그 외 4글자 ≈ 1토큰"""
+    hangul = len(HANGUL_PATTERN.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, limit: int, model: str = DEFAULT_MODEL) -> str:
+    """앞에서부터 limit 토큰까지만 남김"""
+    if limit <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= limit else encoding.decode(tokens[:limit])
+
+    while text and estimate_tokens(text) > limit:
+        text = text[:int(len(text) * 0.9)]
+    return text
+
+
+# ============================================
+# 누적 요약
+# ============================================
+
+def format_turns(messages: List[Dict]) -> str:
+    return "\n".join(f"{'사용자' if m['role'] == 'user' else '답변'}: {m['content']}" for m in messages)
+
+
+def extractive_summary(summary: str, messages: List[Dict]) -> str:
+    """LLM 없이 쓰는 요약: 메시지마다 첫 문장만 이어 붙임"""
+    lines = [summary] if summary else []
+    for message in messages:
+        first = re.split(r'(?<=[.!?다요])\s|\n', message['content'].strip(), maxsplit=1)[0][:120]
+        lines.append(f"{'사용자' if message['role'] == 'user' else '답변'}: {first}")
+    return "\n".join(lines)
+
+
+def llm_summarizer(complete: Callable[[str], str], max_chars: int = 400) -> Summarizer:
+    """LLM(complete: 요청문 → 응답문)으로 이전 요약 + 새 대화를 합쳐 다시 요약 (실패하면 추출 요약)"""
+    def summarize(summary: str, messages: List[Dict]) -> str:
+        request = (
+            f"다음은 여행 상담 대화의 이전 요약과 새 대화입니다. 사용자의 여행 조건, 관심 장소, "
+            f"이미 추천한 장소를 중심으로 {max_chars}자 이내 한국어로 다시 요약하세요.\n\n"
+            f"[이전 요약]\n{summary or '(없음)'}\n\n[새 대화]\n{format_turns(messages)}"
+        )
+        try:
+            return complete(request).strip()
+        except Exception:
+            return extractive_summary(summary, messages)
+    return summarize
+
+
+# ============================================
+# 프롬프트 구성
+# ============================================
+
+class ContextBudget:
+    """
+    요청당 프롬프트 토큰 상한 관리
+
+    build()에 넘기는 state(세션별 dict)에 누적 요약과
+    요약에 반영된 메시지 수를 보관합니다.
+    """
+
+    def __init__(self, budget: int = PROMPT_TOKEN_BUDGET, recent_turns: int = RECENT_TURNS,
+                 model: str = DEFAULT_MODEL, summarizer: Optional[Summarizer] = None):
+        self.budget = budget
+        self.recent_turns = recent_turns
+        self.model = model
+        self.summarizer = summarizer or extractive_summary
+
+    def _tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def _message_tokens(self, message: Dict) -> int:
+        return self._tokens(message['content']) + MESSAGE_OVERHEAD
+
+    def build(self, system_template: str, messages: List[Dict], documents: List[Document],
+              state: Dict) -> Dict:
+        """
+        예산 안의 프롬프트 입력 구성
+
+        Args:
+            system_template: {context} 자리표시자가 있는 시스템 프롬프트
+            messages: 세션의 전체 대화 (마지막이 현재 질문)
+            documents: 관련도 순서의 검색 문서
+            state: {'summary', 'summarized'} (호출 간 유지, 대화를 지우면 처음부터)
+
+        Returns:
+            {'context': 문서 문자열, 'messages': LangChain 메시지 목록, 'stats': 토큰 집계}
+        """
+        previous, current = messages[:-1], messages[-1]
+        if state.get('summarized', 0) > len(previous):
+            state['summary'], state['summarized'] = '', 0
+
+        fixed = self._tokens(system_template.replace('{context}', '')) + MESSAGE_OVERHEAD
+        question = truncate_to_tokens(current['content'], self.budget // 4, self.model)
+        question_tokens = self._tokens(question) + MESSAGE_OVERHEAD
+
+        # 최근 턴: 최신부터 예산이 허락하는 만큼 (최대 recent_turns턴)
+        history_budget = int(self.budget * HISTORY_SHARE) - min(self._tokens(state.get('summary', '')),
+                                                               SUMMARY_TOKEN_LIMIT)
+        recent, history_tokens = [], 0
+        for message in reversed(previous[-self.recent_turns * 2:]):
+            tokens = self._message_tokens(message)
+            if history_tokens + tokens > history_budget:
+                break
+            recent.insert(0, message)
+            history_tokens += tokens
+
+        # 창 밖으로 밀려난 메시지를 요약에 반영
+        older = previous[:len(previous) - len(recent)]
+        folded = older[state.get('summarized', 0):]
+        if folded:
+            state['summary'] = truncate_to_tokens(
+                self.summarizer(state.get('summary', ''), folded), SUMMARY_TOKEN_LIMIT, self.model)
+            state['summarized'] = len(older)
+
+        summary = state.get('summary', '')
+        summary_tokens = self._tokens(summary) + MESSAGE_OVERHEAD if summary else 0
+
+        # 검색 문서: 관련도 순서대로 남은 예산만큼
+        remaining = self.budget - fixed - question_tokens - history_tokens - summary_tokens
+        parts = []
+        for doc in documents:
+            tokens = self._tokens(doc.page_content) + 2
+            if tokens <= remaining:
+                parts.append(doc.page_content)
+                remaining -= tokens
+                continue
+            if remaining >= MIN_DOC_TOKENS:
+                parts.append(truncate_to_tokens(doc.page_content, remaining - 2, self.model))
+                remaining = 0
+            break
+        context = "\n\n".join(parts)
+
+        prompt_messages: List[BaseMessage] = []
+        if summary:
+            prompt_messages.append(SystemMessage(content=f"이전 대화 요약:\n{summary}"))
+        for message in recent:
+            message_class = HumanMessage if message['role'] == 'user' else AIMessage
+            prompt_messages.append(message_class(content=message['content']))
+        prompt_messages.append(HumanMessage(content=question))
+
+        context_tokens = self._tokens(context)
+        stats = {
+            'budget': self.budget,
+            'system': fixed,
+            'summary': summary_tokens,
+            'history': history_tokens,
+            'question': question_tokens,
+            'context': context_tokens,
+            'total': fixed + summary_tokens + history_tokens + question_tokens + context_tokens,
+            'docs_used': len(parts),
+            'docs_total': len(documents),
+            'messages_verbatim': len(recent),
+            'messages_summarized': state.get('summarized', 0),
+        }
+        logger.info("prompt tokens %(total)d/%(budget)d (system %(system)d, summary %(summary)d, "
+                    "history %(history)d, question %(question)d, context %(context)d, "
+                    "docs %(docs_used)d/%(docs_total)d)", stats)
+        return {'context': context, 'messages': prompt_messages, 'stats': stats}
@@ -0,0 +1,200 @@
+"""
+리뷰 데이터 스냅샷과 파일 감시
+
+리뷰 테이블과 장소 분석 결과를 버전이 붙은 읽기 전용 스냅샷으로 묶고,
+리뷰 폴더를 주기적으로 확인해 엑셀이 추가·변경·삭제되면
+바뀐 파일만 다시 읽어 새 스냅샷으로 교체합니다.
+
+스냅샷은 프로세스에 하나만 두고 모든 세션이 공유합니다. 세션 상태에는 스냅샷 식별자만
+저장하며, 세션은 실행(rerun) 시작 시 받은 스냅샷을 끝까지 사용하므로
+교체 중에도 이전 스냅샷으로 응답을 마칠 수 있습니다.
+
+리뷰 테이블은 Arrow 캐시 파일을 메모리 맵으로 읽은 것이라 같은 호스트의 여러 워커
+프로세스(Streamlit, uvicorn --workers)가 페이지 캐시의 물리 사본 하나를 함께 씁니다.
+검색 인덱스·일정 최적화기 같은 파생 자원도 스냅샷에 딸려 있어(resource)
+스냅샷이 교체되고 쓰는 곳이 없어지면 함께 해제됩니다.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from review_store import REVIEWS_BASE_PATH, REVIEW_CACHE_PATH, list_review_files, load_review_table
+from place_analytics import PlaceStatsIndex
+from place_ranking import PlaceRankingIndex
+from review_timeline import ReviewTimeline
+from stats_cube import StatsCube, StatsCubeIndex
+
+WATCH_INTERVAL_SECONDS = 5.0
+WATCH_DEBOUNCE_SECONDS = 2.0
+
+
+# ============================================
+# 스냅샷
+# ============================================
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """한 시점의 리뷰 데이터 (교체만 하고 수정하지 않음)"""
+    version: int
+    reviews: pd.DataFrame
+    place_analysis: Dict[str, Dict]
+    file_versions: Dict[str, str]
+    ingest_report: Dict = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+    ranking: Optional[PlaceRankingIndex] = None
+    timeline: Optional[ReviewTimeline] = None
+    cube: Optional[StatsCube] = None
+    # 파생 자원 {(종류, ...): 객체} (스냅샷 데이터가 아니라 캐시이므로 비교·출력에서 제외)
+    _resources: "OrderedDict[tuple, object]" = field(default_factory=OrderedDict, repr=False, compare=False)
+    _build_locks: Dict[tuple, threading.Lock] = field(default_factory=dict, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def total_reviews(self) -> int:
+        return len(self.reviews)
+
+    @property
+    def fingerprint(self) -> str:
+        """파일 해시 기반 스냅샷 식별자 (같은 데이터면 어느 프로세스에서든 같은 값)"""
+        digest = hashlib.sha1(json.dumps(sorted(self.file_versions.items())).encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    def resource(self, key: tuple, build: Callable[[], object], keep: int = None):
+        """
+        스냅샷에 딸린 파생 자원 (키마다 한 번만 생성, 동시 요청은 생성이 끝날 때까지 대기)
+
+        keep이 있으면 같은 종류(key[0])의 자원을 최근 keep개까지만 보관합니다.
+        """
+        with self._lock:
+            if key in self._resources:
+                self._resources.move_to_end(key)
+                return self._resources[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._resources:
+                    return self._resources[key]
+            value = build()
+            with self._lock:
+                self._resources[key] = value
+                self._build_locks.pop(key, None)
+                if keep is not None:
+                    same_kind = [k for k in self._resources if k[0] == key[0]]
+                    for old in same_kind[:-keep]:
+                        del self._resources[old]
+            return value
+
+
+class SnapshotStore:
+    """현재 스냅샷 보관 및 원자적 교체"""
+
+    def __init__(self, base_path: str = REVIEWS_BASE_PATH, cache_path: str = REVIEW_CACHE_PATH):
+        self.base_path = base_path
+        self.cache_path = cache_path
+        self._index = PlaceStatsIndex()
+        self._cube_index = StatsCubeIndex()
+        self._snapshot: Optional[DataSnapshot] = None
+        self._refresh_lock = threading.Lock()
+
+    def current(self) -> Optional[DataSnapshot]:
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        """
+        바뀐 엑셀만 다시 읽어 새 스냅샷 생성
+
+        Returns:
+            새 스냅샷으로 교체되었는지 여부
+        """
+        with self._refresh_lock:
+            reviews, report = load_review_table(self.base_path, self.cache_path)
+            previous = self._snapshot
+            if previous is not None and previous.file_versions == report['file_versions']:
+                return False
+
+            changed = self._index.sync(reviews, report['file_versions'])
+            # 순위 색인은 통계가 바뀐 장소만 다시 끼워 넣어 이어받음
+            if previous is not None and previous.ranking is not None:
+                ranking = previous.ranking.updated(self._index.place_analysis, changed)
+            else:
+                ranking = PlaceRankingIndex(self._index.place_analysis)
+            self._snapshot = DataSnapshot(
+                version=(previous.version + 1) if previous else 1,
+                reviews=reviews,
+                place_analysis=self._index.place_analysis,
+                file_versions=report['file_versions'],
+                ingest_report=report,
+                ranking=ranking,
+                timeline=ReviewTimeline(reviews, self._index.place_analysis),
+                # 통계 큐브도 바뀐 파일의 부분 집계만 다시 계산
+                cube=self._cube_index.sync(reviews, report['file_versions']),
+            )
+            return True
+
+
+# ============================================
+# 리뷰 폴더 감시 (mtime 폴링 + 디바운스)
+# ============================================
+
+def folder_signature(base_path: str) -> Dict[str, tuple]:
+    """리뷰 파일별 (mtime, 크기)"""
+    signature = {}
+    for _, file_path in list_review_files(base_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        signature[file_path] = (stat.st_mtime, stat.st_size)
+    return signature
+
+
+class ReviewWatcher(threading.Thread):
+    """
+    리뷰 폴더 변경 감시 스레드
+
+    변경이 감지되면 debounce 동안 추가 변경이 없을 때까지 기다린 뒤
+    (복사 중인 파일을 읽지 않도록) 스냅샷을 갱신합니다.
+    """
+
+    def __init__(self, store: SnapshotStore,
+                 interval: float = WATCH_INTERVAL_SECONDS,
+                 debounce: float = WATCH_DEBOUNCE_SECONDS):
+        super().__init__(name="review-watcher", daemon=True)
+        self.store = store
+        self.interval = interval
+        self.debounce = debounce
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        # 첫 주기에는 항상 갱신 확인 (스냅샷 생성과 감시 시작 사이의 변경 대비,
+        # 바뀐 파일이 없으면 해시 비교만 하고 끝남)
+        last_signature = None
+        while not self._stop_event.wait(self.interval):
+            signature = folder_signature(self.store.base_path)
+            if signature == last_signature:
+                continue
+
+            # 디바운스: 폴더가 잠잠해질 때까지 대기
+            while not self._stop_event.wait(self.debounce):
+                settled = folder_signature(self.store.base_path)
+                if settled == signature:
+                    break
+                signature = settled
+
+            try:
+                self.store.refresh()
+                last_signature = signature
+            except Exception:
+                # 다음 주기에 다시 시도
+                continue
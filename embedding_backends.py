@@ -0,0 +1,96 @@
+"""
+임베딩 백엔드
+
+벡터 인덱스와 검색기에 쓰이는 임베딩 모델을 이름으로 선택합니다.
+모든 백엔드는 LangChain Embeddings 인터페이스를 따르므로
+Chroma/검색기 코드는 백엔드와 무관하게 동작합니다.
+
+- OpenAI: OpenAIEmbeddings (네트워크 호출)
+- 로컬: 문자 n-gram 해싱 임베딩 (CPU, 네트워크·API 키 불필요)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+OPENAI_BACKEND = "OpenAI"
+LOCAL_BACKEND = "로컬 (오프라인)"
+EMBEDDING_BACKENDS = [OPENAI_BACKEND, LOCAL_BACKEND]
+
+# 64비트 곱셈 해시 상수 (n-gram 위치별)
+_HASH_MULTIPLIERS = np.array([
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+    0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD,
+], dtype=np.uint64)
+
+
+class HashedNgramEmbeddings(Embeddings):
+    """
+    문자 n-gram 해싱 임베딩
+
+    텍스트의 문자 n-gram(기본 1~3글자)을 고정 차원으로 해싱하고
+    로그 스케일 TF + L2 정규화를 적용합니다. 한글은 음절 단위라
+    2~3글자 n-gram만으로도 장소명·메뉴명 매칭이 잘 됩니다.
+    해시가 프로세스와 무관하게 고정이라 같은 텍스트는 항상 같은 벡터가 됩니다.
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: tuple = (1, 3),
+                 batch_size: int = 64, workers: int = 4):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.batch_size = batch_size
+        self.workers = workers
+        # 영구 인덱스의 컬렉션/청크 ID 구분용
+        self.model = f"hashed-ngram-{ngram_range[0]}-{ngram_range[1]}-{dim}"
+
+    def _embed(self, text: str) -> List[float]:
+        codes = np.frombuffer(text.lower().encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        vector = np.zeros(self.dim, dtype=np.float64)
+
+        with np.errstate(over='ignore'):
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                if len(codes) < n:
+                    break
+                hashed = np.zeros(len(codes) - n + 1, dtype=np.uint64)
+                for i in range(n):
+                    hashed ^= codes[i:len(codes) - n + 1 + i] * _HASH_MULTIPLIERS[i]
+                # 상위 비트를 섞어 버킷과 부호 결정
+                hashed ^= hashed >> np.uint64(29)
+                buckets = (hashed % np.uint64(self.dim)).astype(np.int64)
+                signs = np.where(hashed >> np.uint64(63), -1.0, 1.0)
+                vector += np.bincount(buckets, weights=signs, minlength=self.dim)
+
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """배치 단위로 나눠 스레드 풀에서 인코딩 (numpy 연산은 GIL 해제)"""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:
+            return self._embed_batch(texts)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = pool.map(self._embed_batch, batches)
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def get_embeddings(backend: str = OPENAI_BACKEND, api_key: str = None, base_url: str = None,
+                   max_retries: int = None) -> Embeddings:
+    """백엔드 이름 → 임베딩 모델 (base_url: OpenAI 호환 서버, max_retries: 클라이언트 재시도 횟수)"""
+    if backend == LOCAL_BACKEND:
+        return HashedNgramEmbeddings()
+    if backend == OPENAI_BACKEND:
+        from langchain_openai import OpenAIEmbeddings
+        options = {} if max_retries is None else {'max_retries': max_retries}
+        return OpenAIEmbeddings(api_key=api_key, base_url=base_url, **options)
+    raise ValueError(f"알 수 없는 임베딩 백엔드: {backend}")
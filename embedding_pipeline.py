@@ -0,0 +1,206 @@
+"""
+동시 임베딩 파이프라인 (인덱스 빌드용)
+
+청크 목록을 토큰 수 기준 배치로 묶어 여러 배치를 동시에 임베딩하고,
+결과 벡터를 입력 순서대로 돌려줍니다. 벡터 스토어에는 호출자가 한 번에 씁니다.
+
+- 배치: 추정 토큰 합이 max_batch_tokens, 항목 수가 max_batch_items를 넘지 않게 묶음
+- 동시 실행: 스레드 풀 (최대 max_concurrency), 429를 받으면 동시 실행 한도를 절반으로
+  줄이고 성공이 이어지면 하나씩 늘림 (AIMD)
+- 속도 제한: 분당 요청 수 / 분당 토큰 수 토큰 버킷 (None이면 제한 없음, 버킷·백오프는 llm_gateway와 공유)
+- 재시도: 429·5xx·연결 오류는 실패한 배치만 지수 백오프(+지터, Retry-After 존중) 후 다시 요청,
+  입력 오류(400)는 배치를 반으로 나눠 문제 청크만 분리
+- 끝내 실패한 청크는 건너뛰고 failed로 돌려줌 (다음 빌드에서 새 청크로 다시 임베딩)
+- 진행률: 배치가 끝날 때마다 progress 콜백 / 로그 (청크/초, 토큰/초)
+
+base_url을 llm_stub 서버로 바꾸면 지연·429를 주입해 네트워크 없이 확인할 수 있습니다.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import openai
+from langchain_core.embeddings import Embeddings
+
+from context_budget import estimate_tokens
+from embedding_backends import OPENAI_BACKEND, get_embeddings
+from llm_gateway import BACKOFF_BASE, MAX_RETRIES, RETRYABLE_ERRORS, TokenBucket, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_TOKENS = 16_000
+MAX_BATCH_ITEMS = 512
+MAX_CONCURRENCY = 8
+# OpenAI 임베딩 기본 한도 (계정 등급에 맞게 조정)
+REQUESTS_PER_MINUTE = 3000
+TOKENS_PER_MINUTE = 1_000_000
+# 진행 로그 간격 (초)
+PROGRESS_INTERVAL = 5.0
+
+
+def pack_batches(token_counts: List[int], max_tokens: int = MAX_BATCH_TOKENS,
+                 max_items: int = MAX_BATCH_ITEMS) -> List[List[int]]:
+    """청크별 토큰 수 → 배치별 청크 번호 (입력 순서 유지, 한도를 넘는 청크는 단독 배치)"""
+    batches, current, current_tokens = [], [], 0
+    for i, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class EmbeddingPipeline:
+    """토큰 기준 배치 + 동시 실행 + 배치 단위 재시도 임베딩"""
+
+    def __init__(self, embeddings: Embeddings, max_batch_tokens: int = MAX_BATCH_TOKENS,
+                 max_batch_items: int = MAX_BATCH_ITEMS, max_concurrency: int = MAX_CONCURRENCY,
+                 requests_per_minute: Optional[float] = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: Optional[float] = TOKENS_PER_MINUTE,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 progress: Callable[[Dict], None] = None):
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.progress = progress
+        self._request_bucket = (TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60))
+                                if requests_per_minute else None)
+        self._token_bucket = (TokenBucket(tokens_per_minute / 60, tokens_per_minute / 6)
+                              if tokens_per_minute else None)
+
+    def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        if self._request_bucket is not None:
+            self._request_bucket.acquire_blocking()
+        if self._token_bucket is not None:
+            self._token_bucket.acquire_blocking(tokens)
+        return self.embeddings.embed_documents(texts)
+
+    def embed(self, texts: List[str]) -> Tuple[np.ndarray, List[int], Dict]:
+        """
+        텍스트 목록 임베딩
+
+        Returns:
+            (float32 벡터 [len(texts), dim] — 실패한 행은 0, 실패한 청크 번호, 통계)
+        """
+        token_counts = [estimate_tokens(text) for text in texts]
+        # (청크 번호 목록, 시도 횟수, 다시 보낼 수 있는 시각)
+        pending = [(batch, 0, 0.0) for batch in pack_batches(token_counts, self.max_batch_tokens,
+                                                             self.max_batch_items)]
+        pending.reverse()
+        results: Dict[int, List[float]] = {}
+        failed: List[int] = []
+        stats = {'chunks': len(texts), 'tokens': sum(token_counts), 'batches': len(pending),
+                 'requests': 0, 'retries': 0, 'rate_limited': 0, 'split': 0, 'failed': 0,
+                 'embedded_tokens': 0, 'concurrency': self.max_concurrency}
+        limit, successes = self.max_concurrency, 0
+        started = last_report = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed") as pool:
+            running = {}
+            while pending or running:
+                # 동시 실행 한도 안에서 보낼 수 있는 배치 제출 (백오프 중인 배치는 건너뜀)
+                now = time.monotonic()
+                for position in range(len(pending) - 1, -1, -1):
+                    if len(running) >= limit:
+                        break
+                    batch, attempt, ready_at = pending[position]
+                    if ready_at > now:
+                        continue
+                    del pending[position]
+                    tokens = sum(token_counts[i] for i in batch)
+                    future = pool.submit(self._embed_batch, [texts[i] for i in batch], tokens)
+                    running[future] = (batch, attempt)
+                    stats['requests'] += 1
+
+                if not running:
+                    time.sleep(max(0.0, min(ready_at for _, _, ready_at in pending) - time.monotonic()))
+                    continue
+                next_ready = min((ready_at for _, _, ready_at in pending), default=None)
+                timeout = None if next_ready is None else max(0.0, next_ready - time.monotonic())
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    batch, attempt = running.pop(future)
+                    try:
+                        vectors = future.result()
+                    except RETRYABLE_ERRORS as error:
+                        if isinstance(error, openai.RateLimitError):
+                            stats['rate_limited'] += 1
+                            limit, successes = max(1, limit // 2), 0
+                        if attempt >= self.max_retries:
+                            logger.warning("embedding batch failed after %d retries (%d chunks): %s",
+                                           attempt, len(batch), error)
+                            failed.extend(batch)
+                            continue
+                        stats['retries'] += 1
+                        retry_at = time.monotonic() + backoff_delay(attempt, error, self.backoff_base)
+                        pending.append((batch, attempt + 1, retry_at))
+                        continue
+                    except openai.BadRequestError as error:
+                        if len(batch) == 1:
+                            logger.warning("embedding chunk %d rejected: %s", batch[0], error)
+                            failed.extend(batch)
+                            continue
+                        stats['split'] += 1
+                        half = len(batch) // 2
+                        pending.extend([(batch[half:], attempt, 0.0), (batch[:half], attempt, 0.0)])
+                        continue
+
+                    for i, vector in zip(batch, vectors):
+                        results[i] = vector
+                    stats['embedded_tokens'] += sum(token_counts[i] for i in batch)
+                    successes += 1
+                    if limit < self.max_concurrency and successes >= limit:
+                        limit, successes = limit + 1, 0
+
+                stats['concurrency'] = limit
+                now = time.perf_counter()
+                if done and (self.progress is not None or now - last_report >= PROGRESS_INTERVAL):
+                    self._report(stats, len(results), len(failed), now - started)
+                    last_report = now
+
+        seconds = time.perf_counter() - started
+        stats.update(self._throughput(stats, len(results), seconds))
+        stats['failed'] = len(failed)
+        dim = len(next(iter(results.values()))) if results else 0
+        vectors = np.zeros((len(texts), dim), dtype=np.float32)
+        if results:
+            rows = np.fromiter(results.keys(), dtype=np.int64, count=len(results))
+            vectors[rows] = np.asarray(list(results.values()), dtype=np.float32)
+        return vectors, sorted(failed), stats
+
+    def _throughput(self, stats: Dict, embedded: int, seconds: float) -> Dict:
+        return {
+            'embedded': embedded,
+            'seconds': seconds,
+            'chunks_per_second': embedded / seconds if seconds else 0.0,
+            'tokens_per_second': stats['embedded_tokens'] / seconds if seconds else 0.0,
+        }
+
+    def _report(self, stats: Dict, embedded: int, failed: int, seconds: float):
+        progress = {**stats, **self._throughput(stats, embedded, seconds), 'failed': failed}
+        if self.progress is not None:
+            self.progress(progress)
+        else:
+            logger.info("embedded %(embedded)d/%(chunks)d chunks (%(chunks_per_second).0f chunks/s, "
+                        "%(tokens_per_second).0f tokens/s, retries %(retries)d, concurrency %(concurrency)d)",
+                        progress)
+
+
+def get_embedding_pipeline(backend: str = OPENAI_BACKEND, api_key: str = None, base_url: str = None,
+                           progress: Callable[[Dict], None] = None) -> EmbeddingPipeline:
+    """백엔드 이름 → 인덱스 빌드용 파이프라인 (재시도는 클라이언트가 아니라 파이프라인이 담당)"""
+    if backend == OPENAI_BACKEND:
+        embeddings = get_embeddings(backend, api_key, base_url, max_retries=0)
+        return EmbeddingPipeline(embeddings, progress=progress)
+    # 로컬 백엔드는 네트워크 호출이 없으므로 속도 제한 없음
+    return EmbeddingPipeline(get_embeddings(backend, api_key), requests_per_minute=None,
+                             tokens_per_minute=None, progress=progress)
@@ -0,0 +1,178 @@
+"""
+하이브리드 검색 (BM25 + 벡터)
+
+장소명·메뉴명("닭갈비", "막국수", "1.5닭갈비")처럼 글자가 그대로 맞아야 하는
+질의는 임베딩 검색보다 어휘 검색이 정확합니다.
+
+- 한국어 문자 바이그램 역색인 + BM25 점수
+- 벡터 검색 결과와 RRF(reciprocal rank fusion)로 결합
+- 질의에 장소명이 그대로 들어 있으면 어휘 색인만으로 답해 임베딩 호출 생략
+- 질의 의도(카테고리/장소/재방문/가격)를 메타데이터 사전 필터로 적용 (query_router)
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from query_router import MetadataColumns, chroma_where, route_filters, route_query
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z가-힣.]+')
+
+
+# ============================================
+# 토크나이저 (문자 바이그램)
+# ============================================
+
+def tokenize(text: str) -> List[str]:
+    """
+    한국어용 문자 바이그램 토큰
+
+    띄어쓰기 단위 어절을 두 글자씩 잘라 조사·어미가 붙어도 매칭되게 합니다.
+    ("닭갈비집은" → 닭갈, 갈비, 비집, 집은) 한 글자 어절은 그대로 둡니다.
+    """
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        word = word.strip('.')
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+# ============================================
+# BM25 역색인
+# ============================================
+
+class BM25Index:
+    """문서 목록에 대한 메모리 내 BM25 역색인 (포스팅별 가중치 사전 계산)"""
+
+    def __init__(self, documents: List[Document], k1: float = BM25_K1, b: float = BM25_B):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+
+        term_docs: Dict[str, List[int]] = {}
+        term_tfs: Dict[str, List[int]] = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_id, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.page_content))
+            lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_docs.setdefault(term, []).append(doc_id)
+                term_tfs.setdefault(term, []).append(tf)
+
+        avg_length = float(lengths.mean()) if len(lengths) else 0.0
+        norm = k1 * (1 - b + b * lengths / max(avg_length, 1e-9))
+        n_docs = len(documents)
+
+        # 포스팅: 용어 → (문서 번호 배열, BM25 가중치 배열)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, doc_ids in term_docs.items():
+            ids = np.asarray(doc_ids, dtype=np.int64)
+            tfs = np.asarray(term_tfs[term], dtype=np.float32)
+            idf = np.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            self.postings[term] = (ids, idf * tfs * (k1 + 1) / (tfs + norm[ids]))
+
+        # 장소명 → 카테고리 (질의 라우팅용), 문서에 있는 메타데이터 키 (필터 가능 키)
+        self.place_categories: Dict[str, str] = {}
+        self.metadata_keys = set()
+        for doc in documents:
+            self.metadata_keys.update(doc.metadata)
+            place_name = doc.metadata.get('place_name')
+            if place_name:
+                self.place_categories.setdefault(place_name, doc.metadata.get('category'))
+        self.metadata = MetadataColumns(documents)
+
+    def search(self, query: str, k: int = 5, filter: Dict = None) -> List[Tuple[Document, float]]:
+        """BM25 상위 k개 (문서, 점수), filter는 Chroma where 절 형식"""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+
+        mask = self.metadata.mask(filter)
+        if mask is not None:
+            scores[~mask] = 0
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+
+# ============================================
+# RRF 결합 검색기
+# ============================================
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int = RRF_K) -> List[Document]:
+    """여러 순위 목록을 RRF 점수(Σ 1/(k + 순위))로 합침 (같은 내용은 하나로)"""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, 1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            # 메타데이터가 있는 쪽(어휘 색인 문서)을 우선 사용
+            if key not in documents or not documents[key].metadata:
+                documents[key] = doc
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25 + 벡터 하이브리드 검색기
+
+    질의 의도를 메타데이터 필터로 바꿔 두 검색 모두에 사전 적용하고,
+    질의에 장소명이 그대로 있으면 그 장소 문서를 어휘 색인에서 바로 반환하고
+    (임베딩 호출 없음), 아니면 두 검색 결과를 RRF로 결합합니다.
+    필터 결과가 비면 필터 없이 다시 검색합니다.
+    """
+
+    vectorstore: Any
+    lexical_index: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = RRF_K
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        route = route_query(query, self.lexical_index.place_categories)
+        filters = route_filters(route, self.lexical_index.metadata_keys)
+
+        place_name = filters.pop('place_name', None)
+        if place_name:
+            exact = self._lexical(query, {**filters, 'place_name': place_name})
+            if exact:
+                others = [doc for doc in self._lexical(query, filters)
+                          if doc.metadata.get('place_name') != place_name]
+                return (exact + others)[:self.k]
+
+        results = self._fuse(query, filters)
+        if not results and filters:
+            results = self._fuse(query, {})
+        return results
+
+    def _lexical(self, query: str, filters: Dict) -> List[Document]:
+        return [doc for doc, _ in self.lexical_index.search(query, self.fetch_k, filter=chroma_where(filters))]
+
+    def _fuse(self, query: str, filters: Dict) -> List[Document]:
+        where = chroma_where(filters)
+        lexical = self._lexical(query, filters)
+        if where:
+            dense = self.vectorstore.similarity_search(query, k=self.fetch_k, filter=where)
+        else:
+            dense = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        return reciprocal_rank_fusion([lexical, dense], self.rrf_k)[:self.k]
@@ -0,0 +1,420 @@
+"""
+거리 기반 일정 최적화
+
+장소 좌표(로컬 지명 사전 gazetteer.csv)로 장소 간 이동 시간 행렬을 미리 계산하고,
+하루 일정을 시간대·카테고리 순서가 정해진 경로 문제로 풀어 가까운 곳끼리 묶습니다.
+
+- 후보: 카테고리 × 우선순위별로 최소 리뷰 수를 넘는 장소 전부 (스냅샷당 한 번 구성, 순위 색인 사용)
+- 목적 함수: 장소 점수(재방문율/긍정률) + 계획별 무작위 흔들림(매번 다른 조합)
+  − 이동 시간 − 시간대 지연(식사 시간 등을 넘긴 분)
+- 풀이: 탐욕 구성 → 지역 탐색 (장소 교체, 같은 카테고리끼리 자리 바꾸기,
+  카테고리 순서가 유지되는 구간 뒤집기(2-opt, 하루 이동 시간이 늘지 않을 때만))
+- 좌표가 없는 장소는 최적화할 때만 UNKNOWN_TRAVEL_MINUTES로 보고, 결과에는 이동 시간·거리를
+  None으로 표시 (routing['available']가 False면 지명 사전에 좌표가 부족해 동선 최적화가 안 된 일정)
+
+지명 사전 형식 (UTF-8 CSV):
+    place_name,lat,lng
+    남이섬,37.79,127.52
+"""
+import csv
+import os
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from review_store import REVIEWS_BASE_PATH
+from place_ranking import MIN_REVIEWS, PlaceRankingIndex
+from query_router import normalize_name
+
+GAZETTEER_FILE = 'gazetteer.csv'
+GAZETTEER_PATH = os.path.join(REVIEWS_BASE_PATH, GAZETTEER_FILE)
+
+DEFAULT_CATEGORIES = ['맛집 리뷰', '명소 리뷰', '카페 리뷰']
+PRIORITY_KEYS = {'재방문율': 'revisit_rate', '긍정 평가': 'positive_rate'}
+# 카테고리 × 우선순위별 후보 수 (None = 최소 리뷰 수를 넘는 장소 전부)
+POOL_SIZE = None
+
+# 이동 시간 추정: 직선거리 × 도로 우회 계수 ÷ 평균 속도 + 주차·도보
+ROAD_FACTOR = 1.3
+SPEED_KMH = 35.0
+FIXED_TRAVEL_MINUTES = 5.0
+UNKNOWN_TRAVEL_MINUTES = 20.0
+# 한 구간 이동 상한 (넘는 후보는 다른 후보가 없을 때만 사용)
+MAX_LEG_MINUTES = 60.0
+
+# 활동별 머무는 시간 (분)
+DWELL_MINUTES = {'카페': 50, '명소': 90, '맛집': 60}
+
+# 목적 함수 가중치 (장소 점수는 0~1)
+TRAVEL_WEIGHT = 0.01          # 이동 10분 ≈ 점수 0.1
+LATE_WEIGHT = 0.02            # 예정 시각보다 10분 늦으면 ≈ 점수 0.2
+DIVERSITY = 0.15              # 계획마다 후보 점수에 더하는 흔들림 폭
+OVERNIGHT_WEIGHT = 0.5        # 전날 마지막 장소 → 다음 날 첫 장소 이동 가중치
+MAX_PASSES = 8
+
+# 고유 명세가 이보다 적으면 프로세스 풀 없이 바로 계산
+MIN_PARALLEL_SPECS = 64
+
+
+# ============================================
+# 지명 사전 / 이동 시간 행렬
+# ============================================
+
+def load_gazetteer(path: str = GAZETTEER_PATH) -> Dict[str, Tuple[float, float]]:
+    """장소명 → (위도, 경도) (파일이 없으면 빈 사전)"""
+    if not os.path.exists(path):
+        return {}
+    gazetteer = {}
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                gazetteer[row['place_name'].strip()] = (float(row['lat']), float(row['lng']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return gazetteer
+
+
+def travel_matrix(coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    좌표 (n, 2) → (거리 km, 이동 분) 행렬
+
+    좌표가 NaN인 장소는 거리 NaN, 이동 시간 UNKNOWN_TRAVEL_MINUTES
+    """
+    lat = np.radians(coords[:, 0])[:, None]
+    lng = np.radians(coords[:, 1])[:, None]
+    a = (np.sin((lat - lat.T) / 2) ** 2
+         + np.cos(lat) * np.cos(lat.T) * np.sin((lng - lng.T) / 2) ** 2)
+    km = (2 * 6371.0 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))).astype(np.float32)
+    minutes = km * ROAD_FACTOR / SPEED_KMH * 60 + FIXED_TRAVEL_MINUTES
+    minutes[np.isnan(minutes)] = UNKNOWN_TRAVEL_MINUTES
+    np.fill_diagonal(minutes, 0)
+    return km, minutes.astype(np.float32)
+
+
+def day_slots(day: int, days: int, categories: List[str], rng: random.Random) -> List[Tuple[str, str]]:
+    """하루 시간대 [(예정 시각, 카테고리)] (아침 카페 → 명소 → 점심 → 명소 → 카페 → 저녁)"""
+    slots = []
+    if day > 1:
+        slots.append(('09:00', '카페 리뷰'))
+    slots.append(('10:30' if day > 1 else '10:00', '명소 리뷰'))
+    slots.append(('12:30', '맛집 리뷰'))
+    if day < days:
+        slots.append(('14:30', '명소 리뷰'))
+        # 오후 카페는 절반 확률로 추가
+        if rng.random() > 0.5:
+            slots.append(('16:00', '카페 리뷰'))
+    slots.append(('18:30', '맛집 리뷰'))
+    return [(time, category) for time, category in slots if category in categories]
+
+
+def priority_key(priorities: str) -> str:
+    """우선순위 이름 → 장소 통계 키 (모르는 이름은 ValueError)"""
+    if priorities not in PRIORITY_KEYS:
+        raise ValueError(f"우선순위는 {list(PRIORITY_KEYS)} 중 하나여야 합니다: {priorities!r}")
+    return PRIORITY_KEYS[priorities]
+
+
+def to_minutes(time: str) -> int:
+    hour, minute = time.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+def to_clock(minutes: float) -> str:
+    # 10분 단위로 올림
+    minutes = int(-(-minutes // 10) * 10)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@dataclass(frozen=True)
+class ItinerarySpec:
+    """일정 명세 (같은 명세 + 같은 스냅샷 → 같은 일정)"""
+    duration: str = "1박 2일"
+    categories: Tuple[str, ...] = tuple(DEFAULT_CATEGORIES)
+    priorities: str = "재방문율"
+    seed: int = 0
+
+    def normalized(self) -> "ItinerarySpec":
+        """결과에 영향 없는 차이(카테고리 순서·중복)를 없앤 명세 (중복 제거용, 모르는 우선순위는 ValueError)"""
+        priority_key(self.priorities)
+        categories = tuple(sorted(set(self.categories or DEFAULT_CATEGORIES)))
+        return ItinerarySpec(self.duration, categories, self.priorities, int(self.seed))
+
+
+# ============================================
+# 일정 최적화
+# ============================================
+
+class ItineraryPlanner:
+    """한 스냅샷의 후보 풀과 이동 시간 행렬 (계획마다 재사용)"""
+
+    def __init__(self, place_analysis: Dict[str, Dict], ranking: PlaceRankingIndex = None,
+                 gazetteer: Dict[str, Tuple[float, float]] = None, pool_size: Optional[int] = POOL_SIZE):
+        ranking = ranking or PlaceRankingIndex(place_analysis)
+        gazetteer = load_gazetteer() if gazetteer is None else gazetteer
+        normalized = {normalize_name(name): coord for name, coord in gazetteer.items()}
+
+        self.names: List[str] = []
+        index: Dict[str, int] = {}
+        self.pools: Dict[tuple, np.ndarray] = {}
+        for category in DEFAULT_CATEGORIES:
+            for sort_key in PRIORITY_KEYS.values():
+                pool = []
+                limit = ranking.count(category, sort_key, MIN_REVIEWS) if pool_size is None else pool_size
+                for name, _ in ranking.top(category, sort_key, limit, 0, MIN_REVIEWS):
+                    if name not in index:
+                        index[name] = len(self.names)
+                        self.names.append(name)
+                    pool.append(index[name])
+                self.pools[(category, sort_key)] = np.array(pool, dtype=np.int64)
+
+        # 후보 장소 통계만 보관 (프로세스 풀로 보낼 때 크기 최소화)
+        self.stats = {name: place_analysis[name] for name in self.names}
+
+        coords = np.full((len(self.names), 2), np.nan)
+        for i, name in enumerate(self.names):
+            coord = gazetteer.get(name) or normalized.get(normalize_name(name))
+            if coord:
+                coords[i] = coord
+        self.located = int((~np.isnan(coords[:, 0])).sum())
+        self.km, self.minutes = travel_matrix(coords)
+        self.values = {
+            sort_key: np.array([self.stats[name].get(sort_key, 0) / 100 for name in self.names],
+                               dtype=np.float32)
+            for sort_key in PRIORITY_KEYS.values()
+        }
+
+    # 하루 경로 평가 -----------------------------------------------------
+
+    def _schedule(self, route: List[int], slots: List[Tuple[str, str]]) -> Tuple[List[float], float]:
+        """경로의 실제 시각(분)과 지연 합계"""
+        times, late = [], 0.0
+        for k, (place, (time, category)) in enumerate(zip(route, slots)):
+            planned = to_minutes(time)
+            if k == 0:
+                actual = planned
+            else:
+                prev_type = slots[k - 1][1].replace(' 리뷰', '')
+                arrival = times[-1] + DWELL_MINUTES.get(prev_type, 60) + self.minutes[route[k - 1], place]
+                actual = max(planned, arrival)
+            late += actual - planned
+            times.append(actual)
+        return times, late
+
+    def _objective(self, route: List[int], slots: List[Tuple[str, str]], utility: np.ndarray,
+                   start: Optional[int]) -> float:
+        travel = sum(self.minutes[a, b] for a, b in zip(route, route[1:]))
+        if start is not None and route:
+            travel += OVERNIGHT_WEIGHT * self.minutes[start, route[0]]
+        _, late = self._schedule(route, slots)
+        return float(utility[route].sum()) - TRAVEL_WEIGHT * travel - LATE_WEIGHT * late
+
+    def _candidates(self, pool: np.ndarray, blocked: np.ndarray) -> np.ndarray:
+        return pool[~blocked[pool]]
+
+    # 탐욕 구성 ------------------------------------------------------------
+
+    def _construct(self, slots, pools, utility, used, start):
+        route, kept = [], []
+        blocked = used.copy()
+        prev = start
+        for slot, pool in zip(slots, pools):
+            candidates = self._candidates(pool, blocked)
+            if not len(candidates):
+                continue
+            gain = utility[candidates].copy()
+            if prev is not None:
+                legs = self.minutes[prev, candidates]
+                weight = OVERNIGHT_WEIGHT if not route else 1.0
+                gain -= TRAVEL_WEIGHT * weight * legs
+                near = legs <= MAX_LEG_MINUTES
+                if near.any():
+                    gain[~near] = -np.inf
+            choice = int(candidates[int(np.argmax(gain))])
+            route.append(choice)
+            kept.append(slot)
+            blocked[choice] = True
+            prev = choice
+        return route, kept
+
+    # 지역 탐색 ------------------------------------------------------------
+
+    def _improve(self, route, slots, pools, utility, used, start):
+        best = self._objective(route, slots, utility, start)
+        for _ in range(MAX_PASSES):
+            improved = False
+
+            # 1) 장소 교체: 앞뒤 이동을 고려해 자리마다 가장 나은 미사용 후보
+            for k in range(len(route)):
+                blocked = used.copy()
+                blocked[route] = True
+                candidates = self._candidates(pools[k], blocked)
+                if not len(candidates):
+                    continue
+                gain = utility[candidates].copy()
+                if k > 0:
+                    gain -= TRAVEL_WEIGHT * self.minutes[route[k - 1], candidates]
+                elif start is not None:
+                    gain -= TRAVEL_WEIGHT * OVERNIGHT_WEIGHT * self.minutes[start, candidates]
+                if k + 1 < len(route):
+                    gain -= TRAVEL_WEIGHT * self.minutes[candidates, route[k + 1]]
+                trial = list(route)
+                trial[k] = int(candidates[int(np.argmax(gain))])
+                score = self._objective(trial, slots, utility, start)
+                if score > best + 1e-9:
+                    route, best, improved = trial, score, True
+
+            # 2) 같은 카테고리 자리끼리 바꾸기
+            for i in range(len(route)):
+                for j in range(i + 1, len(route)):
+                    if slots[i][1] != slots[j][1]:
+                        continue
+                    trial = list(route)
+                    trial[i], trial[j] = trial[j], trial[i]
+                    score = self._objective(trial, slots, utility, start)
+                    if score > best + 1e-9:
+                        route, best, improved = trial, score, True
+
+            # 3) 2-opt: 카테고리 순서가 그대로인 구간만 뒤집기
+            route, best, shortened = self._two_opt(route, slots, utility, start, best)
+            improved = improved or shortened
+
+            if not improved:
+                break
+        return route
+
+    def _day_travel(self, route: List[int]) -> float:
+        return float(sum(self.minutes[a, b] for a, b in zip(route, route[1:])))
+
+    def _two_opt(self, route, slots, utility, start, best):
+        """
+        카테고리 순서가 그대로인 구간 뒤집기
+
+        하루 이동 시간이 늘지 않고 목적 함수가 좋아질 때만 받아들임 (지연만 줄이는 뒤집기는 제외)
+
+        Returns:
+            (경로, 목적 함수 값, 바뀌었는지)
+        """
+        improved = False
+        travel = self._day_travel(route)
+        for i in range(len(route) - 1):
+            for j in range(i + 2, len(route)):
+                segment = [category for _, category in slots[i:j + 1]]
+                if segment != segment[::-1]:
+                    continue
+                trial = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                trial_travel = self._day_travel(trial)
+                if trial_travel > travel + 1e-6:
+                    continue
+                score = self._objective(trial, slots, utility, start)
+                if score > best + 1e-9:
+                    route, best, travel, improved = trial, score, trial_travel, True
+        return route, best, improved
+
+    # 계획 ----------------------------------------------------------------
+
+    def plan(self, duration: str = "1박 2일", categories: List[str] = None,
+             priorities: str = "재방문율", seed: int = None) -> Dict:
+        """
+        일정 생성 (generate_itinerary와 같은 형식 + 구간별 이동 시간/거리)
+
+        같은 seed면 같은 일정, seed가 없으면 매번 다른 조합
+        """
+        rng = random.Random(seed)
+        nights = int(duration[0]) if duration else 1
+        days = nights + 1
+        categories = categories or DEFAULT_CATEGORIES
+        sort_key = priority_key(priorities)
+
+        jitter = np.random.default_rng(rng.getrandbits(64)).uniform(0, DIVERSITY, len(self.names))
+        utility = self.values[sort_key] + jitter.astype(np.float32)
+        used = np.zeros(len(self.names), dtype=bool)
+
+        itinerary = {'duration': duration, 'days': [], 'routing': self.routing()}
+        start = None
+        for day in range(1, days + 1):
+            slots = day_slots(day, days, categories, rng)
+            pools = [self.pools[(category, sort_key)] for _, category in slots]
+            route, slots = self._construct(slots, pools, utility, used, start)
+            pools = [self.pools[(category, sort_key)] for _, category in slots]
+            route = self._improve(route, slots, pools, utility, used, start)
+            used[route] = True
+            if route:
+                start = route[-1]
+            itinerary['days'].append(self._day_plan(day, route, slots))
+        return itinerary
+
+    def routing(self) -> Dict:
+        """동선 최적화 가능 여부 {'available', 'located'(좌표 있는 후보 수), 'candidates'}"""
+        return {'available': self.located >= 2, 'located': self.located, 'candidates': len(self.names)}
+
+    def _day_plan(self, day: int, route: List[int], slots: List[Tuple[str, str]]) -> Dict:
+        """하루 일정 (좌표가 없는 구간은 travel_minutes·distance_km가 None, 하루 합계도 None)"""
+        times, _ = self._schedule(route, slots)
+        activities = []
+        for k, (place, (_, category), time) in enumerate(zip(route, slots, times)):
+            prev = route[k - 1] if k else None
+            distance = float(self.km[prev, place]) if prev is not None else 0.0
+            located = not np.isnan(distance)
+            activities.append({
+                'time': to_clock(time),
+                'type': category.replace(' 리뷰', ''),
+                'place': self.names[place],
+                'stats': self.stats[self.names[place]],
+                'travel_minutes': (round(float(self.minutes[prev, place])) if prev is not None else 0)
+                                  if located else None,
+                'distance_km': round(distance, 1) if located else None,
+            })
+        legs = [activity['travel_minutes'] for activity in activities]
+        return {
+            'day': day,
+            'activities': activities,
+            'travel_minutes': None if None in legs else sum(legs),
+        }
+
+    def plan_spec(self, spec: ItinerarySpec) -> Dict:
+        return self.plan(spec.duration, list(spec.categories), spec.priorities, spec.seed)
+
+
+# ============================================
+# 일괄 계획 (프로세스 풀)
+# ============================================
+
+_worker_planner: Optional[ItineraryPlanner] = None
+
+
+def _init_worker(planner: ItineraryPlanner):
+    global _worker_planner
+    _worker_planner = planner
+
+
+def _plan_in_worker(spec: ItinerarySpec) -> Dict:
+    return _worker_planner.plan_spec(spec)
+
+
+def plan_batch(planner: ItineraryPlanner, specs: List[ItinerarySpec], workers: int = None) -> List[Dict]:
+    """
+    여러 명세를 한 번에 계획
+
+    같은 명세는 한 번만 계산해 결과를 공유하고, 고유 명세가 많으면 프로세스 풀로 분산합니다
+    (후보 풀·이동 시간 행렬은 워커마다 한 번만 전달). 결과는 입력 순서대로이며
+    워커 수와 관계없이 동일합니다.
+    """
+    normalized = [spec.normalized() for spec in specs]
+    unique = list(dict.fromkeys(normalized))
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(unique))
+    if workers > 1 and len(unique) >= MIN_PARALLEL_SPECS:
+        # 파일 감시·이벤트 루프 스레드가 도는 프로세스에서 호출되므로 fork 대신 spawn (review_store와 같은 이유)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(planner,),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_plan_in_worker, unique, chunksize=max(1, len(unique) // (workers * 4))))
+    else:
+        results = [planner.plan_spec(spec) for spec in unique]
+
+    plans = dict(zip(unique, results))
+    return [plans[spec] for spec in normalized]
@@ -0,0 +1,292 @@
+"""
+비동기 LLM 게이트웨이
+
+프로세스 전체에서 하나의 이벤트 루프(백그라운드 스레드)와 연결 풀을 공유하며
+모든 세션의 채팅 요청을 처리합니다. Streamlit 스크립트 스레드는 stream()으로
+동기 이터레이터를 받아 st.write_stream에 그대로 넘깁니다.
+
+- 연결 풀: API 키/주소별 AsyncOpenAI 클라이언트 하나 (httpx keep-alive 재사용)
+- 동시 실행 제한: 세마포어 (max_concurrency)
+- 속도 제한: 분당 요청 수 / 분당 토큰 수 토큰 버킷
+- 재시도: 429·5xx·연결 오류는 지수 백오프(+지터, Retry-After 존중)로 재시도
+  (첫 조각을 보낸 뒤의 오류는 재시도하지 않고 그대로 전달)
+- 요청 합치기: 같은 (주소, 모델, 온도, 메시지) 요청이 진행 중이면
+  새로 호출하지 않고 진행 중인 스트림을 함께 구독 (이미 받은 조각부터 재생)
+
+base_url을 llm_stub 서버로 바꾸면 네트워크·API 키 없이 테스트할 수 있습니다.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+import openai
+
+from context_budget import count_tokens
+
+MAX_CONCURRENCY = 16
+MAX_CONNECTIONS = 32
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 200_000
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+REQUEST_TIMEOUT = 60.0
+
+# temperature를 받지 않는 추론 모델
+REASONING_MODEL_PREFIXES = ('gpt-5', 'o1', 'o3', 'o4')
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+ROLE_NAMES = {'human': 'user', 'ai': 'assistant', 'system': 'system'}
+
+
+@dataclass(frozen=True)
+class ChatRequest:
+    """채팅 요청 (messages: [{'role', 'content'}])"""
+    model: str
+    messages: tuple
+    temperature: float = 0.7
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+
+    @classmethod
+    def from_messages(cls, model: str, messages: list, temperature: float = 0.7, **kwargs) -> "ChatRequest":
+        """LangChain 메시지 또는 dict 목록으로 요청 생성"""
+        converted = []
+        for message in messages:
+            if isinstance(message, dict):
+                converted.append((message['role'], message['content']))
+            else:
+                converted.append((ROLE_NAMES.get(message.type, message.type), message.content))
+        return cls(model, tuple(converted), temperature, **kwargs)
+
+    def payload(self) -> Dict:
+        payload = {
+            'model': self.model,
+            'messages': [{'role': role, 'content': content} for role, content in self.messages],
+        }
+        if not self.model.startswith(REASONING_MODEL_PREFIXES):
+            payload['temperature'] = self.temperature
+        return payload
+
+    def key(self) -> str:
+        """요청 합치기용 키 (API 키는 제외, 주소는 포함)"""
+        body = json.dumps([self.base_url, self.payload()], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+    def prompt_tokens(self) -> int:
+        return sum(count_tokens(content, self.model) + 4 for _, content in self.messages)
+
+
+class TokenBucket:
+    """
+    토큰 버킷 (rate: 초당 충전량, capacity: 최대 적립량)
+
+    요청마다 토큰을 먼저 차감(모자라면 음수)하고 모자란 만큼 기다리므로 대기 순서대로 처리되며,
+    이벤트 루프(acquire)와 스레드(acquire_blocking) 양쪽에서 같은 버킷을 쓸 수 있습니다.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """cost만큼 차감하고 기다려야 할 초 (0이면 바로 진행)"""
+        cost = min(cost, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, cost: float = 1.0):
+        delay = self.reserve(cost)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self, cost: float = 1.0):
+        delay = self.reserve(cost)
+        if delay:
+            time.sleep(delay)
+
+
+def backoff_delay(attempt: int, error: BaseException, base: float = BACKOFF_BASE) -> float:
+    """지수 백오프 + 지터 (서버가 Retry-After를 주면 그 값 이상)"""
+    delay = min(BACKOFF_MAX, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            delay = max(delay, float(response.headers.get('retry-after', 0)))
+        except ValueError:
+            pass
+    return delay
+
+
+@dataclass
+class _Flight:
+    """진행 중인 요청 하나 (여러 구독자가 같은 조각 목록을 읽음)"""
+    chunks: List[str] = field(default_factory=list)
+    usage: Dict = field(default_factory=dict)
+    done: bool = False
+    error: Optional[BaseException] = None
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+
+class LLMGateway:
+    """프로세스 전체에서 공유하는 비동기 LLM 게이트웨이"""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY,
+                 requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 max_connections: int = MAX_CONNECTIONS, timeout: float = REQUEST_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+        # 루프에 묶이는 객체는 루프 스레드에서 생성
+        asyncio.run_coroutine_threadsafe(self._setup(), self._loop).result()
+
+        self._clients: Dict[tuple, openai.AsyncOpenAI] = {}
+        self._inflight: Dict[str, _Flight] = {}
+        self.stats = {'requests': 0, 'upstream_calls': 0, 'coalesced': 0, 'retries': 0, 'errors': 0}
+
+    async def _setup(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._request_bucket = TokenBucket(self.requests_per_minute / 60, max(1.0, self.requests_per_minute / 60))
+        self._token_bucket = TokenBucket(self.tokens_per_minute / 60, self.tokens_per_minute / 6)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            timeout=self.timeout,
+        )
+
+    def _client(self, request: ChatRequest) -> openai.AsyncOpenAI:
+        key = (request.api_key, request.base_url)
+        if key not in self._clients:
+            self._clients[key] = openai.AsyncOpenAI(
+                api_key=request.api_key or "unused", base_url=request.base_url,
+                http_client=self._http, max_retries=0,
+            )
+        return self._clients[key]
+
+    async def _notify(self, flight: _Flight):
+        async with flight.changed:
+            flight.changed.notify_all()
+
+    async def _run(self, key: str, request: ChatRequest, flight: _Flight):
+        """실제 API 호출 (재시도 포함), 결과 조각을 flight에 적재"""
+        prompt_tokens = request.prompt_tokens()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._semaphore:
+                        await self._request_bucket.acquire()
+                        await self._token_bucket.acquire(prompt_tokens)
+                        self.stats['upstream_calls'] += 1
+                        stream = await self._client(request).chat.completions.create(
+                            **request.payload(), stream=True, stream_options={'include_usage': True})
+                        async for chunk in stream:
+                            if chunk.usage:
+                                flight.usage = chunk.usage.model_dump()
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                flight.chunks.append(delta)
+                                await self._notify(flight)
+                    break
+                except RETRYABLE_ERRORS as error:
+                    if flight.chunks or attempt == self.max_retries:
+                        raise
+                    self.stats['retries'] += 1
+                    await asyncio.sleep(backoff_delay(attempt, error, self.backoff_base))
+        except BaseException as error:
+            self.stats['errors'] += 1
+            flight.error = error
+        finally:
+            flight.done = True
+            self._inflight.pop(key, None)
+            await self._notify(flight)
+
+    async def _subscribe(self, request: ChatRequest, usage: Optional[Dict]) -> AsyncIterator[str]:
+        """요청 합치기: 진행 중인 같은 요청이 있으면 구독만, 없으면 새로 시작"""
+        self.stats['requests'] += 1
+        key = request.key()
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = _Flight()
+            asyncio.ensure_future(self._run(key, request, flight))
+        else:
+            self.stats['coalesced'] += 1
+
+        position = 0
+        while True:
+            async with flight.changed:
+                await flight.changed.wait_for(lambda: flight.done or len(flight.chunks) > position)
+            pending = flight.chunks[position:]
+            position += len(pending)
+            for chunk in pending:
+                yield chunk
+            if flight.done and position == len(flight.chunks):
+                break
+
+        if flight.error is not None:
+            raise flight.error
+        if usage is not None:
+            usage.update(flight.usage)
+
+    def stream(self, request: ChatRequest, usage: Optional[Dict] = None) -> Iterator[str]:
+        """
+        동기 스트림 (Streamlit 스크립트 스레드용)
+
+        Args:
+            usage: 주어지면 완료 후 토큰 사용량(prompt/completion/total_tokens)을 기록
+        """
+        agen = self._subscribe(request, usage)
+        while True:
+            future = asyncio.run_coroutine_threadsafe(agen.__anext__(), self._loop)
+            try:
+                yield future.result()
+            except StopAsyncIteration:
+                return
+
+    async def astream(self, request: ChatRequest, usage: Optional[Dict] = None) -> AsyncIterator[str]:
+        """비동기 스트림 (다른 이벤트 루프, 예: ASGI 서버에서 사용)"""
+        agen = self._subscribe(request, usage)
+        while True:
+            future = asyncio.run_coroutine_threadsafe(agen.__anext__(), self._loop)
+            try:
+                yield await asyncio.wrap_future(future)
+            except StopAsyncIteration:
+                return
+
+    def complete(self, request: ChatRequest, usage: Optional[Dict] = None) -> str:
+        """스트림을 끝까지 받아 문자열로 반환"""
+        return "".join(self.stream(request, usage))
+
+    def close(self):
+        # 중간에 끊긴 스트림의 async generator를 루프 안에서 정리한 뒤 루프 종료
+        asyncio.run_coroutine_threadsafe(self._loop.shutdown_asyncgens(), self._loop).result()
+        asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,199 @@
+"""
+OpenAI 호환 스텁 서버 (테스트·부하 측정용)
+
+/v1/chat/completions 요청에 고정 답변을 SSE 스트림(또는 JSON)으로 돌려주고,
+/v1/embeddings 요청에는 입력별로 고정된(해시 기반) 벡터를 돌려줍니다.
+지연(채팅은 조각 간, 임베딩은 요청당), 429 오류 비율(또는 처음 N개 요청), 동시 처리 한도(넘으면 429),
+채팅 스트림 중간 끊김, 특정 문자열이 든 임베딩 입력의 400 오류를 조절할 수 있어 게이트웨이·임베딩 파이프라인의 재시도·속도 제한을
+네트워크나 API 키 없이 확인할 수 있습니다.
+
+사용법:
+    python llm_stub.py --port 8001 --delay 0.02 --fail-rate 0.1 --max-inflight 20
+    → LLMGateway 요청·임베딩의 base_url="http://127.0.0.1:8001/v1"
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import struct
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = "춘천 닭갈비 골목의 1.5닭갈비 본점을 추천합니다. 재방문율이 높고 긍정 평가가 많습니다."
+STUB_EMBEDDING_DIM = 64
+
+
+def stub_embedding(item, dim: int = STUB_EMBEDDING_DIM) -> list:
+    """입력(문자열 또는 토큰 목록) → 해시 기반 단위 벡터 (같은 입력이면 같은 벡터)"""
+    seed = hashlib.sha1(json.dumps(item, ensure_ascii=False).encode('utf-8')).digest()
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+
+class StubState:
+    def __init__(self, delay: float = 0.02, fail_rate: float = 0.0, max_inflight: int = 0,
+                 retry_after: float = 1.0, answer: str = STUB_ANSWER, fail_first: int = 0,
+                 cut_after: int = 0, reject: str = None):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        # 처음 fail_first개 요청은 무조건 429 / 채팅 스트림은 cut_after조각 뒤 연결을 끊음 (0: 끄기)
+        self.fail_first = fail_first
+        self.cut_after = cut_after
+        # 이 문자열이 든 입력이 있는 임베딩 요청은 400 (배치 나누기 확인용)
+        self.reject = reject
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+        self.answer = answer
+        self.requests = 0
+        self.failures = 0
+        self.inflight = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: StubState):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict, headers: dict = None):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/stats'):
+                self._send_json(200, {'requests': state.requests, 'failures': state.failures})
+            else:
+                self._send_json(404, {'error': {'message': 'not found'}})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            with state.lock:
+                state.requests += 1
+                fail = (state.requests <= state.fail_first
+                        or random.random() < state.fail_rate
+                        or 0 < state.max_inflight <= state.inflight)
+                if fail:
+                    state.failures += 1
+                else:
+                    state.inflight += 1
+            if fail:
+                self._send_json(429, {'error': {'message': 'Rate limit reached (stub)', 'type': 'rate_limit'}},
+                                {'Retry-After': f"{state.retry_after:g}"})
+                return
+            try:
+                self._respond(body)
+            finally:
+                with state.lock:
+                    state.inflight -= 1
+
+        def _respond(self, body: dict):
+            if self.path.rstrip('/').endswith('/embeddings'):
+                self._respond_embeddings(body)
+            else:
+                self._respond_chat(body)
+
+        def _respond_embeddings(self, body: dict):
+            inputs = body.get('input', [])
+            if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            if state.reject and any(isinstance(item, str) and state.reject in item for item in inputs):
+                self._send_json(400, {'error': {'message': 'Invalid input (stub)', 'type': 'invalid_request_error'}})
+                return
+            dim = body.get('dimensions') or STUB_EMBEDDING_DIM
+            time.sleep(state.delay)
+            data = []
+            for index, item in enumerate(inputs):
+                vector = stub_embedding(item, dim)
+                if body.get('encoding_format') == 'base64':
+                    vector = base64.b64encode(struct.pack(f'<{dim}f', *vector)).decode('ascii')
+                data.append({'object': 'embedding', 'index': index, 'embedding': vector})
+            tokens = sum(len(item) for item in inputs)
+            self._send_json(200, {'object': 'list', 'model': body.get('model', 'stub'), 'data': data,
+                                  'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}})
+
+        def _respond_chat(self, body: dict):
+            model = body.get('model', 'stub')
+            pieces = [piece + ' ' for piece in state.answer.split(' ')]
+            prompt_tokens = sum(len(m.get('content', '')) for m in body.get('messages', []))
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(pieces),
+                     'total_tokens': prompt_tokens + len(pieces)}
+            base = {'id': 'chatcmpl-stub', 'created': int(time.time()), 'model': model}
+
+            if not body.get('stream'):
+                time.sleep(state.delay * len(pieces))
+                self._send_json(200, {**base, 'object': 'chat.completion', 'usage': usage, 'choices': [{
+                    'index': 0, 'finish_reason': 'stop',
+                    'message': {'role': 'assistant', 'content': state.answer}}]})
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            def send_event(payload):
+                data = f"data: {payload}\n\n".encode('utf-8')
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            chunk = {**base, 'object': 'chat.completion.chunk'}
+            for sent, piece in enumerate(pieces):
+                if 0 < state.cut_after <= sent:
+                    # 마지막 청크 없이 연결을 닫아 스트림 중간 오류를 흉내 냄
+                    self.close_connection = True
+                    return
+                time.sleep(state.delay)
+                send_event(json.dumps({**chunk, 'choices': [{'index': 0, 'delta': {'content': piece},
+                                                             'finish_reason': None}]}, ensure_ascii=False))
+            send_event(json.dumps({**chunk, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}))
+            if (body.get('stream_options') or {}).get('include_usage'):
+                send_event(json.dumps({**chunk, 'choices': [], 'usage': usage}))
+            send_event('[DONE]')
+            self.wfile.write(b"0\r\n\r\n")
+
+    return StubHandler
+
+
+def start_stub_server(port: int = 0, **kwargs) -> tuple:
+    """백그라운드 스레드로 스텁 서버 시작 → (서버, 상태, base_url)"""
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스텁 서버")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--delay', type=float, default=0.02, help="채팅 조각 간 / 임베딩 요청당 지연 (초)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument('--max-inflight', type=int, default=0, help="동시 처리 한도 (0: 무제한)")
+    parser.add_argument('--fail-first', type=int, default=0, help="처음 N개 요청은 429")
+    parser.add_argument('--cut-after', type=int, default=0, help="채팅 스트림을 N조각 뒤 끊음 (0: 끊지 않음)")
+    args = parser.parse_args()
+
+    server, _, base_url = start_stub_server(args.port, delay=args.delay, fail_rate=args.fail_rate,
+                                            max_inflight=args.max_inflight, fail_first=args.fail_first,
+                                            cut_after=args.cut_after)
+    print(f"스텁 서버: {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+장소별 리뷰 분석 엔진
+
+리뷰 수집 시 계산해 둔 리뷰 단위 특징 컬럼(review_features)을
+장소별 groupby 한 번으로 집계합니다. 요청 처리 중에는 본문을 정규식으로 훑지 않습니다.
+"""
+import threading
+from typing import Dict
+
+import pandas as pd
+
+from review_features import (
+    FEATURE_COLUMNS, with_features, keyword_counts, prices_by_group, top_keywords, price_summary,
+)
+from review_store import REVIEW_COLUMNS
+
+RECENT_REVIEW_COUNT = 3
+# recent_reviews 항목 컬럼 (review_date는 'YYYY-MM-DD', 날짜 없으면 '')
+RECENT_COLUMNS = REVIEW_COLUMNS + ['review_date']
+
+
+# ============================================
+# 리뷰 단위 플래그 (수집 시 계산한 특징 컬럼)
+# ============================================
+
+def review_flags(reviews: pd.DataFrame) -> pd.DataFrame:
+    """리뷰마다 재방문 여부, 방문 횟수, 긍정/부정 여부, 키워드, 가격 (특징 컬럼이 없으면 계산)"""
+    features = with_features(reviews)
+    return pd.DataFrame({
+        'place_name': reviews['place_name'],
+        'category': reviews['category'],
+        **{name: features[name] for name in FEATURE_COLUMNS},
+    })
+
+
+# ============================================
+# 장소별 집계
+# ============================================
+
+def compute_place_stats(reviews: pd.DataFrame, flags: pd.DataFrame = None) -> pd.DataFrame:
+    """장소별 통계 테이블 (한 행 = 장소 하나, 리뷰 테이블 첫 등장 순서)"""
+    if flags is None:
+        flags = review_flags(reviews)
+    stats = flags.groupby('place_name', observed=True, sort=False).agg(
+        category=('category', 'first'),
+        total_reviews=('is_revisit', 'size'),
+        revisit_count=('is_revisit', 'sum'),
+        positive_count=('is_positive', 'sum'),
+        negative_count=('is_negative', 'sum'),
+        avg_visit_count=('visit_number', 'mean'),
+    )
+    stats['revisit_rate'] = stats['revisit_count'] / stats['total_reviews'] * 100
+    stats['positive_rate'] = stats['positive_count'] / stats['total_reviews'] * 100
+    stats['avg_visit_count'] = stats['avg_visit_count'].fillna(1.0)
+    return stats
+
+
+def newest_reviews(reviews: pd.DataFrame, review_date: pd.Series, keys: list,
+                   limit: int = RECENT_REVIEW_COUNT) -> pd.DataFrame:
+    """그룹(keys)별 최신 리뷰 limit개 (날짜 내림차순, 같은 날은 테이블 순서, 날짜 없는 리뷰는 뒤)"""
+    dates = review_date.sort_values(ascending=False, kind='stable', na_position='last')
+    picked = dates.groupby([key.loc[dates.index] for key in keys], observed=True, sort=False).head(limit).index
+    records = reviews.loc[picked, REVIEW_COLUMNS]
+    return records.assign(review_date=dates.loc[picked].dt.strftime('%Y-%m-%d').fillna(''))
+
+
+def recent_reviews_by_place(reviews: pd.DataFrame, limit: int = RECENT_REVIEW_COUNT,
+                            review_date: pd.Series = None) -> Dict[str, list]:
+    """장소별 최신 리뷰 limit개 (RECENT_COLUMNS dict 목록, 최신순)"""
+    if review_date is None:
+        review_date = with_features(reviews)['review_date']
+    records = newest_reviews(reviews, review_date, [reviews['place_name']], limit).to_dict('records')
+    by_place = {}
+    for record in records:
+        by_place.setdefault(record['place_name'], []).append(record)
+    return by_place
+
+
+def analyze_places(reviews: pd.DataFrame) -> Dict:
+    """
+    장소별 리뷰 분석
+
+    Returns:
+        {장소명: {'category', 'total_reviews', 'revisit_count', 'revisit_rate',
+                 'positive_count', 'negative_count', 'positive_rate',
+                 'avg_visit_count', 'recent_reviews', 'keywords',
+                 'price_mentions', 'median_price', 'price_p25', 'price_p75'}}
+    """
+    flags = review_flags(reviews)
+    stats = compute_place_stats(reviews, flags)
+    recent = recent_reviews_by_place(reviews, review_date=flags['review_date'])
+    keywords = keyword_counts(flags['keyword_mask'], [flags['place_name']])
+    prices = prices_by_group(flags['prices'], [flags['place_name']])
+
+    place_analysis = {}
+    for place_name, row in zip(stats.index, stats.itertuples(index=False)):
+        place_analysis[place_name] = {
+            'category': row.category,
+            'total_reviews': int(row.total_reviews),
+            'revisit_count': int(row.revisit_count),
+            'keywords': top_keywords(keywords.loc[place_name].to_dict()),
+            'recent_reviews': recent.get(place_name, []),
+            'positive_count': int(row.positive_count),
+            'negative_count': int(row.negative_count),
+            'avg_visit_count': float(row.avg_visit_count),
+            'revisit_rate': float(row.revisit_rate),
+            'positive_rate': float(row.positive_rate),
+            **price_summary(prices.get((place_name,), [])),
+        }
+    return place_analysis
+
+
+# ============================================
+# 증분 집계 (파일 단위 부분 집계 병합)
+# ============================================
+
+def file_key_of(reviews: pd.DataFrame) -> pd.Series:
+    """리뷰별 원본 파일 키 ('카테고리/파일명', 캐시 매니페스트 키와 동일)"""
+    return reviews['category'].astype(str) + '/' + reviews['file_source'].astype(str)
+
+
+def partials_by_file(reviews: pd.DataFrame) -> Dict[str, Dict[str, Dict]]:
+    """
+    리뷰 → 파일별·장소별 부분 집계 {파일 키: {장소명: 부분 집계}}
+
+    부분 집계는 합산 가능한 값(개수, 합계, 키워드별 개수)과 가격 언급 목록,
+    앞쪽 리뷰만 담아
+    여러 파일의 결과를 그대로 병합할 수 있습니다.
+    """
+    if reviews.empty:
+        return {}
+
+    flags = review_flags(reviews)
+    flags['file_key'] = file_key_of(reviews)
+    flags['visit_known'] = flags['visit_number'].notna()
+    sums = flags.groupby(['file_key', 'place_name'], observed=True, sort=False).agg(
+        category=('category', 'first'),
+        total_reviews=('is_revisit', 'size'),
+        revisit_count=('is_revisit', 'sum'),
+        positive_count=('is_positive', 'sum'),
+        negative_count=('is_negative', 'sum'),
+        visit_sum=('visit_number', 'sum'),
+        visit_n=('visit_known', 'sum'),
+    )
+
+    keywords = keyword_counts(flags['keyword_mask'], [flags['file_key'], flags['place_name']])
+    prices = prices_by_group(flags['prices'], [flags['file_key'], flags['place_name']])
+
+    recent = {}
+    recent_rows = newest_reviews(reviews, flags['review_date'], [flags['file_key'], flags['place_name']])
+    for key, record in zip(flags['file_key'].loc[recent_rows.index], recent_rows.to_dict('records')):
+        recent.setdefault((key, record['place_name']), []).append(record)
+
+    partials = {}
+    for (key, place_name), row in zip(sums.index, sums.itertuples(index=False)):
+        partials.setdefault(key, {})[place_name] = {
+            'category': row.category,
+            'total_reviews': int(row.total_reviews),
+            'revisit_count': int(row.revisit_count),
+            'positive_count': int(row.positive_count),
+            'negative_count': int(row.negative_count),
+            'visit_sum': float(row.visit_sum),
+            'visit_n': int(row.visit_n),
+            'keyword_counts': {k: int(n) for k, n in keywords.loc[(key, place_name)].items() if n},
+            'prices': prices.get((key, place_name), []),
+            'recent_reviews': recent.get((key, place_name), []),
+        }
+    return partials
+
+
+def merge_partials(partials: list) -> Dict:
+    """부분 집계 목록(파일 순서) → 장소 통계"""
+    total = sum(p['total_reviews'] for p in partials)
+    revisit_count = sum(p['revisit_count'] for p in partials)
+    positive_count = sum(p['positive_count'] for p in partials)
+    visit_n = sum(p['visit_n'] for p in partials)
+
+    recent, keywords, prices = [], {}, []
+    for p in partials:
+        recent.extend(p['recent_reviews'])
+        for keyword, count in p['keyword_counts'].items():
+            keywords[keyword] = keywords.get(keyword, 0) + count
+        prices.extend(p['prices'])
+
+    return {
+        'category': partials[0]['category'],
+        'total_reviews': total,
+        'revisit_count': revisit_count,
+        'keywords': top_keywords(keywords),
+        # 파일별 최신 리뷰를 합쳐 다시 최신순 (날짜 없는 리뷰는 뒤, 같은 날은 파일 순서)
+        'recent_reviews': sorted(recent, key=lambda r: r['review_date'], reverse=True)[:RECENT_REVIEW_COUNT],
+        'positive_count': positive_count,
+        'negative_count': sum(p['negative_count'] for p in partials),
+        'avg_visit_count': sum(p['visit_sum'] for p in partials) / visit_n if visit_n else 1.0,
+        'revisit_rate': revisit_count / total * 100 if total else 0,
+        'positive_rate': positive_count / total * 100 if total else 0,
+        **price_summary(prices),
+    }
+
+
+class PlaceStatsIndex:
+    """
+    파일 단위 부분 집계를 보관하는 증분 장소 통계
+
+    리뷰 파일 하나가 추가·교체·삭제되면 그 파일의 리뷰만 다시 집계하고
+    해당 파일에 포함된 장소만 병합합니다. place_analysis는 갱신 시
+    새 dict로 교체되므로 다른 세션이 읽는 중에도 안전합니다.
+    """
+
+    def __init__(self):
+        self.file_versions: Dict[str, str] = {}
+        self.partials: Dict[str, Dict[str, Dict]] = {}
+        self.place_files: Dict[str, set] = {}
+        self.place_analysis: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def update_file(self, key: str, reviews: pd.DataFrame = None, version: str = None) -> set:
+        """
+        파일 하나 반영 (reviews가 None이면 삭제)
+
+        Returns:
+            통계가 바뀐 장소 이름 집합
+        """
+        updates = {key: (partials_by_file(reviews).get(key, {}) if reviews is not None else None, version)}
+        return self._apply(updates)
+
+    def sync(self, reviews: pd.DataFrame, file_versions: Dict[str, str]) -> set:
+        """
+        리뷰 테이블과 파일 버전(sha1)에 맞춰 바뀐 파일만 반영
+
+        Returns:
+            통계가 바뀐 장소 이름 집합
+        """
+        changed = [k for k, v in file_versions.items() if self.file_versions.get(k) != v]
+        removed = [k for k in self.file_versions if k not in file_versions]
+        if not changed and not removed:
+            return set()
+
+        updates = {key: (None, None) for key in removed}
+        if changed:
+            # categorical 컬럼으로 먼저 거른 뒤 해당 파일 행만 키 비교
+            file_names = {key.rsplit('/', 1)[-1] for key in changed}
+            rows = reviews[reviews['file_source'].isin(file_names)]
+            rows = rows[file_key_of(rows).isin(changed)]
+            partials = partials_by_file(rows)
+            for key in changed:
+                updates[key] = (partials.get(key, {}), file_versions[key])
+        return self._apply(updates)
+
+    def _apply(self, updates: Dict[str, tuple]) -> set:
+        """{파일 키: (장소별 부분 집계 또는 None(삭제), 버전)} 반영 후 바뀐 장소만 재병합"""
+        with self._lock:
+            # dict를 순서 있는 집합으로 사용 (새 장소는 파일 반영 순서대로 추가)
+            affected = {}
+            for key, (new_partials, version) in updates.items():
+                old_partials = self.partials.pop(key, {})
+                self.file_versions.pop(key, None)
+                if new_partials is not None:
+                    self.partials[key] = new_partials
+                    self.file_versions[key] = version
+
+                for place_name in list(new_partials or {}) + list(old_partials):
+                    files = self.place_files.setdefault(place_name, set())
+                    files.discard(key)
+                    if new_partials and place_name in new_partials:
+                        files.add(key)
+                    affected[place_name] = True
+
+            place_analysis = dict(self.place_analysis)
+            for place_name in affected:
+                files = self.place_files.get(place_name)
+                if files:
+                    place_analysis[place_name] = merge_partials(
+                        [self.partials[k][place_name] for k in sorted(files)]
+                    )
+                else:
+                    self.place_files.pop(place_name, None)
+                    place_analysis.pop(place_name, None)
+
+            self.place_analysis = place_analysis
+        return set(affected)
@@ -0,0 +1,113 @@
+"""
+장소 순위 색인
+
+(카테고리, 정렬 기준, 최소 리뷰 수)별로 미리 정렬한 장소 목록을 보관해
+상위 장소 조회를 정렬 없이 구간 자르기(O(K))로 처리합니다.
+
+- 순위 목록은 처음 조회될 때 한 번 정렬해 만들고, 스냅샷이 바뀌면
+  통계가 바뀐 장소만 빼고 이분 탐색으로 다시 끼워 넣어 새 색인을 만듭니다
+  (이전 스냅샷의 색인은 그대로 남아 읽는 중인 세션에 영향 없음)
+- 동점은 장소 순서 번호 순 (처음 색인의 place_analysis 순서, 이후 새 장소는 뒤에 번호를 이어 붙임).
+  처음 만들 때와 증분 갱신 때 모두 (값, 순서 번호) 전체로 정렬하므로 두 방식의 동점 순서가 같음
+- 숫자 통계라면 어떤 키로도 정렬 가능 (avg_visit_count, negative_count, median_price 등),
+  값이 None인 장소(가격 언급이 없는 장소의 median_price 등)는 맨 뒤
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 신뢰도를 위한 최소 리뷰 수
+MIN_REVIEWS = 3
+
+
+class PlaceRankingIndex:
+    """한 스냅샷의 place_analysis에 대한 순위 색인 (읽기 전용으로 공유)"""
+
+    def __init__(self, place_analysis: Dict[str, Dict], order: Dict[str, int] = None, next_order: int = None):
+        self.place_analysis = place_analysis
+        # 동점 처리용 장소 순서 (place_analysis 삽입 순서, 새 장소는 뒤에 번호를 이어 붙임)
+        self._order = order if order is not None else {name: i for i, name in enumerate(place_analysis)}
+        self._next_order = next_order if next_order is not None else len(self._order)
+        # (카테고리, 정렬 키, 최소 리뷰 수) → (정렬 키 목록, 장소 이름 목록)
+        self._rankings: Dict[tuple, Tuple[List[tuple], List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name: str, stats: Dict, sort_by: str) -> tuple:
+        """정렬 키 (값 없음 여부, -값, 순서 번호): 큰 값부터, None은 맨 뒤, 동점은 순서 번호 순"""
+        value = stats.get(sort_by, 0)
+        return (value is None, -value if value is not None else 0, self._order[name])
+
+    def _build(self, category: Optional[str], sort_by: str, min_reviews: int) -> Tuple[List[tuple], List[str]]:
+        entries = sorted(
+            (self._entry(name, stats, sort_by), name)
+            for name, stats in self.place_analysis.items()
+            if (category is None or stats['category'] == category) and stats['total_reviews'] >= min_reviews
+        )
+        return [entry for entry, _ in entries], [name for _, name in entries]
+
+    def _ranking(self, category: Optional[str], sort_by: str, min_reviews: int) -> Tuple[List[tuple], List[str]]:
+        key = (category, sort_by, min_reviews)
+        ranking = self._rankings.get(key)
+        if ranking is None:
+            with self._lock:
+                ranking = self._rankings.get(key)
+                if ranking is None:
+                    ranking = self._rankings[key] = self._build(category, sort_by, min_reviews)
+        return ranking
+
+    def top(self, category: str = None, sort_by: str = 'revisit_rate', limit: int = 10,
+            offset: int = 0, min_reviews: int = MIN_REVIEWS) -> List[Tuple[str, Dict]]:
+        """상위 장소 [(장소명, 통계)] (offset부터 limit개)"""
+        _, names = self._ranking(category, sort_by, min_reviews)
+        return [(name, self.place_analysis[name]) for name in names[offset:offset + limit]]
+
+    def count(self, category: str = None, sort_by: str = 'revisit_rate', min_reviews: int = MIN_REVIEWS) -> int:
+        """조건에 맞는 장소 수 (페이지 계산용)"""
+        return len(self._ranking(category, sort_by, min_reviews)[1])
+
+    def updated(self, place_analysis: Dict[str, Dict], changed: Iterable[str]) -> "PlaceRankingIndex":
+        """
+        통계가 바뀐 장소만 반영한 새 색인
+
+        Args:
+            place_analysis: 새 스냅샷의 장소 통계
+            changed: 추가·변경·삭제된 장소 이름
+        """
+        changed = set(changed)
+        order, next_order = dict(self._order), self._next_order
+        added = []
+        for name in changed:
+            if name not in place_analysis:
+                order.pop(name, None)
+            elif name not in order:
+                added.append(name)
+        if len(added) > 1:
+            # 새 장소끼리는 place_analysis에 추가된 순서대로 번호 부여
+            added_set = set(added)
+            added = [name for name in place_analysis if name in added_set]
+        for name in added:
+            order[name] = next_order
+            next_order += 1
+
+        index = PlaceRankingIndex(place_analysis, order, next_order)
+        with self._lock:
+            built = dict(self._rankings)
+
+        for (category, sort_by, min_reviews), (keys, names) in built.items():
+            keys, names = list(keys), list(names)
+            for name in changed:
+                old = self.place_analysis.get(name)
+                if old is not None and (category is None or old['category'] == category) \
+                        and old['total_reviews'] >= min_reviews:
+                    position = bisect.bisect_left(keys, self._entry(name, old, sort_by))
+                    del keys[position]
+                    del names[position]
+                new = place_analysis.get(name)
+                if new is not None and (category is None or new['category'] == category) \
+                        and new['total_reviews'] >= min_reviews:
+                    entry = index._entry(name, new, sort_by)
+                    position = bisect.bisect_left(keys, entry)
+                    keys.insert(position, entry)
+                    names.insert(position, name)
+            index._rankings[(category, sort_by, min_reviews)] = (keys, names)
+        return index
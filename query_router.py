@@ -0,0 +1,133 @@
+"""
+질의 의도 라우터
+
+사용자 질의에서 카테고리, 장소명, 속성(재방문/가격)을 뽑아
+검색 전에 메타데이터 필터로 적용합니다.
+관련 없는 카테고리 문서가 검색 결과 k개를 차지하지 않도록 합니다.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+CATEGORY_KEYWORDS = {
+    '맛집 리뷰': ['맛집', '음식', '먹', '식당', '밥집', '점심', '저녁'],
+    '명소 리뷰': ['명소', '관광', '구경', '볼거리', '여행지', '가볼'],
+    '카페 리뷰': ['카페', '커피', '디저트', '베이커리'],
+    '병원 리뷰': ['병원', '의원', '진료', '치과', '한의원'],
+}
+REVISIT_KEYWORDS = ['재방문', '단골', '또 가', '다시 가', '다시 방문']
+PRICE_KEYWORDS = ['가격', '얼마', '비싸', '저렴', '가성비', '만원', '천원']
+RECENT_KEYWORDS = ['요즘', '요새', '최근', '뜨는', '핫한', '핫플', '신상']
+
+
+def normalize_name(text: str) -> str:
+    """장소명 비교용: 공백 제거 + 소문자"""
+    return re.sub(r'\s+', '', text).lower()
+
+
+def match_category(query: str) -> Optional[str]:
+    """질의 키워드로 카테고리 추정 (CATEGORY_KEYWORDS 순서대로 첫 일치)"""
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in query for keyword in keywords):
+            return category
+    return None
+
+
+def match_place_name(query: str, place_names: Iterable[str]) -> Optional[str]:
+    """질의에 그대로 들어 있는 가장 긴 장소명 (두 글자 이상)"""
+    normalized = normalize_name(query)
+    matches = [name for name in place_names
+               if len(normalize_name(name)) >= 2 and normalize_name(name) in normalized]
+    return max(matches, key=lambda name: len(normalize_name(name))) if matches else None
+
+
+def route_query(query: str, place_categories: Dict[str, str] = None) -> Dict:
+    """
+    질의 의도 추출
+
+    Args:
+        place_categories: {장소명: 카테고리} (장소명이 나오면 카테고리도 확정)
+
+    Returns:
+        {'category', 'place_name', 'revisit', 'price', 'recent'}
+    """
+    place_categories = place_categories or {}
+    place_name = match_place_name(query, place_categories)
+    category = place_categories[place_name] if place_name else match_category(query)
+
+    return {
+        'category': category,
+        'place_name': place_name,
+        'revisit': any(keyword in query for keyword in REVISIT_KEYWORDS),
+        'price': any(keyword in query for keyword in PRICE_KEYWORDS),
+        'recent': any(keyword in query for keyword in RECENT_KEYWORDS),
+    }
+
+
+def route_filters(route: Dict, supported_keys: Iterable[str]) -> Dict:
+    """라우팅 결과 → 인덱스가 지원하는 메타데이터 필터 {키: 값}"""
+    filters = {
+        'category': route.get('category'),
+        'place_name': route.get('place_name'),
+        'is_revisit': True if route.get('revisit') else None,
+        'has_price': True if route.get('price') else None,
+    }
+    supported_keys = set(supported_keys)
+    return {key: value for key, value in filters.items() if value is not None and key in supported_keys}
+
+
+def chroma_where(filters: Dict) -> Optional[Dict]:
+    """필터 {키: 값} → Chroma where 절"""
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return dict(filters)
+    return {'$and': [{key: value} for key, value in filters.items()]}
+
+
+def where_items(where: Optional[Dict]) -> List[tuple]:
+    """Chroma where 절(단일 조건 또는 $and) → [(키, 값)]"""
+    if not where:
+        return []
+    if '$and' in where:
+        return [item for clause in where['$and'] for item in where_items(clause)]
+    return list(where.items())
+
+
+class MetadataColumns:
+    """
+    문서 메타데이터 → 필터 마스크
+
+    키별로 (값 → 번호, 문서별 값 번호 배열)을 처음 필터링할 때 한 번만 만들어 두고,
+    이후에는 정수 배열 비교만으로 마스크를 계산합니다.
+    """
+
+    def __init__(self, documents: List[Any]):
+        self.documents = documents
+        self._columns: Dict[str, tuple] = {}
+
+    def _column(self, key: str) -> tuple:
+        column = self._columns.get(key)
+        if column is None or len(column[1]) != len(self.documents):
+            lookup: Dict[Any, int] = {}
+            codes = np.fromiter(
+                (lookup.setdefault(doc.metadata.get(key), len(lookup)) for doc in self.documents),
+                dtype=np.int64, count=len(self.documents),
+            )
+            column = self._columns[key] = (lookup, codes)
+        return column
+
+    def mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """where 절을 만족하는 문서 bool 마스크 (조건 없으면 None)"""
+        items = where_items(where)
+        if not items:
+            return None
+        mask = np.ones(len(self.documents), dtype=bool)
+        for key, value in items:
+            lookup, codes = self._column(key)
+            if value not in lookup:
+                return np.zeros(len(self.documents), dtype=bool)
+            mask &= codes == lookup[value]
+        return mask
@@ -0,0 +1,241 @@
+"""
+리뷰 단위 특징 추출
+
+리뷰를 수집할 때(엑셀 → 리뷰 테이블) 한 번만 계산해 리뷰 테이블 옆 컬럼으로
+캐시에 함께 저장하고, 장소 집계·채팅·탭은 이 컬럼만 읽습니다.
+
+- visit_number / is_revisit: "N번째 방문"에서 방문 횟수, 재방문 여부
+- is_positive / is_negative, keyword_mask: 긍정·부정 키워드 일치 (KEYWORDS 순서 비트)
+- prices: 본문의 가격 언급을 원 단위 정수로 정규화 (1.5만원, 1만 5천원, 6천원, 15,000원)
+- review_date / review_month: 방문 날짜("22.10.14.금", 연도 없는 "4.28.월")와 월 파티션 키(YYYYMM)
+"""
+import re
+import json
+import hashlib
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ============================================
+# 키워드 / 패턴
+# ============================================
+
+POSITIVE_KEYWORDS = ['맛있', '좋', '추천', '최고', '훌륭', '친절', '깨끗', '만족', '재방문']
+NEGATIVE_KEYWORDS = ['별로', '아쉽', '실망', '불친절', '더럽', '비싸', '맛없']
+KEYWORDS = POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS
+POSITIVE_MASK = (1 << len(POSITIVE_KEYWORDS)) - 1
+NEGATIVE_MASK = ((1 << len(KEYWORDS)) - 1) ^ POSITIVE_MASK
+
+# "2번째" ~ "99번째"가 포함되면 재방문 (기존 range(2, 100) 부분 문자열 검사와 동일)
+REVISIT_PATTERN = r'(?:[2-9]|[1-9]\d)번째'
+# "N번째 방문"에서 N 추출
+VISIT_NUMBER_PATTERN = r'(\d+)번째'
+
+# 가격 언급: (만 단위)(천 단위) 원 | (천 단위) 원 | 숫자(쉼표) 원 — 앞이 숫자인 부분 일치는 제외
+PRICE_PATTERN = (r'(?<![\d.,])(?:(\d+(?:\.\d+)?)\s*만\s*(?:(\d)\s*천\s*)?원'
+                 r'|(\d+)\s*천\s*원'
+                 r'|(\d{1,3}(?:,\d{3})+|\d+)\s*원)')
+PRICE_REGEX = re.compile(PRICE_PATTERN)
+# 가격으로 보기 어려운 값(배달비 몇 원, 전화번호 조각 등) 제외
+MIN_PRICE = 500
+MAX_PRICE = 5_000_000
+
+# 방문 날짜: [YY.]M.D.[요일] — 연도가 없으면 요일이 맞는 가장 가까운 과거 연도
+DATE_PATTERN = r'^\s*(?:(\d{2})\.)?(\d{1,2})\.(\d{1,2})\.?\s*([월화수목금토일])?'
+WEEKDAYS = '월화수목금토일'
+YEARLESS_LOOKBACK_YEARS = 7
+
+FEATURE_COLUMNS = ['visit_number', 'is_revisit', 'is_positive', 'is_negative', 'keyword_mask', 'prices',
+                   'review_date', 'review_month']
+TOP_KEYWORD_COUNT = 5
+
+# 키워드·패턴이 바뀌면 캐시의 특징 컬럼을 다시 계산하기 위한 버전
+FEATURE_VERSION = hashlib.sha1(json.dumps(
+    [KEYWORDS, REVISIT_PATTERN, VISIT_NUMBER_PATTERN, PRICE_PATTERN, MIN_PRICE, MAX_PRICE, DATE_PATTERN],
+    ensure_ascii=False,
+).encode('utf-8')).hexdigest()[:12]
+
+
+def feature_version(today: date = None) -> str:
+    """캐시에 기록하는 특징 버전: 특징 정의 + 연도 없는 날짜를 판별한 기준 연도
+
+    연도 없는 날짜는 수집한 날을 기준으로 연도를 정하므로, 해가 바뀌면 캐시의 날짜 특징도 다시 계산
+    (모든 행이 같은 기준 연도로 판별되어 기간·감쇠 통계가 섞이지 않음)
+    """
+    return f"{FEATURE_VERSION}-{(today or date.today()).year}"
+
+
+# ============================================
+# 가격 정규화
+# ============================================
+
+def price_value(man: str, man_cheon: str, cheon: str, won: str) -> int:
+    """PRICE_PATTERN 그룹 → 원 단위 금액"""
+    if man:
+        return int(round(float(man) * 10000)) + int(man_cheon or 0) * 1000
+    if cheon:
+        return int(cheon) * 1000
+    return int(won.replace(',', ''))
+
+
+def parse_prices(text: str) -> List[int]:
+    """본문의 가격 언급 → 원 단위 금액 목록 (등장 순서)"""
+    prices = [price_value(*match.groups()) for match in PRICE_REGEX.finditer(text)]
+    return [price for price in prices if MIN_PRICE <= price <= MAX_PRICE]
+
+
+def extract_prices(content: pd.Series) -> pa.ListArray:
+    """본문 컬럼 전체의 가격 언급 (행마다 원 단위 금액 목록, 컬럼 단위 정규식 한 번)"""
+    content = content.reset_index(drop=True)
+    matches = content.str.extractall(PRICE_PATTERN)
+    if matches.empty:
+        return pa.array([[] for _ in range(len(content))], type=pa.list_(pa.int32()))
+
+    man = pd.to_numeric(matches[0], errors='coerce')
+    values = np.where(
+        man.notna(), (man * 10000).round() + pd.to_numeric(matches[1], errors='coerce').fillna(0) * 1000,
+        np.where(matches[2].notna(), pd.to_numeric(matches[2], errors='coerce') * 1000,
+                 pd.to_numeric(matches[3].str.replace(',', '', regex=False), errors='coerce')),
+    )
+    rows = matches.index.get_level_values(0).to_numpy()
+    keep = (values >= MIN_PRICE) & (values <= MAX_PRICE)
+    counts = np.bincount(rows[keep], minlength=len(content))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values[keep].astype(np.int32)))
+
+
+# ============================================
+# 방문 날짜
+# ============================================
+
+def resolve_year(month: int, day: int, weekday: Optional[int], today: date) -> Optional[int]:
+    """연도 없는 날짜의 연도: 오늘 이전이면서 요일이 맞는 가장 가까운 해 (요일이 없으면 가장 가까운 해)"""
+    latest = None
+    for year in range(today.year, today.year - YEARLESS_LOOKBACK_YEARS, -1):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            continue
+        if candidate > today:
+            continue
+        latest = latest or year
+        if weekday is None or candidate.weekday() == weekday:
+            return year
+    return latest
+
+
+def parse_review_dates(dates: pd.Series, today: date = None) -> pd.Series:
+    """날짜 문자열 컬럼 → timestamp (해석할 수 없으면 NaT)"""
+    today = today or date.today()
+    parts = dates.astype(str).str.extract(DATE_PATTERN)
+    month = pd.to_numeric(parts[1], errors='coerce')
+    day = pd.to_numeric(parts[2], errors='coerce')
+    year = pd.to_numeric(parts[0], errors='coerce') + 2000
+    year = year.where(year <= today.year, year - 100)
+
+    # 연도 없는 날짜는 (월, 일, 요일) 조합마다 한 번만 계산
+    yearless = year.isna() & month.notna() & day.notna()
+    if yearless.any():
+        # 요일이 없으면 -1 (NaN은 dict 키로 다시 찾을 수 없음)
+        weekday = parts[3].map(lambda w: WEEKDAYS.index(w) if isinstance(w, str) else -1)
+        combos = pd.DataFrame({'month': month, 'day': day, 'weekday': weekday})[yearless].astype(int)
+        resolved = {
+            key: resolve_year(key[0], key[1], None if key[2] < 0 else key[2], today)
+            for key in combos.drop_duplicates().itertuples(index=False, name=None)
+        }
+        year[yearless] = [resolved[key] for key in combos.itertuples(index=False, name=None)]
+
+    parsed = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': day}), errors='coerce')
+    return parsed.astype('datetime64[s]')
+
+
+def month_key(dates: pd.Series) -> np.ndarray:
+    """timestamp → 월 파티션 키 YYYYMM (날짜 없으면 0)"""
+    keys = dates.dt.year * 100 + dates.dt.month
+    return keys.fillna(0).to_numpy(dtype=np.int32)
+
+
+# ============================================
+# 리뷰 단위 특징 (컬럼 단위 벡터 연산)
+# ============================================
+
+def review_features(reviews: pd.DataFrame) -> pd.DataFrame:
+    """리뷰마다 방문 횟수, 재방문/긍정/부정 여부, 키워드 비트, 가격 목록, 방문 날짜 계산"""
+    revisit = reviews['revisit'].astype(str)
+    content = reviews['content'].astype(str)
+
+    visit_number = revisit.str.extract(VISIT_NUMBER_PATTERN, expand=False).astype(float)
+    # 형식이 다른 재방문 텍스트는 1번째로 간주, 빈 값은 평균에서 제외
+    visit_number = visit_number.where(visit_number.notna(), np.where(revisit != '', 1.0, np.nan))
+
+    keyword_mask = np.zeros(len(reviews), dtype=np.int32)
+    for bit, keyword in enumerate(KEYWORDS):
+        keyword_mask |= content.str.contains(keyword, regex=False).to_numpy(dtype=np.int32) << bit
+
+    review_date = parse_review_dates(reviews['date'])
+    return pd.DataFrame({
+        'visit_number': visit_number,
+        'is_revisit': revisit.str.contains(REVISIT_PATTERN, regex=True),
+        'is_positive': (keyword_mask & POSITIVE_MASK) != 0,
+        'is_negative': (keyword_mask & NEGATIVE_MASK) != 0,
+        'keyword_mask': keyword_mask,
+        'prices': pd.Series(pd.arrays.ArrowExtensionArray(extract_prices(content)), index=reviews.index),
+        'review_date': review_date,
+        'review_month': month_key(review_date),
+    }, index=reviews.index, columns=FEATURE_COLUMNS)
+
+
+def with_features(reviews: pd.DataFrame) -> pd.DataFrame:
+    """리뷰 테이블에 특징 컬럼 추가 (이미 있으면 그대로)"""
+    if all(name in reviews.columns for name in FEATURE_COLUMNS):
+        return reviews
+    features = review_features(reviews)
+    return pd.concat([reviews.drop(columns=[c for c in FEATURE_COLUMNS if c in reviews.columns]),
+                      features], axis=1)
+
+
+# ============================================
+# 장소 단위 요약
+# ============================================
+
+def keyword_counts(masks: pd.Series, keys: List[pd.Series]) -> pd.DataFrame:
+    """그룹(keys, masks와 같은 인덱스)별 키워드 일치 리뷰 수 (컬럼 = KEYWORDS)"""
+    values = masks.to_numpy(dtype=np.int32)
+    bits = pd.DataFrame({keyword: (values >> bit) & 1 for bit, keyword in enumerate(KEYWORDS)},
+                        index=masks.index)
+    return bits.groupby(keys, observed=True, sort=False).sum()
+
+
+def prices_by_group(prices: pd.Series, keys: List[pd.Series]) -> Dict[tuple, List[int]]:
+    """그룹(keys 튜플)별 가격 언급 목록 (행 순서대로)"""
+    array = pa.array(prices.array)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    flat = pc.list_flatten(array).to_numpy(zero_copy_only=False)
+    if not len(flat):
+        return {}
+    rows = pc.list_parent_indices(array).to_numpy(zero_copy_only=False)
+    key_values = [key.iloc[rows].to_numpy() for key in keys]
+    grouped = {}
+    for i, price in enumerate(flat.tolist()):
+        grouped.setdefault(tuple(values[i] for values in key_values), []).append(price)
+    return grouped
+
+
+def top_keywords(counts: Dict[str, int], limit: int = TOP_KEYWORD_COUNT) -> List[str]:
+    """많이 언급된 키워드 (KEYWORDS 순서로 동점 처리)"""
+    ranked = sorted((keyword for keyword in KEYWORDS if counts.get(keyword)), key=lambda k: -counts[k])
+    return ranked[:limit]
+
+
+def price_summary(prices: List[int]) -> Dict:
+    """가격 언급 목록 → {'price_mentions', 'median_price', 'price_p25', 'price_p75'} (언급 없으면 None)"""
+    if not prices:
+        return {'price_mentions': 0, 'median_price': None, 'price_p25': None, 'price_p75': None}
+    p25, median, p75 = np.percentile(prices, [25, 50, 75])
+    return {'price_mentions': len(prices), 'median_price': int(round(median)),
+            'price_p25': int(round(p25)), 'price_p75': int(round(p75))}
@@ -0,0 +1,361 @@
+"""
+네이버 리뷰 저장소
+
+리뷰 엑셀(xlsx) 파일을 읽어 하나의 컬럼형(Arrow IPC) 캐시 파일로 컴파일하고,
+앱 시작 시 해당 파일을 메모리 맵으로 읽어 변경된 엑셀만 다시 읽습니다.
+리뷰 단위 특징(가격, 키워드, 감성, 방문 횟수)은 엑셀을 읽을 때 함께 계산해
+같은 캐시 파일에 컬럼으로 저장합니다 (review_features).
+
+캐시 빌드:
+    python review_store.py build
+"""
+import os
+import glob
+import json
+import hashlib
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from review_features import FEATURE_COLUMNS, feature_version, with_features
+
+# ============================================
+# 설정 및 경로
+# ============================================
+
+REVIEWS_BASE_PATH = "리뷰"
+CATEGORIES = ['맛집 리뷰', '명소 리뷰', '병원 리뷰', '카페 리뷰']
+REVIEW_CACHE_PATH = os.path.join(".cache", "naver_reviews.arrow")
+
+REVIEW_COLUMNS = ['category', 'place_name', 'date', 'nickname', 'content', 'revisit', 'file_source']
+# 반복 값이 많은 컬럼은 categorical로 저장 (메모리 절약, groupby 가속)
+CATEGORICAL_COLUMNS = ['category', 'place_name', 'file_source']
+# 캐시에 저장하는 전체 컬럼 (원본 리뷰 + 수집 시 계산한 특징)
+TABLE_COLUMNS = REVIEW_COLUMNS + FEATURE_COLUMNS
+MANIFEST_KEY = b"review_manifest"
+FEATURES_KEY = b"review_features"
+
+
+# ============================================
+# 엑셀 파일 읽기
+# ============================================
+
+def list_review_files(base_path: str = REVIEWS_BASE_PATH) -> List[Tuple[str, str]]:
+    """(카테고리, 파일 경로) 목록"""
+    files = []
+    for category in CATEGORIES:
+        category_path = os.path.join(base_path, category)
+        if not os.path.exists(category_path):
+            continue
+
+        excel_files = glob.glob(os.path.join(category_path, "*.xlsx"))
+        excel_files.extend(glob.glob(os.path.join(category_path, "*.xls")))
+        files.extend((category, file_path) for file_path in sorted(excel_files))
+    return files
+
+
+def place_name_from_file(file_name: str) -> str:
+    """파일명(naver_review_[장소명].xlsx)에서 장소명 추출"""
+    return file_name.replace('naver_review_', '').replace('.xlsx', '').replace('.xls', '').replace('_', ' ')
+
+
+def frame_from_excel(df: pd.DataFrame, file_name: str, category: str) -> pd.DataFrame:
+    """엑셀 시트를 리뷰 테이블(한 행 = 리뷰 하나)로 변환"""
+    place_name = place_name_from_file(file_name)
+
+    def column(name: str, default: str) -> pd.Series:
+        if name in df.columns:
+            # 기존 str(row[...]) 변환과 동일하게 빈 값은 'nan'
+            return df[name].astype(object).fillna('nan').astype(str)
+        return pd.Series(default, index=df.index, dtype=object)
+
+    reviews = pd.DataFrame({
+        'category': category,
+        'place_name': df['store'].fillna(place_name).astype(str) if 'store' in df.columns else place_name,
+        'date': column('date', ''),
+        'nickname': column('nickname', '익명'),
+        'content': column('content', ''),
+        'revisit': column('revisit', ''),
+        'file_source': file_name,
+    }, index=df.index, columns=REVIEW_COLUMNS)
+
+    # 내용 없는 리뷰 제외
+    reviews = reviews[(reviews['content'] != '') & (reviews['content'] != 'nan')]
+    return reviews.reset_index(drop=True)
+
+
+def read_review_file(file_path: str, category: str) -> pd.DataFrame:
+    """엑셀 파일 하나를 리뷰 테이블(특징 컬럼 포함)로 변환"""
+    return with_features(frame_from_excel(pd.read_excel(file_path), os.path.basename(file_path), category))
+
+
+def empty_review_table() -> pd.DataFrame:
+    return normalize_review_table(pd.DataFrame({name: pd.Series(dtype=object) for name in REVIEW_COLUMNS}))
+
+
+def normalize_review_table(reviews: pd.DataFrame) -> pd.DataFrame:
+    """리뷰 테이블 표준 형태: 특징 컬럼 보충 + 컬럼 순서 고정 + categorical 컬럼 변환"""
+    reviews = with_features(reviews)[TABLE_COLUMNS].reset_index(drop=True)
+    for name in CATEGORICAL_COLUMNS:
+        if not isinstance(reviews[name].dtype, pd.CategoricalDtype):
+            reviews[name] = reviews[name].astype('category')
+    return reviews
+
+
+# ============================================
+# 파일 변경 감지 (mtime + 해시)
+# ============================================
+
+def file_key(base_path: str, file_path: str) -> str:
+    """캐시 매니페스트 키: 기준 경로에 대한 상대 경로"""
+    return os.path.relpath(file_path, base_path).replace(os.sep, '/')
+
+
+def file_digest(file_path: str) -> str:
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_signature(file_path: str, previous: Dict = None) -> Dict:
+    """mtime/크기가 같으면 이전 해시를 재사용하고, 다르면 해시를 새로 계산"""
+    stat = os.stat(file_path)
+    signature = {'mtime': stat.st_mtime, 'size': stat.st_size}
+    if previous and previous.get('mtime') == signature['mtime'] and previous.get('size') == signature['size']:
+        signature['sha1'] = previous['sha1']
+    else:
+        signature['sha1'] = file_digest(file_path)
+    return signature
+
+
+# ============================================
+# 병렬 수집 (프로세스 풀)
+# ============================================
+
+def new_ingest_report() -> Dict:
+    """수집 리포트: 읽은 파일 수, 유지/제외된 행 수, 실패 사유, 파일별 소요 시간/버전"""
+    return {
+        'files_read': 0,
+        'files_cached': 0,
+        'rows_kept': 0,
+        'rows_dropped': 0,
+        'failures': [],
+        'timings': {},
+        'file_versions': {},
+    }
+
+
+def ingest_one(task: Tuple[str, str]) -> Dict:
+    """
+    엑셀 파일 하나 수집 (프로세스 풀 워커)
+
+    예외는 밖으로 던지지 않고 결과의 'error'에 담아 반환합니다.
+    """
+    category, file_path = task
+    start = time.perf_counter()
+    result = {'category': category, 'file_path': file_path, 'reviews': None,
+              'rows_dropped': 0, 'error': None}
+    try:
+        df = pd.read_excel(file_path)
+        # 특징 추출도 워커에서 (정규식 스캔을 파일 단위로 병렬화)
+        reviews = with_features(frame_from_excel(df, os.path.basename(file_path), category))
+        result['reviews'] = reviews
+        result['rows_dropped'] = len(df) - len(reviews)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def ingest_review_files(tasks: List[Tuple[str, str]], base_path: str = REVIEWS_BASE_PATH,
+                        workers: int = None) -> Tuple[List[pd.DataFrame], Dict]:
+    """
+    엑셀 파일들을 프로세스 풀로 병렬 수집
+
+    openpyxl 파싱은 CPU 작업이라 스레드 대신 프로세스로 분산합니다.
+    결과는 입력 순서대로 합쳐지므로 워커 수와 관계없이 동일합니다.
+
+    Returns:
+        (파일별 리뷰 테이블 목록, 수집 리포트)
+    """
+    report = new_ingest_report()
+    if not tasks:
+        return [], report
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers > 1:
+        # 파일 감시 스레드·Streamlit·이벤트 루프 스레드가 도는 프로세스에서 fork하면
+        # 다른 스레드가 잡고 있던 잠금이 자식에 복사되어 교착될 수 있으므로 spawn으로 시작
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(ingest_one, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        results = [ingest_one(task) for task in tasks]
+
+    frames = []
+    for result in results:
+        key = file_key(base_path, result['file_path'])
+        report['timings'][key] = result['seconds']
+        if result['error']:
+            report['failures'].append({'file': key, 'reason': result['error']})
+            continue
+        report['files_read'] += 1
+        report['rows_kept'] += len(result['reviews'])
+        report['rows_dropped'] += result['rows_dropped']
+        frames.append(result['reviews'])
+
+    return frames, report
+
+
+# ============================================
+# 컬럼형 캐시 (Arrow IPC, 메모리 맵)
+# ============================================
+
+def arrow_list_dtype(arrow_type: pa.DataType):
+    """목록 컬럼(prices)은 Arrow 배열 그대로 (행마다 파이썬 객체를 만들지 않음)"""
+    return pd.ArrowDtype(arrow_type) if pa.types.is_list(arrow_type) else None
+
+
+def read_cache_table(cache_path: str) -> Tuple[pd.DataFrame, Dict, bool]:
+    """캐시 읽기 → (리뷰 테이블, 매니페스트, 특징 컬럼이 현재 버전인지)"""
+    if not os.path.exists(cache_path):
+        return empty_review_table(), {}, True
+
+    try:
+        with pa.memory_map(cache_path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+        manifest = json.loads(metadata.get(MANIFEST_KEY, b'{}'))
+        current = metadata.get(FEATURES_KEY, b'').decode() == feature_version()
+        if not current:
+            # 특징 정의나 연도 판별 기준 연도가 바뀐 캐시는 엑셀 대신 캐시의 리뷰 본문으로 특징만 다시 계산
+            table = table.drop_columns([name for name in FEATURE_COLUMNS if name in table.column_names])
+        return normalize_review_table(table.to_pandas(types_mapper=arrow_list_dtype)), manifest, current
+    except (pa.ArrowInvalid, OSError, ValueError, KeyError):
+        # 손상된 캐시는 전체 재빌드
+        return empty_review_table(), {}, True
+
+
+def read_review_cache(cache_path: str = REVIEW_CACHE_PATH) -> Tuple[pd.DataFrame, Dict]:
+    """캐시 파일을 메모리 맵으로 읽기 → (리뷰 테이블, 매니페스트)"""
+    reviews, manifest, _ = read_cache_table(cache_path)
+    return reviews, manifest
+
+
+def write_review_cache(reviews: pd.DataFrame, manifest: Dict,
+                       cache_path: str = REVIEW_CACHE_PATH) -> None:
+    """리뷰 테이블과 매니페스트를 하나의 Arrow IPC 파일로 원자적으로 저장"""
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    table = pa.Table.from_pandas(reviews[TABLE_COLUMNS], preserve_index=False)
+    table = table.replace_schema_metadata({MANIFEST_KEY: json.dumps(manifest, ensure_ascii=False),
+                                           FEATURES_KEY: feature_version()})
+
+    tmp_path = cache_path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, cache_path)
+
+
+def load_review_table(base_path: str = REVIEWS_BASE_PATH,
+                      cache_path: str = REVIEW_CACHE_PATH,
+                      workers: int = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    캐시 기반 리뷰 테이블 로딩
+
+    캐시에 있는 파일은 mtime/해시가 같으면 그대로 사용하고,
+    추가·변경된 엑셀만 병렬로 다시 읽으며 삭제된 파일의 리뷰는 제외합니다.
+
+    Returns:
+        (리뷰 테이블, 수집 리포트) - 리뷰 테이블은 한 행이 리뷰 하나이며
+        category/place_name/file_source는 categorical 컬럼이고
+        FEATURE_COLUMNS(리뷰 단위 특징)가 뒤에 붙습니다.
+    """
+    cached, manifest, features_current = read_cache_table(cache_path)
+
+    new_manifest = {}
+    stale_tasks = []
+    signatures = {}
+    ordered_keys = []
+    for category, file_path in list_review_files(base_path):
+        key = file_key(base_path, file_path)
+        ordered_keys.append(key)
+        previous = manifest.get(key)
+        signature = file_signature(file_path, previous)
+
+        if previous and previous.get('sha1') == signature['sha1']:
+            new_manifest[key] = signature
+            continue
+
+        stale_tasks.append((category, file_path))
+        signatures[key] = signature
+
+    frames, report = ingest_review_files(stale_tasks, base_path, workers)
+    report['files_cached'] = len(new_manifest)
+    failed_keys = {failure['file'] for failure in report['failures']}
+    for key, signature in signatures.items():
+        if key not in failed_keys:
+            new_manifest[key] = signature
+    # 파일별 버전(sha1 + 특징 버전): 증분 집계가 바뀐 파일만 다시 계산하는 기준
+    # (연도 판별 기준 연도가 바뀌면 모든 파일의 날짜 특징이 바뀌므로 전부 다시 집계)
+    version = feature_version()
+    report['file_versions'] = {key: f"{new_manifest[key]['sha1']}:{version}"
+                               for key in ordered_keys if key in new_manifest}
+
+    stale_keys = set(signatures)
+    removed_keys = set(manifest) - set(new_manifest)
+    if not stale_keys and not removed_keys and len(cached) and features_current:
+        return cached, report
+
+    # 변경/삭제된 파일의 기존 행 제거 후 새로 읽은 행 추가
+    if len(cached):
+        cached_keys = cached['category'].astype(str) + '/' + cached['file_source'].astype(str)
+        cached = cached[~cached_keys.isin(stale_keys | removed_keys)]
+    reviews = pd.concat([cached] + frames, ignore_index=True) if frames else cached
+    reviews = normalize_review_table(reviews)
+
+    try:
+        write_review_cache(reviews, new_manifest, cache_path)
+    except OSError:
+        # 읽기 전용 환경에서는 캐시 없이 동작
+        return reviews, report
+
+    # 방금 쓴 캐시를 메모리 맵으로 다시 열어 다른 워커 프로세스와 같은 페이지를 공유
+    # (본문 문자열은 복사 없이 파일 페이지를 가리킴)
+    mapped, _, _ = read_cache_table(cache_path)
+    return (mapped, report) if len(mapped) == len(reviews) else (reviews, report)
+
+
+# ============================================
+# 캐시 빌드 CLI
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="네이버 리뷰 캐시 빌드")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--base-path', default=REVIEWS_BASE_PATH)
+    parser.add_argument('--cache-path', default=REVIEW_CACHE_PATH)
+    parser.add_argument('--rebuild', action='store_true', help="기존 캐시를 무시하고 전체 재빌드")
+    parser.add_argument('--workers', type=int, default=None, help="수집 프로세스 수 (기본: CPU 코어 수)")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(args.cache_path):
+        os.remove(args.cache_path)
+
+    reviews, report = load_review_table(args.base_path, args.cache_path, args.workers)
+    print(f"✅ {len(reviews):,}개 리뷰 → {args.cache_path}")
+    print(f"   새로 읽음 {report['files_read']}개 파일 / 캐시 재사용 {report['files_cached']}개 / "
+          f"유지 {report['rows_kept']:,}행 / 제외 {report['rows_dropped']:,}행")
+    for failure in report['failures']:
+        print(f"❌ {failure['file']}: {failure['reason']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+리뷰 시간축 (월 파티션)
+
+방문 날짜는 수집 시 review_features에서 timestamp(review_date)와 월 키(review_month)로
+변환해 두고, 스냅샷마다 리뷰 행을 월별로 묶은 파티션 색인을 만듭니다.
+기간 조회는 해당 월 파티션의 행만 읽으므로 리뷰 이력이 쌓여도 "요즘" 조회 비용은
+기간 안의 리뷰 수에만 비례합니다.
+
+- window_stats(days): 최근 N일 장소 통계
+- decayed_stats(half_life_days): 지수 감쇠 가중 통계 (반감기마다 가중치 절반)
+- 기준일은 기본으로 스냅샷의 가장 최근 리뷰 날짜 (언제 조회해도 같은 결과)
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from place_ranking import MIN_REVIEWS
+
+WINDOW_DAYS = (30, 90, 365)
+DECAY_HALF_LIFE_DAYS = 90
+# 반감기의 5배(가중치 약 3%)보다 오래된 리뷰는 읽지 않음
+DECAY_HORIZON = 5
+# 스냅샷당 보관할 기간 통계 수
+STATS_CACHE_SIZE = 32
+
+STAT_COLUMNS = ['place_name', 'is_revisit', 'is_positive', 'is_negative', 'visit_number']
+
+
+class ReviewTimeline:
+    """한 스냅샷의 리뷰 월 파티션 색인과 기간별 장소 통계 (읽기 전용으로 공유)"""
+
+    def __init__(self, reviews: pd.DataFrame, place_analysis: Dict[str, Dict]):
+        self.place_analysis = place_analysis
+        self._columns = reviews[STAT_COLUMNS]
+        self._dates = reviews['review_date'].to_numpy(dtype='datetime64[s]')
+
+        # 월 키 순으로 안정 정렬한 행 번호 + 월별 시작 위치 (날짜 없는 리뷰는 키 0으로 맨 앞)
+        months = reviews['review_month'].to_numpy()
+        self._order = np.argsort(months, kind='stable')
+        self.months, self._starts = np.unique(months[self._order], return_index=True)
+
+        dated = self._dates[~np.isnat(self._dates)]
+        self.latest: Optional[pd.Timestamp] = pd.Timestamp(dated.max()) if len(dated) else None
+        self._stats: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def partitions(self) -> Dict[int, int]:
+        """{YYYYMM: 리뷰 수} (날짜 없는 리뷰 제외)"""
+        ends = np.append(self._starts[1:], len(self._order))
+        return {int(m): int(e - s) for m, s, e in zip(self.months, self._starts, ends) if m}
+
+    def reference(self, as_of=None) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(as_of).normalize() if as_of is not None else self.latest
+
+    def rows_between(self, start: pd.Timestamp, end: pd.Timestamp) -> np.ndarray:
+        """start~end(포함) 날짜의 행 번호 (start가 속한 월 이후 파티션만 확인)"""
+        first = np.searchsorted(self.months, start.year * 100 + start.month)
+        if first >= len(self.months):
+            return np.empty(0, dtype=np.int64)
+        rows = self._order[self._starts[first]:]
+        dates = self._dates[rows]
+        return rows[(dates >= np.datetime64(start, 's')) & (dates <= np.datetime64(end, 's'))]
+
+    def window_stats(self, days: int, as_of=None) -> Dict[str, Dict]:
+        """기준일 포함 최근 days일 장소 통계 {장소명: 통계} (place_analysis 순서)"""
+        end = self.reference(as_of)
+        if end is None:
+            return {}
+        return self._cached(('window', days, end), lambda: self._aggregate(
+            self.rows_between(end - pd.Timedelta(days=days - 1), end)))
+
+    def decayed_stats(self, half_life_days: float = DECAY_HALF_LIFE_DAYS, as_of=None) -> Dict[str, Dict]:
+        """
+        지수 감쇠 가중 장소 통계
+
+        리뷰 가중치 = 0.5 ** (경과 일수 / 반감기). 비율 지표는 가중 평균이고
+        weighted_reviews(가중 리뷰 수)가 "요즘 뜨는 정도"입니다.
+        """
+        end = self.reference(as_of)
+        if end is None:
+            return {}
+
+        def compute():
+            rows = self.rows_between(end - pd.Timedelta(days=half_life_days * DECAY_HORIZON), end)
+            age = (np.datetime64(end, 's') - self._dates[rows]) / np.timedelta64(1, 'D')
+            return self._aggregate(rows, 0.5 ** (age / half_life_days))
+
+        return self._cached(('decay', half_life_days, end), compute)
+
+    def _cached(self, key: tuple, compute) -> Dict[str, Dict]:
+        with self._lock:
+            if key in self._stats:
+                self._stats.move_to_end(key)
+                return self._stats[key]
+        stats = compute()
+        with self._lock:
+            self._stats[key] = stats
+            while len(self._stats) > STATS_CACHE_SIZE:
+                self._stats.popitem(last=False)
+        return stats
+
+    def _aggregate(self, rows: np.ndarray, weights: np.ndarray = None) -> Dict[str, Dict]:
+        """선택한 행의 장소별 (가중) 통계"""
+        if not len(rows):
+            return {}
+        frame = self._columns.iloc[rows]
+        weight = np.ones(len(rows)) if weights is None else weights
+        visit = frame['visit_number'].to_numpy(dtype=float)
+        visit_known = ~np.isnan(visit)
+        sums = pd.DataFrame({
+            'place_name': frame['place_name'].to_numpy(),
+            'reviews': 1,
+            'weight': weight,
+            'revisit': weight * frame['is_revisit'].to_numpy(),
+            'positive': weight * frame['is_positive'].to_numpy(),
+            'revisit_count': frame['is_revisit'].to_numpy(dtype=int),
+            'positive_count': frame['is_positive'].to_numpy(dtype=int),
+            'negative_count': frame['is_negative'].to_numpy(dtype=int),
+            'visit': np.where(visit_known, weight * np.nan_to_num(visit), 0.0),
+            'visit_weight': np.where(visit_known, weight, 0.0),
+        }).groupby('place_name', sort=False).sum().to_dict('index')
+
+        stats = {}
+        for name in self.place_analysis:
+            row = sums.get(name)
+            if row is None:
+                continue
+            stats[name] = {
+                'category': self.place_analysis[name]['category'],
+                'total_reviews': int(row['reviews']),
+                'weighted_reviews': float(row['weight']),
+                'revisit_count': int(row['revisit_count']),
+                'positive_count': int(row['positive_count']),
+                'negative_count': int(row['negative_count']),
+                'revisit_rate': float(row['revisit'] / row['weight'] * 100),
+                'positive_rate': float(row['positive'] / row['weight'] * 100),
+                'avg_visit_count': float(row['visit'] / row['visit_weight']) if row['visit_weight'] else 1.0,
+            }
+        return stats
+
+
+def rank_stats(stats: Dict[str, Dict], category: str = None, sort_by: str = 'revisit_rate',
+               limit: int = 10, offset: int = 0, min_reviews: int = MIN_REVIEWS) -> Tuple[List[Tuple[str, Dict]], int]:
+    """기간 통계 순위 → ([(장소명, 통계)] offset부터 limit개, 조건에 맞는 장소 수)"""
+    candidates = [(name, s) for name, s in stats.items()
+                  if (category is None or s['category'] == category) and s['total_reviews'] >= min_reviews]
+    candidates.sort(key=lambda item: -item[1].get(sort_by, 0))
+    return candidates[offset:offset + limit], len(candidates)
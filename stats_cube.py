@@ -0,0 +1,224 @@
+"""
+리뷰 통계 롤업 큐브
+
+카테고리 × 월(방문 날짜 기준 YYYYMM, 날짜 없으면 0) 칸마다 리뷰 수, 재방문·긍정·부정 리뷰 수,
+방문 횟수 합, 가격 언급 수, 장소 수를 미리 합산해 둡니다. 각 차원을 "전체"(None)로 접은
+소계까지 모두 만들어 두므로 대시보드 지표·드릴다운·월별 추이는 dict 조회 한 번입니다.
+
+- 카테고리는 리뷰의 카테고리 (여러 카테고리 파일에 있는 장소는 각 카테고리에 따로 셈)
+- 장소 평균 지표(avg_place_revisit_rate 등)는 칸 안 리뷰만으로 낸 장소별 비율의 평균
+- 지역 차원은 없음: 리뷰 데이터에 주소가 없고 지명 사전(gazetteer.csv)도 비어 있어
+  실제 지역 정보가 생기면 DIMENSIONS에 추가
+- 증분: 파일 단위 부분 집계(장소 × 월)와 칸별 합계를 보관하고, 새 파일이 오면
+  바뀐 파일의 이전 집계를 빼고 새 집계를 더함 (영향받은 칸·장소만 다시 계산, StatsCubeIndex)
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from place_analytics import file_key_of, review_flags
+from review_store import CATEGORIES
+
+UNKNOWN_MONTH = 0
+
+DIMENSIONS = ['category', 'month']
+# 합산 가능한 측정값 (장소 × 월 부분 집계)
+MEASURES = ['reviews', 'revisits', 'positive', 'negative', 'visit_sum', 'visit_n', 'price_mentions']
+FLOAT_MEASURES = {'visit_sum'}
+EMPTY_CELL = {**{name: 0 for name in MEASURES}, 'places': 0, 'place_revisit_rate_sum': 0.0,
+              'place_positive_rate_sum': 0.0}
+REVIEWS, REVISITS, POSITIVE = (MEASURES.index(name) for name in ('reviews', 'revisits', 'positive'))
+
+
+def place_month_facts(reviews: pd.DataFrame) -> pd.DataFrame:
+    """리뷰 → (파일 키, 카테고리, 장소, 월)별 측정값 합계"""
+    if reviews.empty:
+        return pd.DataFrame(columns=['file_key', 'category', 'place_name', 'month'] + MEASURES)
+    flags = review_flags(reviews)
+    prices = flags['prices'].list.len() if isinstance(flags['prices'].dtype, pd.ArrowDtype) \
+        else flags['prices'].map(len)
+    facts = pd.DataFrame({
+        'file_key': file_key_of(reviews).to_numpy(),
+        'category': flags['category'].astype(str).to_numpy(),
+        'place_name': flags['place_name'].astype(str).to_numpy(),
+        'month': flags['review_month'].to_numpy(),
+        'reviews': 1,
+        'revisits': flags['is_revisit'].to_numpy(dtype=int),
+        'positive': flags['is_positive'].to_numpy(dtype=int),
+        'negative': flags['is_negative'].to_numpy(dtype=int),
+        'visit_sum': flags['visit_number'].fillna(0).to_numpy(),
+        'visit_n': flags['visit_number'].notna().to_numpy(dtype=int),
+        'price_mentions': prices.to_numpy(dtype=int),
+    })
+    return facts.groupby(['file_key', 'category', 'place_name', 'month'], sort=False).sum().reset_index()
+
+
+def rollup_keys(category: str, month: int) -> List[Tuple]:
+    """(카테고리, 월) 행이 더해지는 칸: 자기 칸과 각 차원을 접은 소계·전체"""
+    return [(category, month), (category, None), (None, month), (None, None)]
+
+
+# ============================================
+# 큐브 (읽기 전용)
+# ============================================
+
+class StatsCube:
+    """카테고리 × 월 롤업 (각 차원 None = 전체)"""
+
+    def __init__(self, cells: Dict[Tuple, Dict]):
+        """cells: {(카테고리, 월): 측정값 + places + 장소별 비율 합} (StatsCubeIndex가 만든 칸)"""
+        self._cells = cells
+        order = {name: i for i, name in enumerate(CATEGORIES)}
+        self.categories: List[str] = sorted({c for c, _ in cells if c is not None},
+                                            key=lambda name: (order.get(name, len(order)), name))
+        self.months: List[int] = sorted({m for _, m in cells if m is not None})
+
+    def cell(self, category: str = None, month: Optional[int] = None) -> Dict:
+        """
+        한 칸의 측정값과 비율 (None = 그 차원 전체)
+
+        Returns:
+            MEASURES + places + revisit_rate / positive_rate (리뷰 가중),
+            avg_visit_count, avg_place_revisit_rate / avg_place_positive_rate (장소 평균)
+        """
+        values = self._cells.get((category, month), EMPTY_CELL)
+        reviews, places = values['reviews'], values['places']
+        return {
+            **values,
+            'revisit_rate': values['revisits'] / reviews * 100 if reviews else 0.0,
+            'positive_rate': values['positive'] / reviews * 100 if reviews else 0.0,
+            'avg_visit_count': values['visit_sum'] / values['visit_n'] if values['visit_n'] else 1.0,
+            'avg_place_revisit_rate': values['place_revisit_rate_sum'] / places if places else 0.0,
+            'avg_place_positive_rate': values['place_positive_rate_sum'] / places if places else 0.0,
+        }
+
+    def series(self, category: str = None) -> List[Tuple[int, Dict]]:
+        """월별 추이 [(YYYYMM, 칸)] (날짜 없는 리뷰 제외, 리뷰가 없는 달은 건너뜀)"""
+        return [(month, self.cell(category, month)) for month in self.months
+                if month != UNKNOWN_MONTH and (category, month) in self._cells]
+
+    def breakdown(self, dimension: str, category: str = None,
+                  month: Optional[int] = None) -> List[Tuple[object, Dict]]:
+        """고정한 차원 안에서 dimension의 구성원별 칸 (드릴다운)"""
+        fixed = {'category': category, 'month': month}
+        members = {'category': self.categories, 'month': self.months}[dimension]
+        rows = []
+        for member in members:
+            key = tuple(member if name == dimension else fixed[name] for name in DIMENSIONS)
+            if key in self._cells:
+                rows.append((member, self.cell(*key)))
+        return rows
+
+
+# ============================================
+# 증분 갱신
+# ============================================
+
+class StatsCubeIndex:
+    """
+    파일 단위 부분 집계(장소 × 월)와 칸별 합계를 보관하는 증분 큐브
+
+    새로 오거나 바뀐 파일은 이전 부분 집계를 빼고 새 부분 집계를 더하며, 장소 수와
+    장소별 비율 합은 (칸, 장소) 합계가 바뀐 장소만 이전 값을 빼고 새 값을 더합니다.
+    바뀐 칸만 새 dict로 바꿔 새 StatsCube를 내주므로 읽는 중인 큐브는 바뀌지 않습니다.
+    """
+
+    def __init__(self):
+        self.file_versions: Dict[str, str] = {}
+        self.partials: Dict[str, pd.DataFrame] = {}
+        self.cube: Optional[StatsCube] = None
+        # 칸 → 측정값 합계 벡터 / (칸, 장소) → 그 칸 안 장소의 측정값 합계 벡터
+        self._sums: Dict[Tuple, np.ndarray] = {}
+        self._place_sums: Dict[Tuple, np.ndarray] = {}
+        # 칸 → [장소 수, 장소별 재방문율 합, 장소별 긍정률 합]
+        self._place_rates: Dict[Tuple, List[float]] = {}
+        self._cells: Dict[Tuple, Dict] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, reviews: pd.DataFrame, file_versions: Dict[str, str]) -> StatsCube:
+        """리뷰 테이블과 파일 버전(sha1)에 맞춰 바뀐 파일만 반영한 큐브"""
+        with self._lock:
+            changed = [k for k, v in file_versions.items() if self.file_versions.get(k) != v]
+            removed = [k for k in self.file_versions if k not in file_versions]
+            if self.cube is not None and not changed and not removed:
+                return self.cube
+
+            deltas = []
+            for key in removed:
+                deltas.append((self.partials.pop(key), -1))
+                self.file_versions.pop(key, None)
+            if changed:
+                file_names = {key.rsplit('/', 1)[-1] for key in changed}
+                rows = reviews[reviews['file_source'].isin(file_names)]
+                rows = rows[file_key_of(rows).isin(changed)]
+                facts = place_month_facts(rows)
+                grouped = dict(tuple(facts.groupby('file_key', sort=False)))
+                for key in changed:
+                    if key in self.partials:
+                        deltas.append((self.partials[key], -1))
+                    self.partials[key] = grouped.get(key, facts.iloc[:0])
+                    self.file_versions[key] = file_versions[key]
+                    deltas.append((self.partials[key], 1))
+
+            self._apply(deltas)
+            self.cube = StatsCube(dict(self._cells))
+            return self.cube
+
+    def _apply(self, deltas: List[Tuple[pd.DataFrame, int]]):
+        """부분 집계 증감(±1)을 칸·(칸, 장소) 합계에 반영하고 바뀐 칸의 dict만 다시 만듦"""
+        frames = [frame[['category', 'place_name', 'month']].assign(
+                      **{name: frame[name].astype(float) * sign for name in MEASURES})
+                  for frame, sign in deltas if len(frame)]
+        if not frames:
+            return
+        signed = pd.concat(frames, ignore_index=True)
+        # 같은 파일의 이전/새 집계는 여기서 대부분 상쇄됨
+        rows = signed.groupby(['category', 'place_name', 'month'], sort=False)[MEASURES].sum()
+
+        place_deltas: Dict[Tuple, np.ndarray] = {}
+        for (category, place, month), values in zip(rows.index, rows.to_numpy()):
+            if not values.any():
+                continue
+            for cell_key in rollup_keys(category, int(month)):
+                key = (cell_key, place)
+                place_deltas[key] = place_deltas[key] + values if key in place_deltas else values.copy()
+
+        touched = set()
+        for (cell_key, place), delta in place_deltas.items():
+            if not delta.any():
+                continue
+            touched.add(cell_key)
+            sums = self._sums.get(cell_key)
+            self._sums[cell_key] = delta.copy() if sums is None else sums + delta
+            rates = self._place_rates.setdefault(cell_key, [0, 0.0, 0.0])
+            old = self._place_sums.get((cell_key, place))
+            if old is not None:
+                self._add_place_rates(rates, old, -1)
+            new = delta if old is None else old + delta
+            if new[REVIEWS] > 0:
+                self._place_sums[(cell_key, place)] = new
+                self._add_place_rates(rates, new, 1)
+            else:
+                self._place_sums.pop((cell_key, place), None)
+
+        for cell_key in touched:
+            if self._sums[cell_key][REVIEWS] <= 0:
+                for store in (self._sums, self._place_rates, self._cells):
+                    store.pop(cell_key, None)
+                continue
+            sums, (places, revisit_rate_sum, positive_rate_sum) = self._sums[cell_key], self._place_rates[cell_key]
+            self._cells[cell_key] = {
+                **{name: (float(value) if name in FLOAT_MEASURES else int(round(value)))
+                   for name, value in zip(MEASURES, sums)},
+                'places': int(places),
+                'place_revisit_rate_sum': revisit_rate_sum,
+                'place_positive_rate_sum': positive_rate_sum,
+            }
+
+    @staticmethod
+    def _add_place_rates(rates: List[float], place: np.ndarray, sign: int):
+        rates[0] += sign
+        rates[1] += sign * place[REVISITS] / place[REVIEWS] * 100
+        rates[2] += sign * place[POSITIVE] / place[REVIEWS] * 100
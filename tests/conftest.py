@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 저장소 최상위 모듈(concierge, vector_index 등)을 테스트에서 가져오기 위함
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
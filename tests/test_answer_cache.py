@@ -0,0 +1,55 @@
+"""의미 기반 답변 캐시: 같은 질의는 임베딩 없이 적중, 임베딩은 의미 비교가 필요할 때만"""
+import numpy as np
+
+from answer_cache import SemanticAnswerCache, cache_scope
+
+SCOPE = cache_scope("gpt-4o-mini", 0.7, "fingerprint", "text-embedding-3-small", "상위 장소", 5, '맛집 리뷰')
+
+
+class CountingEmbed:
+    def __init__(self, vector):
+        self.vector = vector
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.vector
+
+
+def test_exact_query_hits_without_embedding():
+    cache = SemanticAnswerCache()
+    cache.store(SCOPE, "춘천 맛집 추천해줘", [1.0, 0.0], "닭갈비", 2.0, 100)
+
+    embed = CountingEmbed([0.0, 1.0])
+    entry, similarity = cache.lookup(SCOPE, "춘천 맛집 추천해 줘?", embed)
+    assert entry.answer == "닭갈비" and similarity == 1.0
+    assert embed.calls == 0
+
+
+def test_embeds_only_when_scope_has_vectors():
+    cache = SemanticAnswerCache()
+    embed = CountingEmbed([1.0, 0.0])
+    assert cache.lookup(SCOPE, "춘천 맛집 추천해줘", embed) is None
+    assert embed.calls == 0
+
+    # 벡터 없이 저장한 항목(장소명 질의)은 같은 질의로만 적중하고 임베딩을 부르지 않음
+    cache.store(SCOPE, "1.5닭갈비 어때", None, "좋아요", 2.0)
+    assert cache.lookup(SCOPE, "1.5닭갈비 어때?", embed)[0].answer == "좋아요"
+    assert cache.lookup(SCOPE, "춘천 맛집 추천해줘", embed) is None
+    assert embed.calls == 0
+
+    cache.store(SCOPE, "춘천 맛집 추천해줘", [1.0, 0.05], "닭갈비", 2.0)
+    entry, similarity = cache.lookup(SCOPE, "춘천에서 맛집 알려줘", embed)
+    assert entry.answer == "닭갈비" and similarity > 0.95
+    assert embed.calls == 1
+
+    other_scope = SCOPE[:-1] + ('카페 리뷰',)
+    assert cache.lookup(other_scope, "춘천에서 맛집 알려줘", embed) is None
+    assert embed.calls == 1
+    assert cache.metrics()['lookups'] == 5 and cache.metrics()['hits'] == 2
+
+
+def test_dissimilar_query_misses():
+    cache = SemanticAnswerCache()
+    cache.store(SCOPE, "춘천 맛집 추천해줘", np.array([1.0, 0.0]), "닭갈비", 2.0)
+    assert cache.lookup(SCOPE, "카페 추천", CountingEmbed([0.0, 1.0])) is None
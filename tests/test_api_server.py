@@ -0,0 +1,85 @@
+"""ASGI API: 입력 검증 오류, 없는 장소, SSE 채팅 스트림 (작은 리뷰 폴더 + 로컬 임베딩 + 스텁 LLM)"""
+import os
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from api_client import read_sse
+from api_server import create_app, sse_event
+from concierge import ConciergeService
+from embedding_backends import LOCAL_BACKEND
+from llm_stub import STUB_ANSWER, start_stub_server
+
+PLACES = {
+    '맛집 리뷰': ['춘천닭갈비', '막국수집'],
+    '카페 리뷰': ['호수카페'],
+}
+
+
+def write_reviews(base_path: str):
+    """카테고리 폴더마다 naver_review_[장소명].xlsx (장소마다 리뷰 5개)"""
+    for category, places in PLACES.items():
+        os.makedirs(os.path.join(base_path, category))
+        for place in places:
+            pd.DataFrame({
+                'date': [f"24.5.{day}.월" for day in range(1, 6)],
+                'nickname': ['방문자'] * 5,
+                'content': ['맛있어요 친절해요', '또 올게요', '가격이 12,000원이에요', '별로예요', '분위기 좋아요'],
+                'revisit': ['2번째 방문', '', '3번째 방문', '', '1번째 방문'],
+            }).to_excel(os.path.join(base_path, category, f"naver_review_{place}.xlsx"), index=False)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # 리뷰 캐시·벡터 인덱스가 상대 경로에 쓰이므로 임시 폴더에서 실행
+    monkeypatch.chdir(tmp_path)
+    write_reviews(str(tmp_path / '리뷰'))
+    server, _, base_url = start_stub_server(delay=0.001)
+    service = ConciergeService(str(tmp_path / '리뷰'), api_key="unused", base_url=base_url, watch=False)
+    with TestClient(create_app(service=service)) as client:
+        yield client
+    server.shutdown()
+
+
+def test_top_places_rejects_unknown_sort_key(client):
+    assert client.get("/places/top", params={'sort_by': '재방문율'}).status_code == 200
+    assert client.get("/places/top", params={'sort_by': 'revisit_rate'}).status_code == 422
+
+
+def test_compare_unknown_place_is_404(client):
+    assert client.get("/places/compare", params={'place1': '춘천닭갈비', 'place2': '막국수집'}).status_code == 200
+    response = client.get("/places/compare", params={'place1': '춘천닭갈비', 'place2': '없는 장소'})
+    assert response.status_code == 404
+
+
+def test_itinerary_rejects_unknown_priority(client):
+    assert client.post("/itinerary", json={'priorities': '재방문율', 'seed': 1}).status_code == 200
+    assert client.post("/itinerary", json={'priorities': '가격'}).status_code == 422
+    response = client.post("/itinerary/batch", json={'specs': [{'priorities': '재방문율'}, {'priorities': '가격'}]})
+    assert response.status_code == 422
+
+
+def test_chat_stream_ends_with_done_and_conversation_state(client):
+    body = {'messages': [{'role': 'user', 'content': '춘천 맛집 추천해줘'}], 'embedding_backend': LOCAL_BACKEND}
+    with client.stream("POST", "/chat", json=body) as response:
+        assert response.status_code == 200
+        events = list(read_sse(response.iter_lines()))
+
+    names = [name for name, _ in events]
+    assert names[-1] == 'done' and set(names[:-1]) == {'token'}
+    assert "".join(data['text'] for _, data in events[:-1]) == STUB_ANSWER + ' '
+    done = events[-1][1]
+    assert done['cached'] is False
+    assert set(done['conversation_state']) >= {'summary', 'summarized'}
+
+
+def test_read_sse_round_trips_sse_event():
+    sent = [
+        ('token', {'text': "첫 줄\n둘째 줄: data: 흉내"}),
+        ('token', {'text': ' '}),
+        ('done', {'cached': True, 'similarity': 0.97, 'usage': {}, 'conversation_state': {'summary': '요약',
+                                                                                          'summarized': 2}}),
+    ]
+    stream = "".join(sse_event(name, data) for name, data in sent)
+    assert list(read_sse(stream.splitlines())) == sent
@@ -0,0 +1,50 @@
+"""로컬 임베딩 백엔드: 오프라인 검색이 장소별 문서를 찾는지, 해시가 프로세스와 무관하게 고정인지 확인"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+from langchain_core.documents import Document
+
+from embedding_backends import LOCAL_BACKEND, HashedNgramEmbeddings, get_embeddings
+from vector_index import sync_vector_store
+
+PLACES = {
+    '춘천닭갈비': ('맛집 리뷰', "철판 닭갈비가 맛있고 볶음밥 추가가 필수예요. 주차가 편해요."),
+    '소양강막국수': ('맛집 리뷰', "들기름 막국수가 고소하고 편육이 맛있어요. 주차가 편해요."),
+    '공지천카페': ('카페 리뷰', "호수 뷰가 좋고 라떼가 맛있어요. 주차가 편해요."),
+    '김유정레일바이크': ('명소 리뷰', "레일바이크 풍경이 예쁘고 아이들이 좋아해요. 주차가 편해요."),
+}
+QUERIES = {
+    '춘천닭갈비': "춘천닭갈비 볶음밥 어때?",
+    '소양강막국수': "소양강막국수 편육 맛있나요",
+    '공지천카페': "공지천카페 라떼",
+    '김유정레일바이크': "김유정 레일바이크 아이랑 가도 돼?",
+}
+
+
+def place_documents():
+    return [Document(page_content=f"{category.replace(' 리뷰', '')} | {place}\n{review}",
+                     metadata={'category': category, 'place_name': place})
+            for place, (category, review) in PLACES.items()]
+
+
+def test_local_store_retrieves_the_place_in_the_query(tmp_path):
+    embeddings = get_embeddings(LOCAL_BACKEND)
+    vectorstore, stats = sync_vector_store(place_documents(), embeddings, persist_directory=str(tmp_path))
+    assert stats['embedded'] == len(PLACES)
+
+    for place, query in QUERIES.items():
+        assert vectorstore.similarity_search(query, k=1)[0].metadata['place_name'] == place
+
+
+def test_hashing_is_deterministic_across_processes():
+    texts = list(QUERIES.values()) + ["", "A"]
+    local = HashedNgramEmbeddings().embed_documents(texts)
+    code = ("import json, sys; from embedding_backends import HashedNgramEmbeddings; "
+            "print(json.dumps(HashedNgramEmbeddings().embed_documents(json.loads(sys.stdin.read()))))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', code], input=json.dumps(texts), capture_output=True,
+                            text=True, check=True, cwd=root, env={**os.environ, 'PYTHONHASHSEED': '12345'})
+    assert np.array_equal(np.array(json.loads(result.stdout)), np.array(local))
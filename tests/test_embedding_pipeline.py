@@ -0,0 +1,65 @@
+"""동시 임베딩 파이프라인: 지연·429·400을 주입한 로컬 스텁 서버에서 순서·재시도·배치 나누기 확인"""
+import numpy as np
+import pytest
+from langchain_openai import OpenAIEmbeddings
+
+from embedding_pipeline import EmbeddingPipeline
+from llm_stub import start_stub_server, stub_embedding
+
+REJECTED = "<거부>"
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server, state, base_url = start_stub_server(retry_after=0.01, **kwargs)
+        servers.append(server)
+        return state, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def pipeline(base_url: str) -> EmbeddingPipeline:
+    # 오프라인이라 tiktoken 인코딩을 받을 수 없으므로 문자열 그대로 전송, 재시도는 파이프라인이 담당
+    embeddings = OpenAIEmbeddings(api_key="unused", base_url=base_url, max_retries=0,
+                                  check_embedding_ctx_length=False)
+    return EmbeddingPipeline(embeddings, max_batch_items=4, max_concurrency=4, max_retries=30,
+                             backoff_base=0.01)
+
+
+def texts(count: int):
+    return [f"맛집 | 장소{i % 7} | 24.5.{i % 28 + 1}.월\n" + "닭갈비가 맛있어요. " * (i % 5 + 1)
+            for i in range(count)]
+
+
+def test_vectors_return_in_input_order_and_only_failed_batches_are_retried(stub):
+    state, base_url = stub(delay=0.02, fail_rate=0.2, fail_first=2)
+    inputs = texts(40)
+
+    vectors, failed, stats = pipeline(base_url).embed(inputs)
+
+    assert failed == []
+    assert np.allclose(vectors, np.array([stub_embedding(text) for text in inputs], dtype=np.float32), atol=1e-6)
+    assert stats['retries'] >= 2
+    # 429를 받은 배치만 그대로 다시 보냄 (성공한 배치는 다시 보내지 않음)
+    assert stats['retries'] == state.failures
+    assert stats['requests'] == state.requests == stats['batches'] + stats['retries']
+
+
+def test_bad_request_splits_the_batch_down_to_the_rejected_chunk(stub):
+    _, base_url = stub(delay=0.01, reject=REJECTED)
+    inputs = texts(12)
+    inputs[5] += REJECTED
+
+    vectors, failed, stats = pipeline(base_url).embed(inputs)
+
+    assert failed == [5]
+    assert stats['split'] == 2          # 4개 배치 → 2개 → 1개
+    assert not vectors[5].any()
+    kept = [i for i in range(len(inputs)) if i != 5]
+    assert np.allclose(vectors[kept], np.array([stub_embedding(inputs[i]) for i in kept], dtype=np.float32),
+                       atol=1e-6)
@@ -0,0 +1,118 @@
+"""일정 최적화: 일괄 계획의 결정성·중복 제거, 2-opt·좌표 없는 장소 처리, 우선순위 검증 (작은 합성 장소 통계)"""
+import random
+from typing import Dict, Tuple
+
+import numpy as np
+import pytest
+
+import itinerary_planner
+from itinerary_planner import ItineraryPlanner, ItinerarySpec, load_gazetteer, plan_batch
+
+CHUNCHEON = (37.88, 127.73)
+
+
+def synthetic_places(per_category: int = 8, seed: int = 7) -> Tuple[Dict[str, Dict], Dict[str, Tuple[float, float]]]:
+    """카테고리마다 per_category곳의 통계와 춘천 근처 좌표"""
+    rng = random.Random(seed)
+    places, gazetteer = {}, {}
+    for category in ('맛집 리뷰', '명소 리뷰', '카페 리뷰'):
+        for i in range(per_category):
+            name = f"{category[:2]} {i}"
+            places[name] = {
+                'category': category,
+                'total_reviews': rng.randint(3, 200),
+                'revisit_rate': round(rng.uniform(0, 60), 1),
+                'positive_rate': round(rng.uniform(30, 95), 1),
+            }
+            gazetteer[name] = (CHUNCHEON[0] + rng.uniform(-0.15, 0.15), CHUNCHEON[1] + rng.uniform(-0.15, 0.15))
+    return places, gazetteer
+
+
+def test_plan_batch_is_deterministic_deduped_and_matches_serial(monkeypatch):
+    places, gazetteer = synthetic_places()
+    planner = ItineraryPlanner(places, gazetteer=gazetteer)
+    # 작은 명세 목록으로도 프로세스 풀(spawn)을 타도록
+    monkeypatch.setattr(itinerary_planner, 'MIN_PARALLEL_SPECS', 2)
+
+    specs = [ItinerarySpec(duration, categories, priority, seed)
+             for duration in ("1박 2일", "2박 3일", "3박 4일")
+             for categories in (('맛집 리뷰', '명소 리뷰', '카페 리뷰'), ('카페 리뷰', '맛집 리뷰'))
+             for priority in ('재방문율', '긍정 평가')
+             for seed in (0, 1)]
+    # 카테고리 순서·중복만 다른 명세는 같은 명세
+    duplicates = [ItinerarySpec(spec.duration, tuple(reversed(spec.categories)) + spec.categories[:1],
+                                spec.priorities, spec.seed) for spec in specs[:5]]
+    batch = specs + duplicates + specs[:3]
+
+    first = plan_batch(planner, batch, workers=2)
+    second = plan_batch(planner, batch, workers=2)
+    serial = plan_batch(planner, batch, workers=1)
+
+    assert first == second == serial
+    assert len(first) == len(batch)
+    for i, duplicate in enumerate(duplicates):
+        assert first[len(specs) + i] is first[i]
+    for i in range(3):
+        assert first[len(specs) + len(duplicates) + i] is first[i]
+    assert serial == [planner.plan_spec(spec.normalized()) for spec in batch]
+    assert all(plan['routing']['available'] for plan in first)
+
+
+def test_two_opt_never_increases_day_travel():
+    places, gazetteer = synthetic_places(per_category=10, seed=3)
+    planner = ItineraryPlanner(places, gazetteer=gazetteer)
+    sights = [int(i) for i in planner.pools[('명소 리뷰', 'revisit_rate')]]
+    slots = [(f"{hour:02d}:00", '명소 리뷰') for hour in range(8, 14)]
+    utility = np.zeros(len(planner.names), dtype=np.float32)
+    rng = random.Random(0)
+
+    shortened = 0
+    for _ in range(200):
+        route = rng.sample(sights, len(slots))
+        before = planner._day_travel(route)
+        best = planner._objective(route, slots, utility, None)
+        after, _, changed = planner._two_opt(route, slots, utility, None, best)
+        assert sorted(after) == sorted(route)
+        assert planner._day_travel(after) <= before + 1e-6
+        shortened += changed and planner._day_travel(after) < before - 1e-6
+    assert shortened > 0
+
+
+def test_places_without_coordinates_fall_back(tmp_path):
+    places, coords = synthetic_places()
+    located = sorted(coords)[::2]
+    rows = [f"{name},{coords[name][0]},{coords[name][1]}" for name in located] + ["좌표 오류,북위,동경"]
+    path = tmp_path / 'gazetteer.csv'
+    path.write_text("place_name,lat,lng\n" + "\n".join(rows) + "\n", encoding='utf-8')
+    gazetteer = load_gazetteer(str(path))
+    assert sorted(gazetteer) == located
+
+    planner = ItineraryPlanner(places, gazetteer=gazetteer)
+    for seed in range(20):
+        plan = planner.plan("2박 3일", None, "재방문율", seed)
+        assert plan['routing'] == {'available': True, 'located': len(located), 'candidates': len(places)}
+        for day in plan['days']:
+            activities = day['activities']
+            assert activities[0]['travel_minutes'] == 0 and activities[0]['distance_km'] == 0.0
+            for prev, activity in zip(activities, activities[1:]):
+                both = prev['place'] in gazetteer and activity['place'] in gazetteer
+                assert (activity['travel_minutes'] is not None) == both
+                assert (activity['distance_km'] is not None) == both
+            legs = [activity['travel_minutes'] for activity in activities]
+            assert day['travel_minutes'] == (None if None in legs else sum(legs))
+
+    unrouted = ItineraryPlanner(places, gazetteer={}).plan("1박 2일", None, "긍정 평가", 1)
+    assert unrouted['routing']['available'] is False
+    assert all(activity['travel_minutes'] is None
+               for day in unrouted['days'] for activity in day['activities'][1:])
+
+
+def test_unknown_priority_raises():
+    places, gazetteer = synthetic_places()
+    planner = ItineraryPlanner(places, gazetteer=gazetteer)
+    with pytest.raises(ValueError):
+        ItinerarySpec(priorities='가격').normalized()
+    with pytest.raises(ValueError):
+        planner.plan("1박 2일", None, '가격', 0)
+    with pytest.raises(ValueError):
+        plan_batch(planner, [ItinerarySpec(), ItinerarySpec(priorities='가격')])
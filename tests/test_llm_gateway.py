@@ -0,0 +1,84 @@
+"""LLM 게이트웨이: 429 재시도, 요청 합치기, 첫 조각 뒤 오류 (로컬 스텁 서버, 네트워크·API 키 없음)"""
+import threading
+
+import openai
+import pytest
+
+from llm_gateway import ChatRequest, LLMGateway
+from llm_stub import STUB_ANSWER, start_stub_server
+
+ANSWER_PIECES = [piece + ' ' for piece in STUB_ANSWER.split(' ')]
+
+
+@pytest.fixture
+def gateway():
+    gateway = LLMGateway(backoff_base=0.01, requests_per_minute=60_000)
+    yield gateway
+    gateway.close()
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server, state, base_url = start_stub_server(retry_after=0.01, **kwargs)
+        servers.append(server)
+        return state, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def request(base_url: str, question: str = "춘천 닭갈비 맛집 추천해줘") -> ChatRequest:
+    return ChatRequest.from_messages("gpt-4o-mini", [{'role': 'user', 'content': question}], base_url=base_url)
+
+
+def test_retries_injected_429s_until_success(gateway, stub):
+    state, base_url = stub(delay=0.001, fail_first=3)
+
+    assert gateway.complete(request(base_url)) == "".join(ANSWER_PIECES)
+    assert state.failures == 3
+    assert gateway.stats['retries'] == 3
+    assert gateway.stats['upstream_calls'] == 4
+
+    # 무작위 429 비율에서도 재시도로 끝까지 받음
+    state, base_url = stub(delay=0.001, fail_rate=0.3)
+    gateway.max_retries = 30
+    assert all(gateway.complete(request(base_url, f"질문 {i}")) == "".join(ANSWER_PIECES) for i in range(10))
+
+
+def test_identical_concurrent_requests_share_one_upstream_call(gateway, stub):
+    state, base_url = stub(delay=0.05)
+    users = 8
+    streams = [None] * users
+    start = threading.Barrier(users)
+
+    def user(i):
+        start.wait()
+        streams[i] = list(gateway.stream(request(base_url)))
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state.requests == 1
+    assert gateway.stats['upstream_calls'] == 1
+    assert gateway.stats['coalesced'] == users - 1
+    assert all(chunks == ANSWER_PIECES for chunks in streams)
+
+
+def test_error_after_first_chunk_is_not_retried(gateway, stub):
+    state, base_url = stub(delay=0.001, cut_after=3)
+
+    received = []
+    with pytest.raises(openai.APIConnectionError):
+        for chunk in gateway.stream(request(base_url)):
+            received.append(chunk)
+
+    assert received == ANSWER_PIECES[:3]
+    assert state.requests == 1
+    assert gateway.stats['retries'] == 0
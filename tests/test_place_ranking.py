@@ -0,0 +1,44 @@
+"""장소 순위 색인: 증분 갱신과 새로 만든 순위의 동점 순서, 값이 None인 정렬 키"""
+from place_ranking import PlaceRankingIndex
+
+
+def place(category: str, revisit_rate: float, median_price=None, total_reviews: int = 10):
+    return {'category': category, 'total_reviews': total_reviews, 'revisit_rate': revisit_rate,
+            'positive_rate': 50.0, 'median_price': median_price}
+
+
+def test_updated_and_lazily_built_rankings_agree_on_ties():
+    places = {f"장소{i}": place('맛집 리뷰', [30.0, 20.0, 30.0, 10.0, 20.0, 30.0][i], 8000) for i in range(6)}
+    index = PlaceRankingIndex(places)
+    index.top(None, 'revisit_rate', 10)
+
+    # 새 스냅샷은 dict 순서가 다르고, 장소 하나가 바뀌고 하나가 새로 생김
+    changed = dict(reversed(list(places.items())))
+    changed['장소3'] = place('맛집 리뷰', 30.0, 8000)
+    changed['장소9'] = place('맛집 리뷰', 20.0, 8000)
+    updated = index.updated(changed, ['장소3', '장소9'])
+
+    expected = ['장소0', '장소2', '장소3', '장소5', '장소1', '장소4', '장소9']
+    # 갱신 전에 만든 순위(이분 탐색 갱신)와 갱신 후 처음 만든 순위가 같은 동점 순서
+    assert [name for name, _ in updated.top(None, 'revisit_rate', 10)] == expected
+    assert [name for name, _ in updated.top('맛집 리뷰', 'revisit_rate', 10)] == expected
+
+    again = updated.updated(changed, ['장소1'])
+    assert [name for name, _ in again.top(None, 'revisit_rate', 10)] == expected
+    assert [name for name, _ in again.top('맛집 리뷰', 'revisit_rate', 10)] == expected
+
+
+def test_none_values_sort_last():
+    places = {
+        '가': place('카페 리뷰', 10.0, None),
+        '나': place('카페 리뷰', 10.0, 6000),
+        '다': place('카페 리뷰', 10.0, None),
+        '라': place('카페 리뷰', 10.0, 9000),
+    }
+    index = PlaceRankingIndex(places)
+    assert [name for name, _ in index.top(None, 'median_price', 10)] == ['라', '나', '가', '다']
+
+    changed = {**places, '가': place('카페 리뷰', 10.0, 7000), '라': place('카페 리뷰', 10.0, None)}
+    updated = index.updated(changed, ['가', '라'])
+    assert [name for name, _ in updated.top(None, 'median_price', 10)] == ['가', '나', '다', '라']
+    assert updated.count(None, 'median_price') == 4
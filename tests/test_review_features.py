@@ -0,0 +1,49 @@
+"""방문 날짜 특징: 연도 없는 날짜의 연도 판별과, 기준 연도가 바뀐 캐시의 재계산"""
+import os
+from datetime import date
+
+import pandas as pd
+
+import review_features
+from review_features import parse_review_dates
+from review_store import load_review_table
+
+
+def fixed_today(today: date):
+    class FixedDate(date):
+        @classmethod
+        def today(cls):
+            return today
+    return FixedDate
+
+
+def test_yearless_dates_use_the_weekday_and_the_reference_date():
+    dates = pd.Series(["22.10.14.금", "4.28.월", "4.28.", "12.25.", "날짜 없음"])
+    parsed = parse_review_dates(dates, today=date(2025, 5, 7))
+    assert parsed.dt.strftime('%Y-%m-%d').tolist()[:4] == ['2022-10-14', '2025-04-28', '2025-04-28', '2024-12-25']
+    assert parsed.isna().tolist() == [False, False, False, False, True]
+
+
+def test_cached_features_follow_the_reference_year(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / '리뷰' / '맛집 리뷰')
+    pd.DataFrame({
+        'date': ["24.5.6.월", "5.5."], 'nickname': ['방문자'] * 2,
+        'content': ['맛있어요', '친절해요'], 'revisit': ['', ''],
+    }).to_excel(tmp_path / '리뷰' / '맛집 리뷰' / 'naver_review_춘천닭갈비.xlsx', index=False)
+
+    monkeypatch.setattr(review_features, 'date', fixed_today(date(2025, 5, 7)))
+    reviews, report = load_review_table(str(tmp_path / '리뷰'), workers=1)
+    assert reviews['review_month'].tolist() == [202405, 202505]
+
+    # 같은 해에는 캐시의 특징을 그대로 사용
+    again, same_year = load_review_table(str(tmp_path / '리뷰'), workers=1)
+    assert again['review_month'].tolist() == [202405, 202505]
+    assert same_year['file_versions'] == report['file_versions']
+
+    # 해가 바뀌면 엑셀이 그대로여도 새로 수집한 것과 같은 기준으로 다시 판별하고 파일 버전도 바뀜
+    monkeypatch.setattr(review_features, 'date', fixed_today(date(2026, 5, 7)))
+    reviews, next_year = load_review_table(str(tmp_path / '리뷰'), workers=1)
+    assert reviews['review_month'].tolist() == [202405, 202605]
+    assert next_year['file_versions'].keys() == report['file_versions'].keys()
+    assert next_year['file_versions'] != report['file_versions']
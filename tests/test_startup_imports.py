@@ -0,0 +1,52 @@
+"""시작 경로 가져오기: 새 프로세스의 -X importtime 결과로 무거운 채팅 스택을 미루는지·시간 예산을 지키는지 확인"""
+import ast
+import os
+import subprocess
+import sys
+from typing import List, Set, Tuple
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 첫 채팅(또는 백그라운드 준비) 전까지 가져오면 안 되는 LLM·벡터 스택
+DEFERRED_MODULES = ['chat_engine', 'langchain_openai', 'langchain_community', 'chromadb']
+# 가져오기 누적 시간 예산 (benchmark.py startup의 STARTUP_BUDGET_MS와 같은 기준, app은 Streamlit 포함)
+BUDGET_MS = {'concierge': 1500, 'app': 2500}
+
+
+def app_imports() -> List[str]:
+    """app.py 최상위 import 문 (import app은 스크립트 전체를 실행하므로 가져오기만 떼어 냄)"""
+    with open(os.path.join(ROOT, 'app.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_time(statements: List[str]) -> Tuple[float, Set[str]]:
+    """
+    새 프로세스에서 statements를 실행한 -X importtime 결과
+
+    Returns:
+        (최상위 가져오기 누적 시간 합 ms, 가져온 모듈 이름)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', "\n".join(statements)],
+                            capture_output=True, text=True, check=True, cwd=ROOT)
+    total_ms, modules = 0.0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # 들여쓴 줄은 바로 위 최상위 가져오기의 누적 시간에 이미 포함됨
+        if not name.startswith('   '):
+            total_ms += int(cumulative) / 1000
+    return total_ms, modules
+
+
+@pytest.mark.parametrize('target', ['concierge', 'app'])
+def test_startup_defers_chat_stack_within_budget(target):
+    statements = [f"import {target}"] if target == 'concierge' else app_imports()
+    total_ms, modules = import_time(statements)
+
+    loaded = [name for name in DEFERRED_MODULES if name in modules]
+    assert not loaded, f"{target} 시작 시 채팅 스택을 가져옴: {loaded}"
+    assert total_ms < BUDGET_MS[target], f"{target} 가져오기 {total_ms:.0f}ms > 예산 {BUDGET_MS[target]}ms"
@@ -0,0 +1,69 @@
+"""통계 큐브: 파일 단위 증분 갱신이 전체 빌드와 같은 칸을 내는지 확인"""
+import pandas as pd
+import pytest
+
+from stats_cube import StatsCubeIndex
+
+COMPARED = ['reviews', 'revisits', 'positive', 'negative', 'visit_sum', 'price_mentions', 'places',
+            'avg_place_revisit_rate', 'avg_place_positive_rate']
+
+
+def review_rows(category: str, file_source: str, place: str, count: int, month: int = 10):
+    return [{
+        'category': category,
+        'file_source': file_source,
+        'place_name': place,
+        'content': '맛있어요 친절해요 8,000원' if i % 2 else '별로예요',
+        'revisit': f'{i % 3 + 1}번째 방문' if i % 3 else '',
+        'date': f'24.{month}.{i % 27 + 1}.월',
+    } for i in range(count)]
+
+
+def table(*groups) -> pd.DataFrame:
+    return pd.DataFrame([row for group in groups for row in group])
+
+
+def assert_same_cells(cube, rebuilt):
+    assert cube.categories == rebuilt.categories
+    assert cube.months == rebuilt.months
+    for category in [None] + rebuilt.categories:
+        for month in [None] + rebuilt.months:
+            got, expected = cube.cell(category, month), rebuilt.cell(category, month)
+            for name in COMPARED:
+                assert got[name] == pytest.approx(expected[name]), (category, month, name)
+
+
+def test_incremental_sync_matches_full_build():
+    a = review_rows('맛집', 'a.xlsx', '닭갈비집', 9) + review_rows('맛집', 'a.xlsx', '막국수집', 4, month=11)
+    b = review_rows('카페', 'b.xlsx', '호수카페', 6) + review_rows('카페', 'b.xlsx', '닭갈비집', 3, month=11)
+    c = review_rows('명소', 'c.xlsx', '소양강', 5, month=9)
+    versions = {'맛집/a.xlsx': '1', '카페/b.xlsx': '1', '명소/c.xlsx': '1'}
+
+    index = StatsCubeIndex()
+    index.sync(table(a, b, c), versions)
+
+    # 파일 하나가 바뀜: 장소 하나가 사라지고 다른 장소에 리뷰가 늘어남
+    a2 = review_rows('맛집', 'a.xlsx', '닭갈비집', 14)
+    versions = {**versions, '맛집/a.xlsx': '2'}
+    assert_same_cells(index.sync(table(a2, b, c), versions), StatsCubeIndex().sync(table(a2, b, c), versions))
+    assert index.cube.cell('맛집', 11)['reviews'] == 0
+
+    # 파일 삭제 후 새 파일 추가
+    versions = {'맛집/a.xlsx': '2', '명소/c.xlsx': '1'}
+    assert_same_cells(index.sync(table(a2, c), versions), StatsCubeIndex().sync(table(a2, c), versions))
+    assert '카페' not in index.cube.categories
+
+    d = review_rows('카페', 'd.xlsx', '호수카페', 7, month=12)
+    versions = {**versions, '카페/d.xlsx': '1'}
+    assert_same_cells(index.sync(table(a2, c, d), versions), StatsCubeIndex().sync(table(a2, c, d), versions))
+
+
+def test_sync_keeps_previous_cube_unchanged():
+    versions = {'맛집/a.xlsx': '1'}
+    index = StatsCubeIndex()
+    before = index.sync(table(review_rows('맛집', 'a.xlsx', '닭갈비집', 5)), versions)
+
+    after = index.sync(table(review_rows('맛집', 'a.xlsx', '닭갈비집', 8)), {'맛집/a.xlsx': '2'})
+    assert before.cell()['reviews'] == 5
+    assert after.cell()['reviews'] == 8
+    assert index.sync(table(review_rows('맛집', 'a.xlsx', '닭갈비집', 8)), {'맛집/a.xlsx': '2'}) is after
@@ -0,0 +1,59 @@
+"""영구 벡터 인덱스: 바뀐 청크만 임베딩하는지 확인 (로컬 가짜 임베딩, 네트워크 없음)"""
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_backends import HashedNgramEmbeddings
+from vector_index import sync_vector_store
+
+
+class CountingEmbeddings(Embeddings):
+    """임베딩한 텍스트를 기록하는 가짜 모델 (벡터는 해싱 임베딩)"""
+
+    model = "counting-fake"
+
+    def __init__(self):
+        self.encoder = HashedNgramEmbeddings(dim=32)
+        self.embedded: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [self.encoder.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encoder.embed_query(text)
+
+
+def place_document(place: str, detail: str) -> str:
+    return "\n".join(f"{place} 리뷰 {i}: {detail} 방문 {i}번째, 메뉴와 분위기 이야기 {i}." for i in range(12))
+
+
+def split(documents: List[str]) -> List[Document]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0)
+    return splitter.create_documents(documents, metadatas=[{'doc': i} for i in range(len(documents))])
+
+
+def test_unchanged_corpus_embeds_nothing_and_edit_embeds_only_that_document(tmp_path):
+    documents = [place_document(f"장소{i}", "맛있고 친절") for i in range(5)]
+    splits = split(documents)
+    embeddings = CountingEmbeddings()
+
+    _, stats = sync_vector_store(splits, embeddings, persist_directory=str(tmp_path))
+    assert len(embeddings.embedded) == len(splits)
+    assert stats['embedded'] == len(splits) and stats['reused'] == 0
+
+    embeddings.embedded.clear()
+    _, stats = sync_vector_store(split(documents), embeddings, persist_directory=str(tmp_path))
+    assert embeddings.embedded == []
+    assert stats['embedded'] == 0 and stats['reused'] == len(splits)
+
+    embeddings.embedded.clear()
+    documents[2] = place_document("장소2", "가격이 올라 아쉬움")
+    edited = split(documents)
+    edited_chunks = [doc.page_content for doc in edited if doc.metadata['doc'] == 2]
+    vectorstore, stats = sync_vector_store(edited, embeddings, persist_directory=str(tmp_path))
+    assert sorted(embeddings.embedded) == sorted(edited_chunks)
+    assert stats['deleted'] == len(edited_chunks)
+    assert len(vectorstore.get()['ids']) == len(edited)
@@ -0,0 +1,237 @@
+"""
+영구 벡터 인덱스
+
+청크 텍스트와 임베딩 모델 이름의 해시를 청크 ID로 사용해
+디스크에 저장하고, 재빌드 시에는 새로 생기거나 바뀐 청크만 임베딩합니다.
+코퍼스가 그대로면 앱을 다시 시작해도 임베딩 호출이 0회입니다.
+
+- 요약 모드: 상위 장소 요약 문서 → Chroma (persist_directory)
+- 전체 리뷰 모드: 리뷰 전부 → int8 양자화 IVF 인덱스 (ann_index)
+"""
+import os
+import re
+import hashlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_pipeline import EmbeddingPipeline
+from review_features import parse_prices, with_features
+from ann_index import (
+    ANN_INDEX_DIR, ANNVectorStore, quantize,
+    load_quantized_vectors, save_quantized_vectors,
+)
+
+VECTOR_STORE_PATH = os.path.join(".cache", "chroma")
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """임베딩 모델 식별자 (모델이 바뀌면 다른 컬렉션/ID 사용)"""
+    return str(getattr(embeddings, 'model', None) or type(embeddings).__name__)
+
+
+def chunk_id(text: str, model_name: str) -> str:
+    """청크 ID = sha1(모델 이름 + 청크 텍스트)"""
+    return hashlib.sha1(f"{model_name}\n{text}".encode('utf-8')).hexdigest()
+
+
+def collection_name_for(model_name: str) -> str:
+    """Chroma 컬렉션 이름 규칙(영숫자, 3~63자)에 맞게 변환"""
+    safe = re.sub(r'[^a-zA-Z0-9_-]', '-', model_name).strip('-_')
+    return f"reviews-{safe}"[:63]
+
+
+def sync_vector_store(documents: List[Document], embeddings: Embeddings,
+                      persist_directory: str = VECTOR_STORE_PATH,
+                      pipeline: EmbeddingPipeline = None) -> Tuple[Chroma, Dict]:
+    """
+    문서 청크를 영구 인덱스와 동기화
+
+    - 이미 저장된 청크(같은 해시)는 임베딩을 재사용
+    - 새 청크만 임베딩 파이프라인(동시 배치)으로 임베딩해 컬렉션에 한 번에 추가
+    - 임베딩에 끝내 실패한 청크는 빼고 추가 (다음 동기화 때 새 청크로 다시 시도)
+    - 더 이상 없는 청크는 삭제
+    - 재사용 청크의 메타데이터가 달라졌으면 메타데이터만 갱신 (where 필터용)
+
+    Returns:
+        (벡터 스토어, {'embedded', 'reused', 'deleted', 'updated', 'failed', 'embedding'}
+         — embedding은 파이프라인 통계)
+    """
+    model_name = embedding_model_name(embeddings)
+    vectorstore = Chroma(
+        collection_name=collection_name_for(model_name),
+        embedding_function=embeddings,
+        persist_directory=persist_directory,
+    )
+
+    # 같은 텍스트의 청크는 하나만 유지
+    chunks = {}
+    for doc in documents:
+        chunks.setdefault(chunk_id(doc.page_content, model_name), doc)
+
+    existing = vectorstore.get(include=['metadatas'])
+    existing_metadata = dict(zip(existing['ids'], existing['metadatas']))
+    new_ids = [cid for cid in chunks if cid not in existing_metadata]
+    stale_ids = [cid for cid in existing_metadata if cid not in chunks]
+    changed_ids = [cid for cid, metadata in existing_metadata.items()
+                   if cid in chunks and chunks[cid].metadata and (metadata or {}) != chunks[cid].metadata]
+
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+    if changed_ids:
+        vectorstore._collection.update(ids=changed_ids, metadatas=[chunks[cid].metadata for cid in changed_ids])
+
+    failed, embedding_stats = [], {}
+    if new_ids:
+        pipeline = pipeline or EmbeddingPipeline(embeddings)
+        vectors, failed, embedding_stats = pipeline.embed([chunks[cid].page_content for cid in new_ids])
+        failed_rows = set(failed)
+        rows = [row for row in range(len(new_ids)) if row not in failed_rows]
+        add_embeddings(vectorstore, [new_ids[row] for row in rows], vectors[rows],
+                       [chunks[new_ids[row]] for row in rows])
+
+    stats = {
+        'embedded': len(new_ids) - len(failed),
+        'reused': len(chunks) - len(new_ids),
+        'deleted': len(stale_ids),
+        'updated': len(changed_ids),
+        'failed': len(failed),
+        'embedding': embedding_stats,
+    }
+    return vectorstore, stats
+
+
+def add_embeddings(vectorstore: Chroma, ids: List[str], vectors: np.ndarray, documents: List[Document]):
+    """미리 계산한 벡터를 컬렉션에 직접 추가 (Chroma 최대 배치 크기 단위)"""
+    if not ids:
+        return
+    batch_size = vectorstore._client.get_max_batch_size()
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        vectorstore._collection.upsert(
+            ids=ids[start:end],
+            embeddings=vectors[start:end],
+            documents=[doc.page_content for doc in documents[start:end]],
+            metadatas=[doc.metadata or None for doc in documents[start:end]],
+        )
+
+
+# ============================================
+# 전체 리뷰 인덱스
+# ============================================
+
+def prepare_full_review_documents(reviews: pd.DataFrame,
+                                  chunk_size: int = CHUNK_SIZE,
+                                  chunk_overlap: int = CHUNK_OVERLAP) -> List[Document]:
+    """
+    리뷰 전부를 청크 문서로 변환 (장소/카테고리/날짜 메타데이터 포함)
+
+    긴 리뷰만 chunk_size 단위로 나누고, 각 청크 앞에
+    "카테고리 | 장소명 | 날짜" 머리글을 붙여 장소명 검색이 되도록 합니다.
+    재방문 리뷰(is_revisit)와 가격 언급(has_price)은 필터용 메타데이터로 두며,
+    수집 시 계산한 특징 컬럼을 그대로 씁니다 (나뉜 청크만 가격 언급을 다시 확인).
+    """
+    reviews = with_features(reviews)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    documents = []
+    price_counts = pc.list_value_length(pa.array(reviews['prices'].array)).to_numpy(zero_copy_only=False)
+    columns = zip(reviews['category'].astype(str), reviews['place_name'].astype(str),
+                  reviews['date'].astype(str), reviews['revisit'].astype(str),
+                  reviews['content'].astype(str), reviews['is_revisit'].tolist(), price_counts.tolist())
+    for category, place_name, date, revisit, content, is_revisit, price_count in columns:
+        header = f"{category.replace(' 리뷰', '')} | {place_name} | {date}"
+        metadata = {'category': category, 'place_name': place_name, 'date': date, 'revisit': revisit,
+                    'is_revisit': is_revisit}
+        if len(content) <= chunk_size:
+            documents.append(Document(page_content=f"{header}\n{content}",
+                                      metadata={**metadata, 'has_price': price_count > 0}))
+            continue
+        for piece in text_splitter.split_text(content):
+            has_price = price_count > 0 and bool(parse_prices(piece))
+            documents.append(Document(page_content=f"{header}\n{piece}",
+                                      metadata={**metadata, 'has_price': has_price}))
+    return documents
+
+
+def build_full_review_store(documents: List[Document], embeddings: Embeddings,
+                            index_dir: str = ANN_INDEX_DIR,
+                            pipeline: EmbeddingPipeline = None) -> Tuple[ANNVectorStore, Dict]:
+    """
+    전체 리뷰 ANN 인덱스 구성
+
+    청크 ID별 int8 코드를 디스크에 보관해 두고, 없는 청크만 임베딩 파이프라인으로
+    임베딩해 한 번에 양자화합니다. 임베딩에 끝내 실패한 청크는 이번 인덱스에서 빠집니다.
+
+    Returns:
+        (벡터 스토어, {'embedded', 'reused', 'deleted', 'failed', 'embedding'})
+    """
+    model_name = embedding_model_name(embeddings)
+    path = os.path.join(index_dir, f"{collection_name_for(model_name)}.npz")
+    stored = load_quantized_vectors(path)
+    row_of = {cid: row for row, cid in enumerate(stored.get('ids', []))}
+
+    ids = [chunk_id(doc.page_content, model_name) for doc in documents]
+    missing = list(dict.fromkeys(cid for cid in ids if cid not in row_of))
+    texts = {cid: doc.page_content for cid, doc in zip(ids, documents)}
+
+    code_blocks = [stored['codes']] if stored else []
+    scale_blocks = [stored['scales']] if stored else []
+    failed, embedding_stats = [], {}
+    if missing:
+        pipeline = pipeline or EmbeddingPipeline(embeddings)
+        vectors, failed, embedding_stats = pipeline.embed([texts[cid] for cid in missing])
+        failed_rows = set(failed)
+        rows = [row for row in range(len(missing)) if row not in failed_rows]
+        if rows:
+            codes, scales = quantize(vectors[rows])
+            for row in rows:
+                row_of[missing[row]] = len(row_of)
+            code_blocks.append(codes)
+            scale_blocks.append(scales)
+
+    if failed:
+        kept = [i for i, cid in enumerate(ids) if cid in row_of]
+        documents = [documents[i] for i in kept]
+        ids = [ids[i] for i in kept]
+
+    unique_ids = list(dict.fromkeys(ids))
+    embedded = len(missing) - len(failed)
+    stats = {
+        'embedded': embedded,
+        'reused': len(unique_ids) - embedded,
+        'deleted': len(row_of) - len(unique_ids),
+        'failed': len(failed),
+        'embedding': embedding_stats,
+    }
+    if not ids:
+        return ANNVectorStore.from_quantized(documents, embeddings, np.zeros((0, 1), np.int8),
+                                             np.zeros(0, np.float32)), stats
+
+    all_codes = np.concatenate(code_blocks)
+    all_scales = np.concatenate(scale_blocks)
+    rows = np.fromiter((row_of[cid] for cid in ids), dtype=np.int64, count=len(ids))
+
+    # 변경이 없으면 저장된 IVF 중심 재사용 (k-means 생략)
+    centroids = None if stats['embedded'] or stats['deleted'] else stored.get('centroids')
+    vectorstore = ANNVectorStore.from_quantized(documents, embeddings, all_codes[rows], all_scales[rows],
+                                                centroids=centroids)
+
+    if centroids is None:
+        # 현재 코퍼스의 청크만 저장 (사라진 청크 정리)
+        unique_rows = np.fromiter((row_of[cid] for cid in unique_ids), dtype=np.int64, count=len(unique_ids))
+        try:
+            save_quantized_vectors(path, unique_ids, all_codes[unique_rows], all_scales[unique_rows],
+                                   vectorstore.index.centroids)
+        except OSError:
+            pass
+
+    return vectorstore, stats